@@ -25,6 +25,9 @@ ftp_url = None
 #  matplot, numpy, and pandas for plotting. This could be in a separate package!
 install_requires = ["click", "ruamel.yaml"]
 
+#  numpy: for vectorized.py, which runs sequences on arrays
+extras_require = {"numpy": ["numpy"]}
+
 license = "GPL-3"
 modname = "mult_by_const"
 py_modules = None
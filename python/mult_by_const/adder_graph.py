@@ -0,0 +1,449 @@
+# Copyright (c) 2019 by Rocky Bernstein <rb@dustyfeet.com>
+"""Adder graphs: computing several multiples of one input.
+
+An instruction sequence computes a single multiple of its input, and
+only ever has the values n, the original input, and the value before
+the last shift, around. An adder graph instead keeps every value it has
+computed, so that later values, and several different multipliers, can
+be built out of any of them.
+
+Each node of the graph is a value computed by an "add" or "subtract" of
+two earlier values, each shifted left by some amount, or by a "negate"
+or a "shift" of an earlier value. The input, whose value is 1, is
+always there. The graph's outputs are
+the multipliers wanted; each is some node's value, possibly shifted.
+
+Costs follow the CPU model: each node costs its operation plus a
+"shift" for each shifted operand, and each shifted output costs a
+"shift". Where the CPU model has a "shift_add", an "add" with one
+shifted operand can cost just that.
+
+On a two-address CPU model a shift of an operand, and a node's result,
+go where an operand was. If that value is needed afterwards, it must
+first be copied, and each "copy" adds to the cost of the graph; see
+AdderGraph.copies_needed(). As in two_address.py, the input is never
+overwritten, but it starts out with one copy of its own that may be.
+"""
+
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from mult_by_const.cpu import CPUProfile
+from mult_by_const.instruction import (
+    FACTOR_FLAG,
+    OP_R1,
+    REVERSE_SUBTRACT_1,
+    REVERSE_SUBTRACT_FACTOR,
+    Instruction,
+)
+from mult_by_const.util import consecutive_zeros, print_sep
+
+
+class AdderNode:
+    """The value `value` computed as:
+         (left << left_shift) op (right << right_shift)
+    where `op` is "add" or "subtract", or:
+         -(left << left_shift)
+    when `op` is "negate", or:
+         left << left_shift
+    when `op` is "shift". `left` and `right` are the values of earlier
+    nodes, or 1 for the input.
+    """
+
+    def __init__(
+        self,
+        value: int,
+        op: str,
+        left: int,
+        left_shift: int,
+        right: Optional[int],
+        right_shift: int,
+        cost: float,
+    ):
+        self.value = value
+        self.op = op
+        self.left = left
+        self.left_shift = left_shift
+        self.right = right
+        self.right_shift = right_shift
+        self.cost = cost
+
+    def __repr__(self):
+        left = operand_str(self.left, self.left_shift)
+        if self.op == "negate":
+            return f"r[{self.value}] = -{left}"
+        elif self.op == "shift":
+            return f"r[{self.value}] = r[{self.left}] << {self.left_shift}"
+        elif self.op == "zero":
+            return f"r[{self.value}] = 0"
+        op_str = "+" if self.op == "add" else "-"
+        right = operand_str(self.right, self.right_shift)
+        return f"r[{self.value}] = {left} {op_str} {right}"
+
+
+def operand_str(value: Optional[int], shift: int) -> str:
+    return f"(r[{value}] << {shift})" if shift else f"r[{value}]"
+
+
+def node_value(node: AdderNode, values: Dict[int, int]) -> int:
+    """Compute what `node` gives, where `values` maps each of its operands
+    to the value that operand has."""
+    if node.op == "zero":
+        return 0
+    left = values[node.left] << node.left_shift
+    if node.op == "negate":
+        return -left
+    elif node.op == "shift":
+        return left
+    assert node.right is not None
+    right = values[node.right] << node.right_shift
+    return left + right if node.op == "add" else left - right
+
+
+class AdderGraph:
+    """A set of values computed from a single input, along with the
+    multipliers, or outputs, wanted from them. See the module docstring.
+    """
+
+    def __init__(self, cpu_model: CPUProfile):
+        self.cpu_model = cpu_model
+        self.op_costs = cpu_model.costs
+        self.shift_cost = cpu_model.shift_cost_fn
+
+        # Nodes in the order they are computed, keyed by value.
+        self.nodes: Dict[int, AdderNode] = {}
+
+        # Map the odd part of each value we have to the value, so we
+        # can tell which values are shifts of those that we have. Where
+        # several values have the same odd part, we keep the smallest.
+        self.odd_values: Dict[int, int] = {1: 1}
+
+        # Each output, a multiplier, maps to the (value, shift) it is
+        # computed from.
+        self.outputs: Dict[int, Tuple[int, int]] = {}
+
+    def copy(self) -> "AdderGraph":
+        graph = AdderGraph(self.cpu_model)
+        graph.nodes = self.nodes.copy()
+        graph.odd_values = self.odd_values.copy()
+        graph.outputs = self.outputs.copy()
+        return graph
+
+    def __contains__(self, value: int) -> bool:
+        return value == 1 or value in self.nodes
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+    def values(self) -> List[int]:
+        """The values we have, starting with the input."""
+        return [1] + list(self.nodes)
+
+    def find(self, n: int) -> Optional[Tuple[int, int]]:
+        """If `n` is a shift of some value we have, return (value, shift)
+        where value << shift == n. Otherwise return None.
+        """
+        if n in self:
+            return n, 0
+        elif n == 0:
+            return None
+        shift_amount, odd = consecutive_zeros(n)
+        value = self.odd_values.get(odd)
+        if value is None:
+            return None
+        value_shift, _ = consecutive_zeros(value)
+        if value_shift > shift_amount:
+            return None
+        return value, shift_amount - value_shift
+
+    def operand_cost(self, shift_amount: int) -> float:
+        return self.shift_cost(shift_amount) if shift_amount else 0
+
+    def node_cost(self, op: str, left_shift: int, right_shift: int = 0) -> float:
+        """The cost of a node with operation `op` whose operands are
+        shifted by `left_shift` and `right_shift`.
+        """
+        if op == "shift":
+            return self.shift_cost(left_shift)
+        cost = self.op_costs[op] + self.operand_cost(left_shift) + self.operand_cost(right_shift)
+        if op == "add" and (left_shift == 0) != (right_shift == 0):
+            # A "shift_add" adds a shifted value to an unshifted one.
+            cost = min(cost, self.cpu_model.shift_add_cost(left_shift or right_shift))
+        return cost
+
+    def is_shift_add(self, node: AdderNode) -> bool:
+        """Return True if `node` is computed by a single "shift_add"."""
+        if node.op != "add" or (node.left_shift == 0) == (node.right_shift == 0):
+            return False
+        shift_amount = node.left_shift or node.right_shift
+        shift_add_cost = self.cpu_model.shift_add_cost(shift_amount)
+        return shift_add_cost <= self.op_costs["add"] + self.shift_cost(shift_amount)
+
+    def copies_needed(self) -> int:
+        """The number of register copies needed to compute the nodes and
+        then the outputs in order on a two-address CPU model, or 0 on
+        other CPU models. See the module docstring.
+        """
+        if not self.cpu_model.is_two_address():
+            return 0
+
+        # How many more times each value is read.
+        uses: Counter = Counter()
+        for node in self.nodes.values():
+            uses[node.left] += 1
+            if node.right is not None:
+                uses[node.right] += 1
+        for value, _ in self.outputs.values():
+            uses[value] += 1
+
+        # The spare copy of the input.
+        spares = Counter({1: 1})
+        copies = 0
+
+        def free_to_overwrite(value: int) -> bool:
+            return spares[value] > 0 or (value != 1 and uses[value] == 0)
+
+        def overwrite(value: int) -> None:
+            """Overwrite `value` in place, copying it first if need be."""
+            nonlocal copies
+            if spares[value]:
+                spares[value] -= 1
+            elif not free_to_overwrite(value):
+                copies += 1
+            return
+
+        for node in self.nodes.values():
+            if node.op == "zero":
+                continue
+            uses[node.left] -= 1
+            if node.op in ("negate", "shift"):
+                overwrite(node.left)
+                continue
+            assert node.right is not None
+            uses[node.right] -= 1
+            operands = [(node.left, node.left_shift), (node.right, node.right_shift)]
+            if self.is_shift_add(node):
+                # Neither operand is shifted in place.
+                operands = [(node.left, 0), (node.right, 0)]
+            else:
+                # Each shift is done in place, before the node reads its
+                # unshifted operand, if any.
+                for i, (value, shift_amount) in enumerate(operands):
+                    if shift_amount:
+                        other, other_shift = operands[1 - i]
+                        pending = i == 0 or not other_shift
+                        uses[other] += pending
+                        overwrite(value)
+                        uses[other] -= pending
+                    pass
+
+            # The result goes where the left operand was, or for an "add"
+            # either one. A shifted operand is there to be overwritten.
+            places = operands if node.op == "add" else operands[:1]
+            if any(shift_amount for _, shift_amount in places):
+                continue
+            free = [value for value, _ in places if free_to_overwrite(value)]
+            overwrite(free[0] if free else places[0][0])
+            pass
+
+        # Shifted outputs are shifted in place after the nodes are done.
+        for value, shift_amount in self.outputs.values():
+            if shift_amount:
+                uses[value] -= 1
+                overwrite(value)
+        return copies
+
+    def add_node(
+        self,
+        op: str,
+        left: int,
+        left_shift: int,
+        right: Optional[int] = None,
+        right_shift: int = 0,
+    ) -> Tuple[int, float]:
+        """Add a node computing `op` on the given operands, which must be
+        values we have. Return the value of the node and its cost. If we
+        already have that value, nothing is added and the cost is 0.
+        """
+        assert left in self, f"operand {left} is not in the graph"
+        if op == "negate":
+            value = -(left << left_shift)
+        elif op == "shift":
+            value = left << left_shift
+        else:
+            assert right is not None and right in self, f"operand {right} is not in the graph"
+            if op == "add":
+                value = (left << left_shift) + (right << right_shift)
+            else:
+                value = (left << left_shift) - (right << right_shift)
+        if value in self:
+            return value, 0
+        cost = self.node_cost(op, left_shift, right_shift)
+        self.nodes[value] = AdderNode(value, op, left, left_shift, right, right_shift, cost)
+        if value != 0:
+            odd = value >> consecutive_zeros(value)[0]
+            previous = self.odd_values.get(odd)
+            if previous is None or abs(value) < abs(previous):
+                self.odd_values[odd] = value
+        return value, cost
+
+    def add_output(self, n: int) -> float:
+        """Make `n`, which must be a shift of some value we have, an output.
+        Return the cost of doing so, which is that of the shift if any.
+        """
+        if n in self.outputs:
+            return 0
+        found = self.find(n)
+        assert found is not None, f"{n} is not a shift of a value in the graph"
+        self.outputs[n] = found
+        return self.operand_cost(found[1])
+
+    def add_sequence(self, instrs: List[Instruction]) -> Tuple[int, float]:
+        """Add the values computed by the instruction sequence `instrs` to
+        the graph, reusing any values we already have. Return the
+        multiplier that `instrs` computes and the cost of the nodes added.
+        Shifts are folded into the operands of the nodes that use them.
+        Copies are dropped: which ones the graph needs depends on the
+        whole graph, and cost() counts them.
+        """
+        cost: float = 0
+
+        # n is base << pending; m, the value before the last shift, is
+        # m_base << m_shift.
+        base, pending = 1, 0
+        m_base, m_shift = 1, 0
+        for instr in instrs:
+            value = None
+            if instr.op == "shift":
+                m_base, m_shift = base, pending
+                pending += instr.amount
+                continue
+            elif instr.op == "shift_add":
+                m_base, m_shift = base, pending
+                value, node_cost = self.add_node("add", base, pending + instr.amount, base, pending)
+            elif instr.op in ("add", "subtract"):
+                if instr.amount == OP_R1:
+                    value, node_cost = self.add_node(instr.op, base, pending, 1, 0)
+                elif instr.amount == FACTOR_FLAG:
+                    value, node_cost = self.add_node(instr.op, base, pending, m_base, m_shift)
+                elif instr.amount == REVERSE_SUBTRACT_1:
+                    value, node_cost = self.add_node("subtract", 1, 0, base, pending)
+                elif instr.amount == REVERSE_SUBTRACT_FACTOR:
+                    value, node_cost = self.add_node("subtract", m_base, m_shift, base, pending)
+                else:
+                    raise RuntimeError(f"Unknown {instr.op} flag in {instr}")
+            elif instr.op == "negate":
+                value, node_cost = self.add_node("negate", base, pending)
+            elif instr.op == "zero":
+                value, node_cost = 0, 0
+                if 0 not in self.nodes:
+                    node_cost = self.op_costs["zero"]
+                    self.nodes[0] = AdderNode(0, "zero", 1, 0, None, 0, node_cost)
+            elif instr.op in ("nop", "copy"):
+                continue
+            else:
+                raise RuntimeError(f"Unknown operation in {instr}")
+            cost += node_cost
+            found = self.find(value)
+            assert found is not None
+            base, pending = found
+            pass
+        return base << pending, cost
+
+    def cost(self) -> float:
+        """The total cost of computing all of the nodes and outputs,
+        including any copies they need."""
+        cost = sum(node.cost for node in self.nodes.values())
+        cost += self.copies_needed() * self.op_costs["copy"]
+        return cost + sum(self.operand_cost(shift) for _, shift in self.outputs.values())
+
+    def evaluate(self, x: int) -> Dict[int, int]:
+        """Run the graph on input `x`. Return a dictionary mapping each
+        output multiplier to what the graph computes for it.
+        """
+        values = {1: x}
+        for value, node in self.nodes.items():
+            values[value] = node_value(node, values)
+        return {n: values[value] << shift_amount for n, (value, shift_amount) in self.outputs.items()}
+
+    def registers_needed(self) -> int:
+        """The number of registers needed to compute the nodes in order,
+        including the one holding the input. A value is kept from when
+        it is computed until its last use; outputs are kept to the end.
+        A node's result can go in the register of an operand that isn't
+        used afterwards.
+        """
+        order = [1] + list(self.nodes)
+        last_use = {value: len(order) if value in self.outputs else i for i, value in enumerate(order)}
+        for i, node in enumerate(self.nodes.values(), 1):
+            for operand in (node.left, node.right):
+                if operand is not None and last_use[operand] < i:
+                    last_use[operand] = i
+        for value, _ in self.outputs.values():
+            last_use[value] = len(order)
+
+        needed = 1
+        for i in range(1, len(order)):
+            live_before = sum(1 for value in order[:i] if last_use[value] >= i)
+            live_after = sum(1 for value in order[: i + 1] if last_use[value] > i)
+            needed = max(needed, live_before, live_after)
+        return needed
+
+    def check(self) -> None:
+        """Check that each node is computed from earlier ones and has the
+        value that it says, and that each output is what it says."""
+        values = {1: 1}
+        for value, node in self.nodes.items():
+            for operand in (node.left, node.right):
+                assert operand is None or operand in values, f"{node}: operand {operand} not computed yet"
+            computed = node_value(node, values)
+            assert computed == value, f"{node} computes {computed}"
+            values[value] = value
+            pass
+        for n, (value, shift_amount) in self.outputs.items():
+            assert value in values and value << shift_amount == n, f"output {n} is wrong"
+        return
+
+
+def check_graph_cost(cost: float, graph: AdderGraph) -> None:
+    """Check that the cost of `graph`, recomputed from the CPU model, is `cost`."""
+    actual_cost: float = 0
+    for node in graph.nodes.values():
+        node_cost = graph.op_costs[node.op] if node.op == "zero" else graph.node_cost(
+            node.op, node.left_shift, node.right_shift
+        )
+        assert node.cost == node_cost, f"{node} costs {node_cost}, not {node.cost}"
+        actual_cost += node_cost
+    actual_cost += sum(graph.operand_cost(shift) for _, shift in graph.outputs.values())
+    actual_cost += graph.copies_needed() * graph.op_costs["copy"]
+    assert cost == actual_cost, f"graph cost is {actual_cost}; expecting {cost}"
+    return
+
+
+def print_graph(graph: AdderGraph) -> None:
+    """Print the nodes and outputs of `graph` in a nice, understandable way."""
+    print_sep("-")
+    print(f"Adder graph for {sorted(graph.outputs)}, cost: {graph.cost()}:")
+    for node in graph.nodes.values():
+        print(f"{repr(node) + ';':40}cost: {node.cost:2}")
+    for n, (value, shift_amount) in graph.outputs.items():
+        print(f"{n:9}: {operand_str(value, shift_amount)}")
+    copies = graph.copies_needed()
+    if copies:
+        print(f"{copies} register copies, cost: {copies * graph.op_costs['copy']}")
+    print_sep()
+    return
+
+
+if __name__ == "__main__":
+    from mult_by_const.cpu import DEFAULT_CPU_PROFILE
+    from mult_by_const.instruction import str2instructions
+
+    graph = AdderGraph(DEFAULT_CPU_PROFILE)
+    # 45 = 5 * 9 and 85 = 5 * 17 share 5.
+    for instrs in ("[n<<2, n+1, n<<3, n+m]", "[n<<2, n+1, n<<4, n+m]"):
+        n, cost = graph.add_sequence(str2instructions(instrs))
+        graph.add_output(n)
+        print(f"{n} adds cost {cost}")
+    graph.check()
+    print_graph(graph)
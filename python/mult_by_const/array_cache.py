@@ -0,0 +1,235 @@
+# Copyright (c) 2019 by Rocky Bernstein <rb@dustyfeet.com>
+"""A multiplication-sequence cache kept in typed arrays.
+
+MultCache keeps a dictionary of 4-tuples, each with a list of
+Instruction objects. With the dictionary slot, the tuple, the floats,
+the list and its instructions, an entry takes hundreds of bytes, which
+is too much to keep tables of millions of numbers around.
+
+ArrayMultCache keeps the entries for the numbers in a range given when
+it is made in arrays indexed by the number: lower and upper bounds as
+doubles, and a byte saying whether there is an entry and if it is
+finished. Instruction sequences are packed one after another into a
+side buffer: each instruction is its operation and amount encoded in
+a 64-bit integer, see encode_instruction(), plus its cost as a
+double. An entry records where its sequence starts in the buffer and
+how long it is. Numbers outside the range go in a dictionary, as in
+MultCache.
+
+The arrays sit behind ArrayCacheEntries, a mapping with the same keys
+and values as MultCache.cache. So ArrayMultCache is a MultCache whose
+"cache" is that mapping, and everything that works with a MultCache,
+__getitem__(), insert_or_update(), update_field(), dump() and so on,
+works with it. Values are turned back into tuples and Instruction
+objects as they are looked up.
+
+A sequence that is replaced leaves its old instructions in the buffer.
+When there is more of that than sequences still in use, and more than
+numbers in the range, the buffer is compacted.
+"""
+
+from array import array
+from typing import Dict, Iterator, List, MutableMapping, Optional
+
+from mult_by_const.cache import CacheEntry, MultCache
+from mult_by_const.cpu import DEFAULT_CPU_PROFILE, inf_cost
+from mult_by_const.instruction import Instruction, decode_instruction, encode_instruction
+
+# Values of "state": no entry, an entry that is not finished, or one that is.
+EMPTY, UNFINISHED, FINISHED = 0, 1, 2
+
+# The length recorded for an entry without an instruction sequence.
+NO_INSTRUCTIONS = -1
+
+# inf_cost is an integer that a double can't hold exactly; it is stored as this.
+INF_DOUBLE = float(inf_cost)
+
+
+def stored_cost(cost: float) -> float:
+    """Return the cost that was stored in an array as `cost`. Costs are
+    mostly whole numbers, and are given back as such."""
+    if cost == INF_DOUBLE:
+        return inf_cost
+    elif cost.is_integer():
+        return int(cost)
+    return cost
+
+
+class ArrayCacheEntries(MutableMapping):
+    """A mapping from numbers to cache entries, (lower, upper, finished,
+    instructions), that keeps those for numbers in range(`start`, `stop`)
+    in arrays and the rest in a dictionary."""
+
+    def __init__(self, start: int, stop: int):
+        if stop < start:
+            raise ValueError(f"cache range start {start} is after stop {stop}")
+        self.start = start
+        self.stop = stop
+        size = stop - start
+        self.lower = array("d", bytes(8 * size))
+        self.upper = array("d", bytes(8 * size))
+        self.state = array("b", bytes(size))
+        self.offset = array("q", bytes(8 * size))
+        self.length = array("l", bytes(array("l").itemsize * size))
+
+        # The packed instructions of all sequences, and their costs.
+        self.codes = array("q")
+        self.costs = array("d")
+
+        # How much of "codes" belongs to sequences that were replaced.
+        self.garbage = 0
+
+        self.in_range = 0
+        self.other: Dict[int, CacheEntry] = {}
+
+    def __contains__(self, n) -> bool:
+        if self.start <= n < self.stop:
+            return self.state[n - self.start] != EMPTY
+        return n in self.other
+
+    def __getitem__(self, n: int) -> CacheEntry:
+        if not (self.start <= n < self.stop):
+            return self.other[n]
+        i = n - self.start
+        state = self.state[i]
+        if state == EMPTY:
+            raise KeyError(n)
+        return stored_cost(self.lower[i]), stored_cost(self.upper[i]), state == FINISHED, self.instructions(i)
+
+    def get(self, n, default=None):
+        if n in self:
+            return self[n]
+        return default
+
+    def __setitem__(self, n: int, entry: CacheEntry) -> None:
+        if not (self.start <= n < self.stop):
+            self.other[n] = entry
+            return
+        i = n - self.start
+        lower, upper, finished, instrs = entry
+        if self.state[i] == EMPTY:
+            self.in_range += 1
+        else:
+            self.garbage += max(self.length[i], 0)
+        self.lower[i] = lower
+        self.upper[i] = upper
+        self.state[i] = FINISHED if finished else UNFINISHED
+        if instrs is None:
+            self.offset[i], self.length[i] = 0, NO_INSTRUCTIONS
+        else:
+            self.offset[i], self.length[i] = len(self.codes), len(instrs)
+            for instr in instrs:
+                self.codes.append(encode_instruction(instr))
+                self.costs.append(instr.cost)
+                pass
+            pass
+        # Compacting goes over every number in the range, so we wait until
+        # there is at least that much to gain.
+        if self.garbage > max(len(self.codes) - self.garbage, self.stop - self.start):
+            self.compact()
+
+    def __delitem__(self, n: int) -> None:
+        if not (self.start <= n < self.stop):
+            del self.other[n]
+            return
+        i = n - self.start
+        if self.state[i] == EMPTY:
+            raise KeyError(n)
+        self.garbage += max(self.length[i], 0)
+        self.state[i] = EMPTY
+        self.in_range -= 1
+
+    def __iter__(self) -> Iterator[int]:
+        for i, state in enumerate(self.state):
+            if state != EMPTY:
+                yield self.start + i
+            pass
+        yield from self.other
+
+    def __len__(self) -> int:
+        return self.in_range + len(self.other)
+
+    def instructions(self, i: int) -> Optional[List[Instruction]]:
+        """Return the instruction sequence of the entry at index `i`."""
+        length = self.length[i]
+        if length == NO_INSTRUCTIONS:
+            return None
+        offset = self.offset[i]
+        return [
+            decode_instruction(code, stored_cost(cost))
+            for code, cost in zip(
+                self.codes[offset : offset + length], self.costs[offset : offset + length]  # noqa
+            )
+        ]
+
+    def compact(self) -> None:
+        """Rebuild the instruction buffer with only the sequences in use."""
+        codes, costs = array("q"), array("d")
+        for i, state in enumerate(self.state):
+            length = self.length[i]
+            if state != EMPTY and length > 0:
+                offset = self.offset[i]
+                self.offset[i] = len(codes)
+                codes.extend(self.codes[offset : offset + length])  # noqa
+                costs.extend(self.costs[offset : offset + length])  # noqa
+            pass
+        self.codes, self.costs = codes, costs
+        self.garbage = 0
+
+    def nbytes(self) -> int:
+        """Return the number of bytes the arrays take up. Entries outside
+        the range aren't counted."""
+        arrays = (self.lower, self.upper, self.state, self.offset, self.length, self.codes, self.costs)
+        return sum(a.itemsize * len(a) for a in arrays)
+
+
+class ArrayMultCache(MultCache):
+    """A MultCache that keeps the entries for numbers in
+    range(`start`, `stop`) in arrays; see ArrayCacheEntries."""
+
+    def __init__(self, cpu_profile=DEFAULT_CPU_PROFILE, start: int = -1, stop: int = 1, *args, **kwargs):
+        self.start = start
+        self.stop = stop
+        super().__init__(cpu_profile, *args, **kwargs)
+
+    def clear(self) -> None:
+        super().clear()
+        entries = ArrayCacheEntries(self.start, self.stop)
+        entries.update(self.cache)
+        self.cache = entries
+
+    def nbytes(self) -> int:
+        """Return the number of bytes the arrays take up."""
+        assert isinstance(self.cache, ArrayCacheEntries)
+        return self.cache.nbytes()
+
+
+if __name__ == "__main__":
+    import sys
+    from time import perf_counter
+
+    from mult_by_const.dp_method import dp_table
+    from mult_by_const.mult import MultConst
+
+    to = 100000
+    for compact in (False, True):
+        mconst = MultConst()
+        if compact:
+            mconst.mult_cache = ArrayMultCache(mconst.cpu_model, -1, to + 1)
+        start = perf_counter()
+        dp_table(mconst, to)
+        mcache = mconst.mult_cache
+        if isinstance(mcache, ArrayMultCache):
+            size = mcache.nbytes()
+        else:
+            size = sys.getsizeof(mcache.cache)
+            for entry in mcache.cache.values():
+                size += sys.getsizeof(entry) + sys.getsizeof(entry[3])
+                for instr in entry[3] or []:
+                    size += sys.getsizeof(instr)
+                pass
+            pass
+        print(
+            f"{type(mcache).__name__}: {len(mcache)} entries, "
+            f"about {size // len(mcache)} bytes each, {perf_counter() - start:.2f}s"
+        )
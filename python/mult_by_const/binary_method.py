@@ -1,12 +1,13 @@
 """
 Multiplication using the binary method representation of a number.
 """
-from typing import List, Tuple
+from typing import List, Sequence, Tuple
 
 from mult_by_const.cpu import inf_cost
 from mult_by_const.instruction import OP_R1, REVERSE_SUBTRACT_1, Instruction
-from mult_by_const.util import bin2str, consecutive_ones
+from mult_by_const.util import consecutive_ones
 from mult_by_const.multclass import MultConstClass
+from mult_by_const.sequence import EMPTY_SEQUENCE, as_list, as_sequence
 
 def binary_sequence(self: MultConstClass, n: int) -> Tuple[float, List[Instruction]]:
     """Returns the cost and operation sequence using the binary
@@ -56,16 +57,21 @@ def binary_sequence(self: MultConstClass, n: int) -> Tuple[float, List[Instructi
 
     cache_lower, cache_upper, finished, cache_instr = self.mult_cache[n]
     if finished:
-        return (cache_upper, cache_instr)
+        return (cache_upper, as_list(cache_instr))
 
-    return binary_sequence_inner(self, n)
+    cost, instrs = binary_sequence_inner(self, n)
+    return cost, as_list(instrs)
 
 
-def binary_sequence_inner(self: MultConstClass, n: int) -> Tuple[float, List[Instruction]]:  # noqa: C901
+def binary_sequence_inner(self: MultConstClass, n: int) -> Tuple[float, Sequence[Instruction]]:  # noqa: C901
 
-    def append_instrs(cache_instrs: List[Instruction], bin_instrs, cache_upper: float) -> float:
-        cache_instrs.reverse()  # Because we compute in reverse order here
-        bin_instrs += cache_instrs
+    # The sequence cached for the number we stop at; bin_instrs, in reverse
+    # order, goes on the end of it.
+    start: Sequence[Instruction] = EMPTY_SEQUENCE
+
+    def append_instrs(cache_instrs: Sequence[Instruction], bin_instrs, cache_upper: float) -> float:
+        nonlocal start
+        start = cache_instrs
         return cache_upper
 
     if n == 0:
@@ -83,13 +89,25 @@ def binary_sequence_inner(self: MultConstClass, n: int) -> Tuple[float, List[Ins
 
         if need_negation:
             cache_lower, cache_upper, finished, cache_instrs = self.mult_cache[-n]
-            if cache_upper < inf_cost:
+            if (
+                cache_upper < inf_cost
+                and self.cpu_model.can_subtract()
+                and self.fits_registers(cache_instrs, bin_instrs[::-1])
+            ):
+                # Going on from -n, the adds of 1 below it become
+                # subtracts and the other way around.
+                for i, instr in enumerate(bin_instrs):
+                    if instr.op in ("add", "subtract") and instr.amount == OP_R1:
+                        op_name = "subtract" if instr.op == "add" else "add"
+                        cost += self.op_costs[op_name] - instr.cost
+                        bin_instrs[i] = Instruction(op_name, OP_R1, self.op_costs[op_name])
+                    pass
                 cost += append_instrs(cache_instrs, bin_instrs, cache_upper)
                 need_negation = False
                 break
 
         cache_lower, cache_upper, finished, cache_instrs = self.mult_cache[n]
-        if cache_upper < inf_cost:
+        if cache_upper < inf_cost and self.fits_registers(cache_instrs, bin_instrs[::-1]):
 
             # If we were given a positive number, then we are done.
             # However if we were given a negative number, then from the
@@ -111,7 +129,10 @@ def binary_sequence_inner(self: MultConstClass, n: int) -> Tuple[float, List[Ins
         try_reverse_subtract = need_negation and self.cpu_model.subtract_can_negate()
         if self.cpu_model.can_subtract() and (one_run_count > 2 or try_reverse_subtract):
             if try_reverse_subtract:
-                cost += self.add_instruction(bin_instrs, "subtract", REVERSE_SUBTRACT_1)
+                op_cost, op_instrs = self.op_instrs("subtract", REVERSE_SUBTRACT_1)
+                op_instrs.reverse()  # Because we compute in reverse order here
+                bin_instrs += op_instrs
+                cost += op_cost
                 need_negation = False
             else:
                 cost += self.add_instruction(bin_instrs, "subtract", OP_R1)
@@ -129,11 +150,11 @@ def binary_sequence_inner(self: MultConstClass, n: int) -> Tuple[float, List[Ins
     if need_negation:
         cost += self.add_instruction(bin_instrs, "negate", OP_R1)
 
-    self.debug_msg(
-        f"binary method for {orig_n} = {bin2str(orig_n)} has cost {cost}"
-    )
-    self.mult_cache.update_sequence_partials(bin_instrs)
-    return (cost, bin_instrs)
+    if self.tracer is not None:
+        self.tracer.sequence_computed("binary", orig_n, cost)
+    instrs = as_sequence(start) + bin_instrs
+    self.mult_cache.update_sequence_partials(instrs)
+    return (cost, instrs)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,41 @@
+# Copyright (c) 2019 by Rocky Bernstein <rb@dustyfeet.com>
+"""Limits on how much searching is done.
+
+Searching for large multipliers can take a long time. A SearchBudget
+caps the wall-clock time and/or the number of alpha-beta search nodes
+expanded. Once the budget runs out, the remaining search nodes are cut
+off, so the search unwinds quickly with the best sequence found so far.
+Results found after running out are recorded in the multiplication
+cache as unfinished, so that a later search with a bigger budget picks
+up from there.
+"""
+
+from time import perf_counter
+from typing import Optional
+
+
+class SearchBudget:
+    """A wall-clock `time_budget` in seconds and/or a `node_budget`, the
+    number of alpha-beta search nodes that may be expanded. A budget of
+    None is unlimited.
+    """
+
+    def __init__(self, time_budget: Optional[float] = None, node_budget: Optional[int] = None):
+        self.deadline = None if time_budget is None else perf_counter() + time_budget
+        self.nodes_left = node_budget
+        self.exhausted = False
+
+    def spend(self) -> bool:
+        """Charge for expanding a search node. Return True if the
+        budget has run out, in which case the node should not be expanded.
+        """
+        if self.exhausted:
+            return True
+        if self.nodes_left is not None:
+            if self.nodes_left <= 0:
+                self.exhausted = True
+                return True
+            self.nodes_left -= 1
+        if self.deadline is not None and perf_counter() >= self.deadline:
+            self.exhausted = True
+        return self.exhausted
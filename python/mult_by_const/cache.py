@@ -1,6 +1,8 @@
 # Copyright (c) 2019 by Rocky Bernstein <rb@dustyfeet.com>
 """A multiplication-sequence cache module"""
-from typing import Any, Dict, List, Optional, Tuple
+import heapq
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, MutableMapping, Optional, Sequence, Tuple
 
 from mult_by_const.cpu import inf_cost, DEFAULT_CPU_PROFILE
 
@@ -9,21 +11,112 @@ from mult_by_const.instruction import (
     check_instruction_sequence_value,
     Instruction,
     instruction_sequence_cost,
+    partial_products,
     OP_R1,
     FACTOR_FLAG,
     REVERSE_SUBTRACT_1,
     REVERSE_SUBTRACT_FACTOR,
 )
 
+from mult_by_const.registers import register_count
+from mult_by_const.sequence import EMPTY_SEQUENCE, InstructionSequence, as_sequence
 from mult_by_const.version import VERSION
 
+# A cache entry is: lower bound, upper bound, "finished" boolean, and an
+# upper-bound instruction sequence. The sequence is kept as an
+# InstructionSequence, which shares its beginning with the sequences of
+# other entries; see sequence.py.
+CacheEntry = Tuple[float, float, bool, Optional[Sequence[Instruction]]]
+
+# A Pareto front entry is: cost, latency, registers needed, and the
+# instruction sequence. See pareto.py.
+FrontEntry = Tuple[float, float, int, List[Instruction]]
+
+# The number of numbers without a sequence that MultCache keeps lower
+# bounds for by default.
+PARTIAL_BOUNDS_SIZE = 10000
+
+# A MultCache with a limit on its entries never evicts those for numbers
+# whose absolute value is less than this, 0, 1 and -1 among them. Sequences
+# for bigger numbers are built from them.
+PINNED_BELOW = 256
+
+# When a MultCache with a limit on its entries is full, it evicts this
+# fraction of them at once, so that choosing what to evict, which goes
+# over all entries, isn't done on every insert.
+EVICTION_FRACTION = 8
+
+
+class PartialBounds:
+    """Lower bounds on the cost of numbers that have been looked up but
+    that we have no instruction sequence for, the most recently used
+    `maxsize` of them, keyed by number.
+
+    The search looks up many neighbors and factor quotients that it
+    never finds a sequence for. Keeping these apart from MultCache's
+    entries keeps its entries to those with sequences, and puts a limit
+    on how many of the others we hold on to.
+    """
+
+    def __init__(self, maxsize: int = PARTIAL_BOUNDS_SIZE):
+        self.maxsize = maxsize
+        self.bounds: "OrderedDict[int, float]" = OrderedDict()
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self.bounds)
+
+    def __contains__(self, n: int) -> bool:
+        return n in self.bounds
+
+    def clear(self) -> None:
+        self.bounds.clear()
+        self.evictions = 0
+
+    def get(self, n: int) -> Optional[float]:
+        """Return the lower bound for `n`, or None if we don't have `n`."""
+        lower = self.bounds.get(n)
+        if lower is not None:
+            self.bounds.move_to_end(n)
+        return lower
+
+    def raise_bound(self, n: int, lower: float) -> None:
+        """Record `lower` for `n` if it is more than what we have,
+        dropping the least recently used number if we are full."""
+        if n in self.bounds:
+            self.bounds.move_to_end(n)
+            if lower <= self.bounds[n]:
+                return
+        self.bounds[n] = lower
+        if len(self.bounds) > self.maxsize:
+            self.bounds.popitem(last=False)
+            self.evictions += 1
+
+    def pop(self, n: int) -> float:
+        """Remove `n`, returning its lower bound, or 0 if we didn't have it."""
+        return self.bounds.pop(n, 0)
+
 
 class MultCache:
     """A multiplication-sequence cache object"""
 
-    def __init__(self, cpu_profile=DEFAULT_CPU_PROFILE, *args, **kwargs):
+    def __init__(
+        self,
+        cpu_profile=DEFAULT_CPU_PROFILE,
+        *args,
+        partial_size: int = PARTIAL_BOUNDS_SIZE,
+        max_entries: Optional[int] = None,
+        pinned_below: int = PINNED_BELOW,
+        **kwargs,
+    ):
         self.version = VERSION
         self.cpu_profile = cpu_profile
+        self.partial_size = partial_size
+
+        # If "max_entries" is given, we evict entries to keep to that many,
+        # other than those pinned; see evict().
+        self.max_entries = max_entries
+        self.pinned_below = pinned_below
         self.clear()
 
     def keys(self):
@@ -69,21 +162,43 @@ class MultCache:
                 ), f"{lower} <= {instruction_sequence_cost(instrs)} <= {upper} for {instrs}"
         return
 
+    def registers(self, n: int) -> Optional[int]:
+        """Return the most registers the cached sequence for `n` needs at
+        once, or None if there is no sequence; see registers.py."""
+        instrs = self.cache[n][3] if n in self.cache else None
+        return register_count(instrs) if instrs else None
+
     def clear(self) -> None:
         """Reset the multiplication cache, and cache statistics to an initial state.
         The inital state, has constants 0 and 1 preloaded.
         """
         # Dictionaries keys in Python 3.8+ are in given in insertion order,
         # so we should insert 0 before 1.
-        self.cache: Dict[int, Tuple[float, float, bool, Optional[List[Instruction]]]] = {
-            1: (0, 0, True, [Instruction("nop", 0, self.cpu_profile.costs["nop"])]),
+        self.cache: MutableMapping[int, CacheEntry] = {
+            1: (0, 0, True, as_sequence([Instruction("nop", 0, self.cpu_profile.costs["nop"])])),
         }
 
         for num, name in ((0, "zero"), (-1, "negate")):
             cost: float = self.cpu_profile.costs.get(name, inf_cost)
-            insts: Optional[List[Any]] = [Instruction(name, 0, cost)] if cost != inf_cost else None
+            insts = as_sequence([Instruction(name, 0, cost)]) if cost != inf_cost else None
             self.cache[num] = (cost, cost, True, insts)
 
+        # Pareto fronts, found by pareto.find_pareto_front(). A number can
+        # have several sequences here, each better than the others in
+        # some way.
+        self.fronts: Dict[int, List[FrontEntry]] = {}
+
+        # Numbers that have been looked up, but that we have no sequence
+        # for; see PartialBounds.
+        self.partial = PartialBounds(self.partial_size)
+
+        # With a limit on entries, how often each entry was looked up,
+        # and how many entries were evicted; see evict().
+        self.entry_hits: Dict[int, int] = {}
+        self.evict_above = self.max_entries
+        self.evictions = 0
+        self.evictions_unfinished = 0
+
         # The following help with search statistics
         self.hits_exact = 0
         self.hits_partial = 0
@@ -95,9 +210,46 @@ class MultCache:
         lower: float,
         upper: float,
         finished: bool,
-        instrs: List[Instruction],
+        instrs: Sequence[Instruction],
     ) -> None:
-        self.cache[n] = (lower, upper, finished, instrs[:])
+        self.partial.pop(n)
+        self.cache[n] = (lower, upper, finished, self.shared_sequence(instrs))
+        self.make_room()
+
+    def shared_sequence(self, instrs: Sequence[Instruction]) -> InstructionSequence:
+        """Return `instrs` as an InstructionSequence. Where a beginning of
+        `instrs` is the sequence cached for the number it computes, that
+        sequence is used rather than a copy of it.
+        """
+        if isinstance(instrs, InstructionSequence):
+            return instrs
+        prefix: Optional[InstructionSequence] = None
+        products = partial_products(instrs)
+        for instr in instrs:
+            # Nothing is computed after a "zero"; we just copy the rest.
+            n = next(products, None)
+            entry = self.cache.get(n) if n is not None else None
+            cached = entry[3] if entry is not None else None
+            if (
+                isinstance(cached, InstructionSequence)
+                and cached.parent is prefix
+                and (cached.last is instr or cached.last == instr)
+            ):
+                prefix = cached
+            else:
+                prefix = InstructionSequence(prefix, instr)
+            pass
+        return prefix if prefix is not None else EMPTY_SEQUENCE
+
+    def insert_front(self, n: int, front: List[FrontEntry]) -> None:
+        """Cache `front`, the Pareto front for `n`; see pareto.py."""
+        self.fronts[n] = [(cost, latency, registers, instrs[:]) for cost, latency, registers, instrs in front]
+
+    def front(self, n: int) -> Optional[List[FrontEntry]]:
+        """Return the Pareto front cached for `n`, or None if there is none."""
+        if n not in self.fronts:
+            return None
+        return [(cost, latency, registers, instrs[:]) for cost, latency, registers, instrs in self.fronts[n]]
 
     def insert_or_update(
         self,
@@ -105,7 +257,7 @@ class MultCache:
         lower: float,
         upper: float,
         finished: bool,
-        instrs: List[Instruction],
+        instrs: Sequence[Instruction],
     ) -> None:
         """Insert value if it is not in cache or if the upper value is less than what is currently cached.
         """
@@ -122,28 +274,43 @@ class MultCache:
 
     def __getitem__(
         self, n: int, record=True
-    ) -> Tuple[float, float, bool, Optional[List[Instruction]]]:
+    ) -> Tuple[float, float, bool, Optional[InstructionSequence]]:
         """Check if we have cached search results for "n", and return that.
-        If not in cached, we will return (0, 0, {}). Note that a prior
-        result has been fully only searched if if the lower bound is equal to the
-        upper bound.
+        If not in cached, we will return (lower, inf_cost, False, []), where
+        "lower" is the best lower bound we have seen for "n", if any.
+        Note that a prior result has been fully only searched if if the
+        lower bound is equal to the upper bound.
+
+        The instruction sequence is the cache's own. It can't be changed,
+        so it isn't copied.
+
+        Looking up a number that isn't cached doesn't add an entry for
+        it; the number goes in "partial" instead.
         """
-        cache_lower, cache_upper, finished, cache_instrs = self.cache.get(
-            n, (0, inf_cost, False, [])
-        )
+        entry = self.cache.get(n)
+        if entry is None:
+            partial_lower = self.partial.get(n)
+            if partial_lower is None:
+                if record:
+                    self.misses += 1
+                self.partial.raise_bound(n, 0)
+                partial_lower = 0
+            elif record:
+                self.hits_partial += 1
+            return partial_lower, inf_cost, False, EMPTY_SEQUENCE
+
+        cache_lower, cache_upper, finished, cache_instrs = entry
         if record:
+            if self.max_entries is not None:
+                self.entry_hits[n] = self.entry_hits.get(n, 0) + 1
             if finished:
                 self.hits_exact += 1
-            elif n not in self.cache:
-                self.misses += 1
             else:
                 # FIXME: should we split out the case where there is *no*
                 # information, but key has been seen as opposed to the
                 # case where there not *complete* information?
                 self.hits_partial += 1
-        self.cache[n] = (cache_lower, cache_upper, finished, cache_instrs)
-        instrs = cache_instrs[:] if cache_instrs is not None else None
-        return cache_lower, cache_upper, finished, instrs
+        return cache_lower, cache_upper, finished, as_sequence(cache_instrs)
 
     def update_field(
         self,
@@ -161,11 +328,19 @@ class MultCache:
         the cached entry, and "finished" is is None (unknown) as opposed
         to "False" or "True", then it is set "True".
 
+        Until "n" has an instruction sequence, only its lower bound is
+        kept, in "partial".
+
         See also "insert" or "insert_or_update"
         """
-        cache_lower, cache_upper, cache_finished, cache_instrs = self.cache.get(
-            n, (0, inf_cost, False, [])
-        )
+        entry = self.cache.get(n)
+        if entry is None:
+            if upper is None or upper == inf_cost:
+                if lower is not None:
+                    self.partial.raise_bound(n, lower)
+                return
+            entry = (self.partial.pop(n), inf_cost, False, EMPTY_SEQUENCE)
+        cache_lower, cache_upper, cache_finished, cache_instrs = entry
         worse = True
 
         # FIXME: Give warnings for any of the below?
@@ -177,24 +352,98 @@ class MultCache:
             if upper < cache_lower:
                 cache_lower = upper
             worse = False
+        if finished and not cache_finished and cache_instrs and worse:
+            # The sequence may have been cached before the numbers it goes
+            # through were; share their sequences now that it is final.
+            cache_instrs = self.shared_sequence(list(cache_instrs))
         if finished is not None and not cache_finished:
             cache_finished = finished
         if instrs is not None and not worse:
-            cache_instrs = instrs[:]
+            cache_instrs = self.shared_sequence(instrs)
         if finished is None and not worse:
             cache_finished = True
             cache_lower = cache_upper
         self.cache[n] = (cache_lower, cache_upper, cache_finished, cache_instrs)
+        self.make_room()
+
+    def make_room(self) -> None:
+        """Evict entries if we have more than "max_entries"."""
+        if self.evict_above is not None and len(self.cache) > self.evict_above:
+            self.evict()
+
+    def evict(self) -> None:
+        """Evict entries to get below "max_entries" by a fraction of it;
+        see EVICTION_FRACTION. Entries for numbers below "pinned_below" in
+        absolute value are kept. Of the rest, unfinished entries go before
+        finished ones, and then those looked up least often, and then
+        those for the biggest numbers.
+
+        Sequences share their beginnings with the entries they were built
+        from, so those beginnings stay in memory while a sequence that
+        uses them is still around.
+        """
+        assert self.max_entries is not None
+        batch = max(self.max_entries // EVICTION_FRACTION, 1)
+        count = len(self.cache) - self.max_entries + batch
+        candidates = [
+            (finished, self.entry_hits.get(n, 0), -abs(n), n)
+            for n, (_, _, finished, _) in self.cache.items()
+            if abs(n) >= self.pinned_below
+        ]
+        for finished, _, _, n in heapq.nsmallest(count, candidates):
+            del self.cache[n]
+            self.entry_hits.pop(n, None)
+            self.evictions += 1
+            if not finished:
+                self.evictions_unfinished += 1
+            pass
+
+        # If the pinned entries alone are more than "max_entries", we
+        # wait for another batch of entries before evicting again.
+        self.evict_above = max(self.max_entries, len(self.cache) + batch)
 
-    def update_sequence_partials(self, instrs: List[Instruction]) -> None:  # noqa: C901
+    def merge(self, entries: Iterable[Tuple[int, CacheEntry]]) -> None:
+        """Merge in (n, cache entry) pairs, say from a cache built in
+        another process. A finished entry is preferred over an unfinished
+        one, and otherwise the entry with the lower upper bound is kept.
+        For unfinished entries, we also keep the larger of the lower bounds.
+        """
+        for n, entry in entries:
+            lower, upper, finished, instrs = entry
+            entry = (lower, upper, finished, self.shared_sequence(instrs) if instrs is not None else None)
+            instrs = entry[3]
+            if n not in self.cache:
+                self.cache[n] = entry
+                continue
+            cache_lower, cache_upper, cache_finished, cache_instrs = self.cache[n]
+            if cache_finished and not finished:
+                continue
+            if finished and not cache_finished:
+                self.cache[n] = entry
+            elif upper < cache_upper:
+                if not finished:
+                    lower = min(max(lower, cache_lower), upper)
+                self.cache[n] = (lower, upper, finished, instrs)
+            elif lower > cache_lower and not cache_finished:
+                self.cache[n] = (min(lower, cache_upper), cache_upper, cache_finished, cache_instrs)
+            pass
+        self.make_room()
+        return
+
+    def update_sequence_partials(self, instrs: Sequence[Instruction]) -> None:  # noqa: C901
         """Make sure partial products for `instrs` are in cache.
         """
         n, m = 1, 1
         cost: float = 0
-        for i, instr in enumerate(instrs):
+        # The sequence of each partial product is a beginning of `instrs`.
+        for prefix in self.shared_sequence(instrs).prefixes():
+            instr: Instruction = prefix.last  # type: ignore
             if instr.op == "shift":
                 m = n
                 n <<= instr.amount
+            elif instr.op == "shift_add":
+                m = n
+                n += n << instr.amount
             elif instr.op == "add":
                 if instr.amount == OP_R1:
                     n += 1
@@ -220,10 +469,14 @@ class MultCache:
                 n = -n
             elif instr.op == "nop":
                 pass
+            elif instr.op == "copy":
+                # Nothing new is computed.
+                cost += instr.cost
+                continue
             else:
                 print(f"unknown op {instr.op}")
             cost += instr.cost
-            self.insert_or_update(n, 0, cost, False, instrs[0 : i + 1])  # noqa
+            self.insert_or_update(n, 0, cost, False, prefix)
             pass
 
 
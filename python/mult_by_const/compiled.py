@@ -0,0 +1,173 @@
+# Copyright (c) 2019 by Rocky Bernstein <rb@dustyfeet.com>
+"""Turning instruction sequences into Python functions.
+
+Running an instruction sequence with instruction_sequence_value() means
+going through the list and dispatching on each instruction's "op" and
+"amount" every time. When the same multipliers are used over and over,
+it is faster to do that once: we generate straight-line Python code for
+the sequence and compile it into a function of one argument. For
+example, the sequence for 51:
+
+    [n<<4, n+m, n<<1, n+m]
+
+becomes:
+
+    def mult_51(x):
+        n = x
+        m = n
+        n = n << 4
+        n = n + m
+        m = n
+        n = n << 1
+        n = n + m
+        return n
+
+"m", the value before the last shift, is only saved when something
+after the shift uses it.
+
+The generated functions use nothing but "<<", "+" and "-", so they
+work on anything supporting those, such as NumPy arrays, as well as on
+Python integers.
+
+CompiledCache keeps the most recently used of these functions, up to
+some number, keyed by multiplier.
+"""
+
+from collections import OrderedDict
+from typing import Callable, List
+
+from mult_by_const.instruction import (
+    FACTOR_FLAG,
+    OP_R1,
+    REVERSE_SUBTRACT_1,
+    REVERSE_SUBTRACT_FACTOR,
+    Instruction,
+)
+
+# The number of compiled functions MultConst keeps by default.
+COMPILED_CACHE_SIZE = 256
+
+
+def instruction_statement(instr: Instruction) -> str:
+    """Return the Python statement that carries out `instr`, other than
+    a "shift", "shift_add" or "zero", on variables "n", "m", and "x" (the input)."""
+    if instr.op in ("add", "subtract"):
+        op_str = "+" if instr.op == "add" else "-"
+        if instr.amount == OP_R1:
+            return f"n = n {op_str} x"
+        elif instr.amount == FACTOR_FLAG:
+            return f"n = n {op_str} m"
+        elif instr.amount == REVERSE_SUBTRACT_1:
+            return "n = x - n"
+        elif instr.amount == REVERSE_SUBTRACT_FACTOR:
+            return "n = m - n"
+    elif instr.op == "negate":
+        return "n = -n"
+    raise RuntimeError(f"Can't compile instruction {instr}")
+
+
+def uses_factor(instr: Instruction) -> bool:
+    """Return True if `instr` uses "m", the value before the last shift."""
+    return instr.op in ("add", "subtract") and instr.amount in (FACTOR_FLAG, REVERSE_SUBTRACT_FACTOR)
+
+
+def factor_used(instrs: List[Instruction]) -> bool:
+    """Return True if some instruction of `instrs` before the first shift
+    uses "m"."""
+    for instr in instrs:
+        if instr.op in ("shift", "shift_add"):
+            return False
+        if uses_factor(instr):
+            return True
+        pass
+    return False
+
+
+def sequence_source(instrs: List[Instruction], name: str = "mult") -> str:
+    """Return the source text of a Python function called `name` that
+    multiplies its argument the way `instrs` does."""
+    lines = [f"def {name}(x):", "    n = x"]
+    if factor_used(instrs):
+        lines.append("    m = x")
+    for i, instr in enumerate(instrs):
+        if instr.op == "shift":
+            if factor_used(instrs[i + 1:]):
+                lines.append("    m = n")
+            lines.append(f"    n = n << {instr.amount}")
+        elif instr.op == "shift_add":
+            if factor_used(instrs[i + 1:]):
+                lines.append("    m = n")
+            lines.append(f"    n = (n << {instr.amount}) + n")
+        elif instr.op == "zero":
+            lines.append("    return x - x")
+            return "\n".join(lines) + "\n"
+        elif instr.op in ("nop", "copy"):
+            continue
+        else:
+            lines.append(f"    {instruction_statement(instr)}")
+        pass
+    lines.append("    return n")
+    return "\n".join(lines) + "\n"
+
+
+def compile_sequence(instrs: List[Instruction], name: str = "mult") -> Callable:
+    """Return a function of one argument that multiplies it the way `instrs` does."""
+    namespace: dict = {}
+    exec(compile(sequence_source(instrs, name), f"<{name}>", "exec"), namespace)
+    return namespace[name]
+
+
+class CompiledCache:
+    """The most recently used compiled functions, up to `maxsize` of them,
+    keyed by multiplier."""
+
+    def __init__(self, maxsize: int = COMPILED_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.functions: "OrderedDict[int, Callable]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self.functions)
+
+    def __contains__(self, n: int) -> bool:
+        return n in self.functions
+
+    def clear(self) -> None:
+        self.functions.clear()
+        self.hits = self.misses = 0
+
+    def get(self, n: int, find_sequence: Callable) -> Callable:
+        """Return the compiled function for `n`. If we don't have it,
+        compile the sequence that `find_sequence(n)` gives, dropping the
+        least recently used function if we are full."""
+        fn = self.functions.get(n)
+        if fn is not None:
+            self.hits += 1
+            self.functions.move_to_end(n)
+            return fn
+        self.misses += 1
+        _, instrs = find_sequence(n)
+        name = f"mult_{n}" if n >= 0 else f"mult_neg_{-n}"
+        fn = compile_sequence(instrs, name)
+        self.functions[n] = fn
+        if len(self.functions) > self.maxsize:
+            self.functions.popitem(last=False)
+        return fn
+
+
+if __name__ == "__main__":
+    from timeit import timeit
+    from mult_by_const.instruction import instruction_sequence_value
+    from mult_by_const.mult import MultConst
+
+    mconst = MultConst()
+    _, instrs = mconst.find_mult_sequence(51)
+    print(sequence_source(instrs, "mult_51"))
+
+    n = 12345
+    _, instrs = mconst.find_mult_sequence(n)
+    mult = mconst.compiled(n)
+    assert mult(7) == 7 * n
+    print(f"interpreted: {timeit(lambda: instruction_sequence_value(instrs), number=100000):.3f}s")
+    print(f"compiled:    {timeit(lambda: mult(1), number=100000):.3f}s")
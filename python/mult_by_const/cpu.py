@@ -3,6 +3,7 @@
 """
 from typing import Any, Callable, Dict, FrozenSet, Optional
 from sys import maxsize as inf_cost
+from mult_by_const.util import naf_weight
 
 # Do the instructions allow up to 3 operands or 2?
 # Two-operand instructions are of the form:
@@ -29,9 +30,13 @@ RISC_equal_time_cost_profile: Dict[str, float] = {
     "shift": 1,
     "subtract": 1,
     "zero": 1,
-    # "shift_add" = 1  # old RISC machines have this
 }
 
+# Some machines, like the IBM 801, have a "shift_add" instruction that
+# shifts a value and adds in the value before the shift: n = (n << k) + n.
+# On the x86 the "lea" instruction does this for shifts of up to 3.
+RISC_shift_add_cost_profile: Dict[str, float] = dict(RISC_equal_time_cost_profile, shift_add=1)
+
 # "add" and "copy" only
 add_only_cost_profile: Dict[str, float] = {
     "add": 1,
@@ -53,6 +58,7 @@ add_subtract_cost_profile: Dict[str, float] = {
 
 OP_COST_PROFILES: Dict[str, Dict[str, float]] = {
     "RISC Equal Time": RISC_equal_time_cost_profile,
+    "RISC shift-add": RISC_shift_add_cost_profile,
     "add only": add_only_cost_profile,
     "add_subtract": add_subtract_cost_profile,
 }
@@ -74,6 +80,10 @@ class CPUProfile:
         max_registers: int,
         costs: Dict[str, float],
         shift_cost_fn: Optional[Callable] = None,
+        lower_bound_fn: Optional[Callable[[int], float]] = None,
+        shift_add_max: Optional[int] = None,
+        latencies: Optional[Dict[str, float]] = None,
+        issue_width: int = 1,
     ):
         self.name = name
         self.instruction_type = instruction_type
@@ -82,11 +92,32 @@ class CPUProfile:
         for field in ("add", "eps", "zero", "copy", "nop"):
             assert field in costs, f'A cost model needs to include  operation "{field}"'
         self.eps = self.costs["eps"]
+        self.shift_cost_fn: Callable[[int], float]
         if shift_cost_fn is None:
-            self.shift_cost_fn = lambda amount: shift_cost_equal_time
+            self.shift_cost_fn = lambda amount: shift_cost_equal_time(costs["shift"], amount)
         else:
             self.shift_cost_fn = shift_cost_fn
             pass
+
+        # lower_bound_fn(n) gives a cost that computing n can never be
+        # less than. Searching uses this to cut off hopeless branches, so
+        # it must never overestimate.
+        self.lower_bound_fn: Callable[[int], float]
+        if lower_bound_fn is None:
+            self.lower_bound_fn = lower_bound_none
+        else:
+            self.lower_bound_fn = lower_bound_fn
+            pass
+
+        # The largest shift amount a "shift_add" can do, or None if there is no limit.
+        self.shift_add_max = shift_add_max
+
+        # How long after an instruction starts its result can be used, for
+        # those operations where that differs from the cost, and how many
+        # independent instructions can start at the same time.
+        # See latency.py.
+        self.latencies: Dict[str, float] = {} if latencies is None else latencies
+        self.issue_width = issue_width
         return
 
     def subtract_can_negate(self) -> bool:
@@ -98,21 +129,61 @@ class CPUProfile:
     def can_subtract(self) -> bool:
         return "subtract" in self.costs
 
+    def is_two_address(self) -> bool:
+        """Return True if instructions overwrite one of their operands, so
+        values that are still needed must first be copied; see two_address.py."""
+        return self.instruction_type == "two-address"
+
     def has_true_shift(self) -> bool:
         """Has a real "shift". If False we have to simulate this via a doubling "add".
         """
         return "shift" in self.costs
 
+    def has_shift_add(self) -> bool:
+        """Has a fused "shift_add": n = (n << k) + n in a single instruction."""
+        return "shift_add" in self.costs
+
+    def shift_add_cost(self, amount: int) -> float:
+        """The cost of a "shift_add" by `amount`, or inf_cost if it can't be done."""
+        if not self.has_shift_add() or (self.shift_add_max is not None and amount > self.shift_add_max):
+            return inf_cost
+        return self.costs["shift_add"]
+
+    def op_cost(self, op: str, amount: int) -> float:
+        """The cost of an `op` instruction with `amount`, as in Instruction."""
+        if op == "shift":
+            return self.shift_cost_fn(amount)
+        elif op == "shift_add":
+            return self.shift_add_cost(amount)
+        return self.costs.get(op, inf_cost)
+
+    def latency(self, op: str) -> float:
+        """The latency of `op`, which is its cost unless given in "latencies"."""
+        return self.latencies.get(op, self.costs[op])
+
+    def shift_latency(self, amount: int) -> float:
+        """The latency of a "shift" by `amount`. Without a true shift, this
+        is that many doubling adds, one after the other."""
+        if not self.has_true_shift():
+            return amount * self.latency("add")
+        return self.latencies.get("shift", self.shift_cost_fn(amount))
+
     def can_zero(self) -> bool:
         return self.can_negate() or self.costs["zero"] != inf_cost
 
     def to_dict(self) -> Dict[str, Any]:
-        return {
+        d = {
             "name": self.name,
             "instruction_type": self.instruction_type,
             "max_registers": self.max_registers,
             "instruction_costs": self.costs,
         }
+        if self.shift_add_max is not None:
+            d["shift_add_max"] = self.shift_add_max
+        if self.latencies:
+            d["latencies"] = self.latencies
+            d["issue_width"] = self.issue_width
+        return d
 
 
 def shift_cost_equal_time(shift_cost, amount: int) -> float:
@@ -132,6 +203,50 @@ def shift_cost_double_only(shift_cost, amount: int) -> float:
     return amount
 
 
+def lower_bound_none(n: int) -> float:
+    """
+    The lower bound to use when we know nothing about the cost model.
+    """
+    return 0
+
+
+def lower_bound_naf(n: int, add_cost: float, shift_cost: float) -> float:
+    """
+    A lower bound for cost models with "add", "subtract" and "shift".
+
+    Adding or subtracting two values, each shifted by any amount, gives
+    a value whose non-adjacent form (NAF) has at most as many nonzero
+    digits as the two operands combined. So each add or subtract can at
+    most double the NAF weight, and we need at least
+    ceil(log2(NAF weight of n)) of them.
+
+    Furthermore, without a shift, each instruction can increase the
+    magnitude of a value by at most one. So if that many add or subtract
+    instructions can't get us to n, we need at least one more
+    instruction.
+    """
+    n = abs(n)
+    if n <= 1:
+        return 0
+    adders = (naf_weight(n) - 1).bit_length()
+    bound = adders * add_cost
+    if n > adders + 1:
+        bound += min(add_cost, shift_cost)
+    return bound
+
+
+def lower_bound_doubling(n: int, add_cost: float) -> float:
+    """
+    A lower bound for cost models where "add" is the only operation and a
+    shift of one is a doubling "add". Each instruction can at most double
+    the value, so we need at least ceil(log2(n)) instructions.
+    """
+    n = abs(n)
+    if n <= 1:
+        return 0
+    return (n - 1).bit_length() * add_cost
+
+
 POWER_3addr_3reg = CPUProfile(
     name="POWER 3-address, 3-register",
     instruction_type="three-address",
@@ -140,20 +255,91 @@ POWER_3addr_3reg = CPUProfile(
     shift_cost_fn=lambda amount: shift_cost_equal_time(
         RISC_equal_time_cost_profile["shift"], amount
     ),
+    lower_bound_fn=lambda n: lower_bound_naf(
+        n,
+        min(RISC_equal_time_cost_profile["add"], RISC_equal_time_cost_profile["subtract"]),
+        RISC_equal_time_cost_profile["shift"],
+    ),
 )
 
+# An addition chain can add any two of the values it has computed so
+# far, and keeps them all around; in instruction terms that is
+# three-address.
 chained_adds = CPUProfile(
     name="chained adds",
-    instruction_type="two-address",
+    instruction_type="three-address",
     max_registers=3,
     costs=add_only_cost_profile,
     shift_cost_fn=lambda amount: shift_cost_double_only(
         add_only_cost_profile["add"], amount
     ),
+    lower_bound_fn=lambda n: lower_bound_doubling(n, add_only_cost_profile["add"]),
+)
+
+# A "shift_add" is an add of two shifted values, so the NAF lower bound
+# holds with it counted as an add. But it also shifts, so we can't count
+# on a separate shift being needed.
+IBM_801 = CPUProfile(
+    name="IBM 801 3-address, 3-register, shift-add",
+    instruction_type="three-address",
+    max_registers=3,
+    costs=RISC_shift_add_cost_profile,
+    shift_cost_fn=lambda amount: shift_cost_equal_time(
+        RISC_shift_add_cost_profile["shift"], amount
+    ),
+    lower_bound_fn=lambda n: lower_bound_naf(
+        n,
+        min(
+            RISC_shift_add_cost_profile["add"],
+            RISC_shift_add_cost_profile["subtract"],
+            RISC_shift_add_cost_profile["shift_add"],
+        ),
+        0,
+    ),
+)
+
+# A machine that can start several instructions at once, and whose
+# "shift_add", like a slow x86 "lea", takes longer to give its result
+# than a "shift" followed by an "add". So the fewest instructions and the
+# shortest latency call for different sequences.
+superscalar = CPUProfile(
+    name="superscalar 3-address, 3-register, shift-add",
+    instruction_type="three-address",
+    max_registers=3,
+    costs=RISC_shift_add_cost_profile,
+    shift_cost_fn=lambda amount: shift_cost_equal_time(
+        RISC_shift_add_cost_profile["shift"], amount
+    ),
+    lower_bound_fn=IBM_801.lower_bound_fn,
+    shift_add_max=3,
+    latencies={"shift_add": 3},
+    issue_width=4,
+)
+
+# Like POWER_3addr_3reg, but each instruction overwrites its first operand,
+# as on the x86 or the Motorola 68000. Copies cost the same as any other
+# instruction and only add to a sequence, so the NAF lower bound still holds.
+x86_2addr_3reg = CPUProfile(
+    name="x86 2-address, 3-register",
+    instruction_type="two-address",
+    max_registers=3,
+    costs=RISC_equal_time_cost_profile,
+    shift_cost_fn=POWER_3addr_3reg.shift_cost_fn,
+    lower_bound_fn=POWER_3addr_3reg.lower_bound_fn,
 )
 
 DEFAULT_CPU_PROFILE = POWER_3addr_3reg
-SHORT2MODEL: Dict[str, Any] = {"RISC": POWER_3addr_3reg, "adds": chained_adds}
+SHORT2MODEL: Dict[str, Any] = {
+    "RISC": POWER_3addr_3reg,
+    "adds": chained_adds,
+    "801": IBM_801,
+    "superscalar": superscalar,
+    "2addr": x86_2addr_3reg,
+}
+
+# Profiles contain cost functions which can't be pickled. So when we need to
+# hand a profile to another process, we pass its name and look it up here.
+NAME2MODEL: Dict[str, Any] = {model.name: model for model in SHORT2MODEL.values()}
 
 if __name__ == "__main__":
     print(POWER_3addr_3reg.can_negate())
@@ -0,0 +1,146 @@
+"""
+Multiplication using the canonical signed-digit (CSD) representation of a number.
+
+The canonical signed-digit representation, also known as the
+non-adjacent form (NAF), writes a number using digits 1, 0 and -1 such
+that no two adjacent digits are nonzero. Of all the ways to write a
+number with these digits, it has the fewest nonzero digits.
+"""
+from typing import List, Sequence, Tuple
+
+from mult_by_const.binary_method import binary_sequence_inner
+from mult_by_const.cpu import inf_cost
+from mult_by_const.instruction import OP_R1, Instruction
+from mult_by_const.multclass import MultConstClass
+from mult_by_const.sequence import as_list
+
+
+def naf_digits(n: int) -> List[Tuple[int, int]]:
+    """Return the nonzero digits of the non-adjacent form of `n` > 0 as a list of
+    (position, digit) pairs, with the most-significant digit first.
+    For example 7 = 8 - 1 is [(3, 1), (0, -1)].
+    """
+    digits = []
+    position = 0
+    while n:
+        if n & 1:
+            digit = 2 - (n & 3)
+            digits.append((position, digit))
+            n -= digit
+        n >>= 1
+        position += 1
+        pass
+    digits.reverse()
+    return digits
+
+
+def csd_sequence(self: MultConstClass, n: int) -> Tuple[float, List[Instruction]]:
+    """Returns the cost and operation sequence using the canonical
+    signed-digit representation of the number.
+
+    Working from the most-significant digit down, each nonzero digit
+    after the first is a "shift" by the distance from the previous
+    nonzero digit followed by an "add" or "subtract" of one. If the
+    number is even, there is a final "shift".
+
+    Since a run of ones in binary becomes a single 1 and -1 in this
+    representation, this generally gives a tighter bound than the binary
+    method, and is a good initial upper bound for the alpha-beta search.
+
+    Examples:
+    ---------
+
+    We'll assume cost one for "add", "subtract", and "shift" by
+    any amount.
+
+    number    CSD      cost  remarks
+    ------  -------    ----  ------
+    7:      100-       2     shift three; subtract one
+    11:     10-0-      4     shift two; subtract one; shift two; subtract one
+    45:     10-0-0+    6     shift two; subtract one; shift two; subtract one;
+                             shift two; add one
+
+    If the CPU model can't subtract, we fall back to the binary method.
+    """
+
+    cache_lower, cache_upper, finished, cache_instr = self.mult_cache[n]
+    if finished:
+        return (cache_upper, as_list(cache_instr))
+
+    cost, instrs = csd_sequence_inner(self, n)
+    return cost, as_list(instrs)
+
+
+def csd_sequence_inner(self: MultConstClass, n: int) -> Tuple[float, Sequence[Instruction]]:
+
+    if n == 0 or not self.cpu_model.can_subtract():
+        return binary_sequence_inner(self, n)
+
+    orig_n = n
+    n, need_negation = self.need_negation(n)
+
+    digits = naf_digits(n)
+    csd_instrs: List[Instruction] = []
+    cost: float = 0  # total cost of sequence
+
+    previous_position, _ = digits[0]
+    value = 1
+    for position, digit in digits[1:]:
+        shift_amount = previous_position - position
+        shift_cost = self.shift_cost(shift_amount)
+        csd_instrs.append(Instruction("shift", shift_amount, shift_cost))
+        if digit > 0:
+            cost += shift_cost + self.add_instruction(csd_instrs, "add", OP_R1)
+        else:
+            cost += shift_cost + self.add_instruction(csd_instrs, "subtract", OP_R1)
+        value = (value << shift_amount) + digit
+        previous_position = position
+
+        # Prefixes of this sequence may have been found more cheaply before.
+        # The digits that follow use r1.
+        cache_lower, cache_upper, finished, cache_instrs = self.mult_cache[value]
+        if (
+            cache_upper < cost
+            and cache_instrs is not None
+            and self.fits_registers(cache_instrs, input_needed=True)
+        ):
+            cost, csd_instrs = cache_upper, list(cache_instrs)
+            pass
+        pass
+
+    if need_negation:
+        if (
+            self.cpu_model.subtract_can_negate()
+            and csd_instrs
+            and csd_instrs[-1].op == "subtract"
+            and csd_instrs[-1].amount == OP_R1
+        ):
+            # 1 - n is the negative of n - 1.
+            cost += self.reverse_subtract_one(csd_instrs)
+        elif "negate" in self.op_costs:
+            cost += self.add_instruction(csd_instrs, "negate", 0)
+        else:
+            return binary_sequence_inner(self, orig_n)
+        pass
+
+    if previous_position:
+        shift_cost = self.shift_cost(previous_position)
+        cost += shift_cost
+        csd_instrs.append(Instruction("shift", previous_position, shift_cost))
+
+    if self.tracer is not None:
+        self.tracer.sequence_computed("CSD", orig_n, cost)
+    self.mult_cache.update_sequence_partials(csd_instrs)
+    return (cost, csd_instrs)
+
+
+if __name__ == "__main__":
+    from mult_by_const.instruction import print_instructions
+    from mult_by_const.io import dump
+
+    mconst = MultConstClass(debug=True)
+
+    for n in [1, 0, -1, 7, -7, 45, -78, 12345678]:
+        cost, instrs = csd_sequence(mconst, n)
+        print_instructions(instrs, n, cost)
+    dump(mconst.mult_cache)
@@ -0,0 +1,224 @@
+# Copyright (c) 2019 by Rocky Bernstein <rb@dustyfeet.com>
+"""Searching for adder graphs rather than instruction sequences.
+
+The instruction sequences found by alpha-beta search can only use n, the
+original input, and m, the value before the last shift. So they miss
+cheaper ways that reuse other earlier values. For example, under the
+"chained adds" model, 23 is best done by the addition chain
+1, 2, 3, 5, 10, 20, 23, where the last step adds back in 3.
+
+Here we search for an adder graph (see adder_graph.py) where each node
+is a single instruction of the CPU model: an "add" or "subtract" of any
+two values computed so far, a "shift" of one of them, or a "negate".
+The search is iterative deepening on cost (IDA*), so the first graph
+found is the cheapest. Branches are cut off using lower bounds on how
+much more it costs to get to the multiplier:
+
+* When there is a true "shift", each "add" or "subtract" at most doubles
+  the largest non-adjacent form (NAF) weight of the values so far.
+* Otherwise, each instruction at most doubles the largest magnitude.
+
+The graph must also fit in the CPU model's "max_registers" registers,
+counting the one holding the input. On a two-address CPU model, the
+copies a graph needs depend on which values are used later, so they are
+only known once the graph is finished. The costs of the steps don't
+include them and so are still lower bounds; a graph found is only taken
+if its cost with copies is within the bound.
+
+We start from the cost of the instruction sequence that
+find_mult_sequence() gives, and only look for something cheaper. If the
+search runs out of its node budget before finding something cheaper, we
+use the graph for that sequence.
+"""
+
+from typing import TYPE_CHECKING, Dict, FrozenSet, List, Optional, Tuple
+
+from mult_by_const.adder_graph import AdderGraph
+from mult_by_const.budget import SearchBudget
+from mult_by_const.cpu import inf_cost
+from mult_by_const.util import consecutive_zeros, naf_weight
+
+if TYPE_CHECKING:
+    from mult_by_const.mult import MultConst
+
+# The most graph-search nodes expanded by default.
+DAG_NODE_BUDGET = 50000
+
+# A step is (op, left, shift amount, right, value).
+Step = Tuple[str, int, int, Optional[int], int]
+
+
+def steps_graph(self: "MultConst", n: int, steps: List[Step]) -> AdderGraph:
+    """Make an adder graph for `n` out of a list of steps."""
+    graph = AdderGraph(self.cpu_model)
+    for op, left, shift_amount, right, _ in steps:
+        graph.add_node(op, left, shift_amount, right, 0)
+    graph.add_output(n)
+    return graph
+
+
+def dag_search(
+    self: "MultConst", n: int, node_budget: Optional[int] = DAG_NODE_BUDGET
+) -> Tuple[float, AdderGraph]:
+    """Return the cost of and an adder graph for multiplying by `n`. See the
+    module docstring for how this is done. `node_budget` limits the number
+    of search nodes expanded; None is unlimited.
+    """
+    seq_cost, seq_instrs = self.find_mult_sequence(n)
+    best_graph = AdderGraph(self.cpu_model)
+    best_graph.add_sequence(seq_instrs)
+    best_graph.add_output(n)
+    best_cost = best_graph.cost()
+    if best_graph.registers_needed() > self.cpu_model.max_registers:
+        best_cost = inf_cost
+    if n in (0, 1):
+        return best_graph.cost(), best_graph
+
+    op_costs = self.op_costs
+    has_shift = self.cpu_model.has_true_shift()
+    can_subtract = self.cpu_model.can_subtract()
+    can_negate = n < 0 and "negate" in op_costs
+    add_cost = min(op_costs["add"], op_costs.get("subtract", inf_cost))
+    step_cost = min(add_cost, self.shift_cost(1)) if has_shift else add_cost
+    target_weight = naf_weight(n)
+
+    # Values bigger than this in magnitude don't help.
+    value_limit = 1 << (abs(n).bit_length() + 1)
+    budget = SearchBudget(node_budget=node_budget)
+
+    def lower_bound(values: List[int]) -> float:
+        """A cost that getting to n from `values` can't be less than."""
+        steps = 0
+        if has_shift:
+            weight = max(naf_weight(value) for value in values)
+            while weight < target_weight:
+                weight <<= 1
+                steps += 1
+            return max(steps * add_cost, step_cost)
+        largest = max(abs(value) for value in values)
+        while largest < abs(n):
+            largest <<= 1
+            steps += 1
+        return max(steps, 1) * step_cost
+
+    def last_steps(values: List[int]) -> List[Tuple[float, Step]]:
+        """The single instructions that give n from `values`."""
+        have = set(values)
+        result: List[Tuple[float, Step]] = []
+        for a in values:
+            if n - a in have:
+                result.append((op_costs["add"], ("add", a, 0, n - a, n)))
+            if can_subtract:
+                if a - n in have:
+                    result.append((op_costs["subtract"], ("subtract", a, 0, a - n, n)))
+                if a + n in have:
+                    result.append((op_costs["subtract"], ("subtract", a + n, 0, a, n)))
+            if can_negate and a == -n:
+                result.append((op_costs["negate"], ("negate", a, 0, None, n)))
+        if has_shift and n & 1 == 0:
+            shift_amount, _ = consecutive_zeros(n)
+            for amount in range(1, shift_amount + 1):
+                if n >> amount in have:
+                    shift_step = ("shift", n >> amount, amount, None, n)
+                    result.append((self.shift_cost(amount), shift_step))
+        return result
+
+    def children(values: List[int]) -> List[Tuple[float, Step]]:
+        have = set(values)
+        result: List[Tuple[float, Step]] = []
+        for i, a in enumerate(values):
+            for b in values[i:]:
+                candidates = [("add", a, b, a + b)]
+                if can_subtract:
+                    candidates += [("subtract", a, b, a - b), ("subtract", b, a, b - a)]
+                for op, left, right, value in candidates:
+                    if value and abs(value) <= value_limit and value not in have:
+                        result.append((op_costs[op], (op, left, 0, right, value)))
+                        have.add(value)
+            if has_shift:
+                shift_amount = 1
+                while abs(a << shift_amount) <= value_limit:
+                    value = a << shift_amount
+                    if value not in have:
+                        shift_step = ("shift", a, shift_amount, None, value)
+                        result.append((self.shift_cost(shift_amount), shift_step))
+                        have.add(value)
+                    shift_amount += 1
+            if can_negate and -a not in have:
+                result.append((op_costs["negate"], ("negate", a, 0, None, -a)))
+                have.add(-a)
+        return result
+
+    # Costs seen so far for each set of values in this iteration.
+    seen: Dict[FrozenSet[int], float] = {}
+
+    def search(
+        values: List[int], steps: List[Step], cost: float, bound: float
+    ) -> Tuple[Optional[AdderGraph], float]:
+        """Search for n within `bound`. Return a graph if found, and the
+        smallest cost over `bound` that was cut off."""
+        if budget.spend():
+            return None, inf_cost
+        key = frozenset(values)
+        if seen.get(key, inf_cost) <= cost:
+            return None, inf_cost
+        seen[key] = cost
+
+        next_bound: float = inf_cost
+        if bound - cost < 2 * step_cost:
+            # There is only room for one more instruction, which has to give n.
+            expansions = last_steps(values)
+            if not expansions:
+                return None, cost + 2 * step_cost
+        else:
+            expansions = children(values)
+            # Try the children that give n first.
+            expansions.sort(key=lambda child: child[1][4] != n)
+        for instr_cost, step in expansions:
+            child_cost = cost + instr_cost
+            value = step[4]
+            if value == n:
+                if child_cost <= bound:
+                    graph = steps_graph(self, n, steps + [step])
+                    if graph.registers_needed() <= self.cpu_model.max_registers:
+                        graph_cost = graph.cost()
+                        if graph_cost <= bound:
+                            return graph, graph_cost
+                        next_bound = min(next_bound, graph_cost)
+                else:
+                    next_bound = min(next_bound, child_cost)
+                continue
+            child_values = values + [value]
+            f = child_cost + lower_bound(child_values)
+            if f > bound:
+                next_bound = min(next_bound, f)
+                continue
+            found, child_bound = search(child_values, steps + [step], child_cost, bound)
+            if found is not None:
+                return found, child_bound
+            next_bound = min(next_bound, child_bound)
+        return None, next_bound
+
+    bound = lower_bound([1])
+    while bound < best_cost and not budget.exhausted:
+        seen.clear()
+        found, next_bound = search([1], [], 0, bound)
+        if found is not None:
+            best_graph, best_cost = found, found.cost()
+            break
+        bound = next_bound
+
+    if self.tracer is not None:
+        self.tracer.sequence_computed("dag", n, best_graph.cost())
+    return best_graph.cost(), best_graph
+
+
+if __name__ == "__main__":
+    from mult_by_const.adder_graph import print_graph
+    from mult_by_const.cpu import chained_adds
+    from mult_by_const.mult import MultConst
+
+    mconst = MultConst(cpu_model=chained_adds)
+    for n in (23, 30):
+        cost, graph = dag_search(mconst, n)
+        print_graph(graph)
@@ -0,0 +1,165 @@
+# Copyright (c) 2019 by Rocky Bernstein <rb@dustyfeet.com>
+"""
+Bottom-up dynamic-programming construction of multiplication tables.
+
+Rather than starting a fresh top-down alpha-beta search for each
+number as "mult-by-const --to N" does, we fill in the cost for every
+number in 1..N in a single pass in increasing order.
+
+We use the same transitions that the alpha-beta search uses:
+
+* an even number is its odd part followed by a shift,
+* an odd number n is (n-1) + 1, or (n+1) - 1,
+* an odd number n is a multiple of a factor 2**i + 1 or 2**i - 1.
+
+Each of these refers only to values that are smaller than n which
+have been computed earlier in the pass. (For odd n, n+1 is even, so
+its cost is that of its odd part, which is smaller than n, plus a
+shift.) So a single pass suffices, and the total work is roughly
+O(N log N) since we try at most log2(n) factors for each n.
+"""
+from typing import List, Optional, Tuple
+
+from mult_by_const.binary_method import binary_sequence_inner
+from mult_by_const.cache import MultCache
+from mult_by_const.cpu import inf_cost
+from mult_by_const.instruction import OP_R1, Instruction
+from mult_by_const.multclass import MultConstClass
+from mult_by_const.sequence import EMPTY_SEQUENCE, InstructionSequence, as_sequence
+from mult_by_const.util import consecutive_zeros
+
+
+def dp_table(self: MultConstClass, to: int) -> MultCache:
+    """Fill in the multiplication cache of `self` with finished
+    entries for every number from 1 to `to` inclusive. The cache is
+    returned.
+
+    Entries that are already in the cache as finished and are cheaper
+    than what we compute are kept, and are used in computing the
+    entries that follow.
+    """
+    if to < 1:
+        return self.mult_cache
+
+    # Mirror the search methods that find_mult_sequence() picks: when
+    # the CPU model can't negate, we only have additions.
+    use_subtract = self.cpu_model.can_negate()
+    add_cost = self.op_costs["add"]
+    subtract_cost = self.op_costs.get("subtract", inf_cost)
+
+    # costs[n] is the cost of n, and sequences[n] its instruction sequence.
+    costs: List[float] = [inf_cost] * (to + 1)
+    # A sequence is another's with a suffix added, so they share their
+    # beginnings; see sequence.py.
+    sequences: List[Optional[InstructionSequence]] = [None] * (to + 1)
+
+    cache = self.mult_cache
+    _, costs[1], _, _ = cache[1]
+    sequences[1] = EMPTY_SEQUENCE
+
+    def odd_part(n: int) -> Tuple[int, int, float]:
+        shift_amount, m = consecutive_zeros(n)
+        return m, shift_amount, self.shift_cost(shift_amount)
+
+    def fits(m: int, suffix: List[Instruction]) -> bool:
+        return self.fits_registers(sequences[m], suffix)  # type: ignore
+
+    for n in range(2, to + 1):
+        if n & 1 == 0:
+            m, shift_amount, shift_cost = odd_part(n)
+            best_cost = costs[m] + shift_cost
+            best = (m, [Instruction("shift", shift_amount, shift_cost)])
+        else:
+            best_cost = inf_cost
+            best = (1, [])
+
+            # Factors of the form 2**i + 1.
+            i, j = 1, 2
+            while j + 1 <= n:
+                factor = j + 1
+                if n % factor == 0:
+                    m = n // factor
+                    shift_op_cost, shift_op_instrs = self.shift_op_instrs("add", i, m == 1)
+                    try_cost = costs[m] + shift_op_cost
+                    if try_cost < best_cost and fits(m, shift_op_instrs):
+                        best_cost = try_cost
+                        best = (m, shift_op_instrs)
+                i += 1
+                j <<= 1
+                pass
+
+            # Factors of the form 2**i - 1. 3 = 2**1 + 1 was handled above.
+            if use_subtract:
+                i, j = 3, 8
+                while j - 1 <= n:
+                    factor = j - 1
+                    if n % factor == 0:
+                        m = n // factor
+                        shift_op_cost, shift_op_instrs = self.shift_op_instrs(
+                            "subtract", i, m == 1
+                        )
+                        try_cost = costs[m] + shift_op_cost
+                        if try_cost < best_cost and fits(m, shift_op_instrs):
+                            best_cost = try_cost
+                            best = (m, shift_op_instrs)
+                    i += 1
+                    j <<= 1
+                    pass
+                pass
+
+            # (n - 1) + 1; n - 1 is even.
+            m, shift_amount, shift_cost = odd_part(n - 1)
+            try_cost = costs[m] + shift_cost + add_cost
+            suffix = [
+                Instruction("shift", shift_amount, shift_cost),
+                Instruction("add", OP_R1, add_cost),
+            ]
+            if try_cost < best_cost and fits(m, suffix):
+                best_cost = try_cost
+                best = (m, suffix)
+
+            # (n + 1) - 1; n + 1 is even and its odd part is less than n.
+            if use_subtract:
+                m, shift_amount, shift_cost = odd_part(n + 1)
+                try_cost = costs[m] + shift_cost + subtract_cost
+                suffix = [
+                    Instruction("shift", shift_amount, shift_cost),
+                    Instruction("subtract", OP_R1, subtract_cost),
+                ]
+                if try_cost < best_cost and fits(m, suffix):
+                    best_cost = try_cost
+                    best = (m, suffix)
+                pass
+            pass
+
+        if best_cost == inf_cost:
+            # Nothing fits in the registers we have. The binary method
+            # only ever uses r1 and n.
+            best_cost, binary_instrs = binary_sequence_inner(self, n)
+            instrs = as_sequence(binary_instrs)
+        else:
+            m, best_suffix = best
+            instrs = sequences[m] + best_suffix  # type: ignore
+
+        # A previously-loaded or previously-searched entry might be better.
+        cache_lower, cache_upper, finished, cache_instrs = cache.__getitem__(n, record=False)
+        if finished and cache_upper <= best_cost and cache_instrs is not None:
+            best_cost, instrs = cache_upper, cache_instrs
+        else:
+            cache.insert_or_update(n, best_cost, best_cost, True, instrs)
+
+        costs[n] = best_cost
+        sequences[n] = instrs
+        pass
+
+    return cache
+
+
+if __name__ == "__main__":
+    from mult_by_const.instruction import print_instructions
+
+    mconst = MultConstClass()
+    dp_table(mconst, 100)
+    for n in (51, 95, 100):
+        _, cost, _, instrs = mconst.mult_cache[n]
+        print_instructions(instrs, n, cost)
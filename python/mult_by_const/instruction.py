@@ -1,7 +1,9 @@
 # Copyright (c) 2019 by Rocky Bernstein <rb@dustyfeet.com>
 """Code around instructions and instruction sequences"""
-from typing import List, Optional
-from mult_by_const.cpu import inf_cost
+from array import array
+from functools import lru_cache
+from typing import Iterable, Iterator, List, Optional, Sequence, Union
+from mult_by_const.cpu import CPUProfile, inf_cost
 from mult_by_const.util import bin2str, print_sep
 
 # Below r[1] is the register we started out with
@@ -13,43 +15,85 @@ REVERSE_SUBTRACT_FACTOR = -3 # r[n] = r[1] - r[n]
 
 OP2SHORT = {
     "add": "+",
+    "copy": "copy",
     "zero": "0",
     "negate": "-n",
     "nop": "nop",
     "shift": "<<",
+    "shift_add": "<<+",
     "subtract": "-",
 }
 SHORT2OP = {v: k for k, v in OP2SHORT.items()}
 
+# An instruction can also be encoded in a single small integer: the
+# index of its operation in OPS in the low OP_BITS bits and, above that,
+# its amount plus AMOUNT_BIAS, which makes the flags non-negative. The
+# cost isn't encoded; a CPU profile gives it. A sequence of these fits
+# in an array('H') unless it shifts by thousands of bits. See
+# encode_instructions().
+OPS = tuple(OP2SHORT.keys())
+OP_CODES = {op: code for code, op in enumerate(OPS)}
+OP_BITS = (len(OPS) - 1).bit_length()
+OP_MASK = (1 << OP_BITS) - 1
+AMOUNT_BIAS = -REVERSE_SUBTRACT_FACTOR
+
 
 class Instruction:
     """Object containing information about a particular operation or instruction as it pertains
-    to the instruction sequence"""
+    to the instruction sequence. Instructions can't be changed once they are made:
+    shared_instruction() and the cache hand out the same ones to everybody."""
+
+    # Searching makes a great many of these, so they don't get a __dict__.
+    __slots__ = ("op", "amount", "cost")
+    op: str
+    amount: int
+    cost: float
 
     def __init__(self, op: str, amount: int, cost: float = 1):
-        self.op = op  # The name of the operation; e.g. "shift", "add", "subtract"
+        # The name of the operation; e.g. "shift", "add", "subtract"
+        object.__setattr__(self, "op", op)
 
         # "cost" is redundant and can be computed from the "op" and "amount";
         # we add it for convenience.
-        self.cost = cost
+        object.__setattr__(self, "cost", cost)
 
         # If "op" is a "shift", then it is amount to shift.
 
+        # If "op" is a "shift_add", then it is the amount to shift before
+        # adding in the value before the shift: n = (n << amount) + n.
+
         # if "op" is an "add or subtract", then it is either:
         #    1 if we add/subtract one,
         #    FACTOR_FLAG if we add/subtract a factor value,
         #    REVERSE_SUBTRACT_1 if we reverse the operands and subtract,
         #    REVERSE_SUBTRACT_FACTOR if we reverse the operands and add the last factor,
         #
-        self.amount = amount
+
+        # If "op" is a "copy", which two-address machines need to keep a value
+        # that the next instruction would otherwise overwrite, then it is either:
+        #    0 if we keep n, so that it can be used as m after a shift,
+        #    OP_R1 if we keep r1, so that it isn't lost in a reverse subtract.
+        # A copy doesn't change any value.
+        object.__setattr__(self, "amount", amount)
+
+    def __setattr__(self, name: str, value) -> None:
+        raise AttributeError(f"can't set {name}: an Instruction can't be changed")
+
+    def __reduce__(self):
+        # Unpickling would otherwise set the slots one at a time.
+        return (Instruction, (self.op, self.amount, self.cost))
 
     def __repr__(self):
         """Format instruction in compact form. No cost is shown"""
         op_str = OP2SHORT.get(self.op, self.op)
         if op_str == "<<":
             return f"n{op_str}{self.amount}"
+        elif op_str == "<<+":
+            return f"(n<<{self.amount})+n"
         elif op_str in ("0", "nop", "-n"):
             return op_str
+        elif op_str == "copy":
+            return "copy 1" if self.amount == OP_R1 else "copy n"
         elif op_str == "+":
             operand1 = "n"
             if self.amount == FACTOR_FLAG:
@@ -111,8 +155,12 @@ class Instruction:
             instr_str += f"-{op1}"
         elif self.op == "nop":
             instr_str += f"{target}"
+        elif self.op == "copy":
+            instr_str = f"r[t] = {r1}" if self.amount == OP_R1 else f"{op2} = {op1}"
         elif self.op == "shift":
             instr_str += f"{op1} << {self.amount}"
+        elif self.op == "shift_add":
+            instr_str += f"({op1} << {self.amount}) + {op1}"
         elif self.op == "zero":
             instr_str += "0"
         else:
@@ -149,6 +197,10 @@ class Instruction:
             pass
         elif self.op == "shift":
             op_str += f" n, {self.amount}"
+        elif self.op == "shift_add":
+            op_str += f" n, {self.amount}"
+        elif self.op == "copy":
+            op_str += " 1" if self.amount == OP_R1 else " n"
         else:
             op_str = f"{self.op} {self.amount} ???"
         op_str += ";"
@@ -164,6 +216,45 @@ class Instruction:
         return True
 
 
+# How many distinct instructions shared_instruction() keeps. Costs are
+# part of the key, and weighted cost profiles give many different ones.
+SHARED_INSTRUCTIONS_SIZE = 4096
+
+
+@lru_cache(maxsize=SHARED_INSTRUCTIONS_SIZE)
+def shared_instruction(op: str, amount: int, cost: float) -> Instruction:
+    """Return Instruction(op, amount, cost), the same object each time
+    for the same arguments. Instructions can't be changed once they are
+    made, so searching can share them rather than make new ones.
+    """
+    return Instruction(op, amount, cost)
+
+
+def encode_instruction(instr: Instruction) -> int:
+    """Encode the operation and amount of `instr` in an integer."""
+    return ((instr.amount + AMOUNT_BIAS) << OP_BITS) | OP_CODES[instr.op]
+
+
+def decode_instruction(code: int, cost: float) -> Instruction:
+    """Return the instruction that `code` encodes, costing `cost`."""
+    return shared_instruction(OPS[code & OP_MASK], (code >> OP_BITS) - AMOUNT_BIAS, cost)
+
+
+def encode_instructions(instrs: List[Instruction]) -> array:
+    """Encode `instrs` in an array of unsigned integers, 16-bit ones if
+    they are big enough."""
+    codes = [encode_instruction(instr) for instr in instrs]
+    return array("H" if max(codes, default=0) < 1 << 16 else "Q", codes)
+
+
+def decode_instructions(codes: Sequence[int], cpu_model: CPUProfile) -> List[Instruction]:
+    """Return the instructions that `codes` encodes, costed by `cpu_model`."""
+    return [
+        decode_instruction(code, cpu_model.op_cost(OPS[code & OP_MASK], (code >> OP_BITS) - AMOUNT_BIAS))
+        for code in codes
+    ]
+
+
 def print_instructions(
     instrs: List[Instruction], n=None, stored_cost=None, prefix=""
 ) -> None:
@@ -194,6 +285,9 @@ def print_instructions(
             if i + 1 < len(instrs) and instrs[i + 1].amount != OP_R1:
                 target = "r[n]"
                 pass
+        elif instr.op == "shift_add":
+            previous_value = value
+            value += value << instr.amount
         elif instr.op == "add":
             if instr.amount == OP_R1:
                 value += 1
@@ -218,7 +312,7 @@ def print_instructions(
             value = 0
         elif instr.op == "negate":
             value = -value
-        elif instr.op == "nop":
+        elif instr.op in ("nop", "copy"):
             pass
         else:
             print(f"unknown op {instr.op}")
@@ -240,7 +334,7 @@ def print_instructions(
     return
 
 
-def check_instruction_sequence_value(n: int, instrs: Optional[List[Instruction]]) -> None:
+def check_instruction_sequence_value(n: int, instrs: Optional[Sequence[Instruction]]) -> None:
     """
     Check that the multiplication performed by the list of instructions `instrs`, is
     equal to passed-in expected multiplier `n`.
@@ -253,7 +347,7 @@ def check_instruction_sequence_value(n: int, instrs: Optional[List[Instruction]]
     return
 
 
-def check_instruction_sequence_cost(cost: float, instrs: Optional[List[Instruction]], n=None) -> None:
+def check_instruction_sequence_cost(cost: float, instrs: Optional[Sequence[Instruction]], n=None) -> None:
     """Check that the instruction cost in `instrs`, is equal to passed-in expected cost `cost`.
     """
     actual_cost = inf_cost if cost == inf_cost else instruction_sequence_cost(instrs)
@@ -263,28 +357,54 @@ def check_instruction_sequence_cost(cost: float, instrs: Optional[List[Instructi
     return
 
 
-def instruction_sequence_cost(instrs: Optional[List[Instruction]]) -> float:
-    """Check that the instruction sequence cost of the list of instructions `instrs`, is
-    equal to passed-in expected cost `cost`.
+def instruction_sequence_cost(
+    instrs: Optional[Union[Sequence[Instruction], array]], cpu_model: Optional[CPUProfile] = None
+) -> float:
+    """Return the cost of the instruction sequence `instrs`. If `instrs` is
+    encoded, see encode_instructions(), `cpu_model` gives the cost of
+    each instruction.
     """
     if instrs is None:
         return inf_cost
     cost: float = 0
+    if isinstance(instrs, array):
+        if cpu_model is None:
+            raise ValueError("The cost of encoded instructions needs a CPU model")
+        for code in instrs:
+            cost += cpu_model.op_cost(OPS[code & OP_MASK], (code >> OP_BITS) - AMOUNT_BIAS)
+            pass
+        return cost
     for inst in instrs:
         cost += inst.cost
         pass
     return cost
 
-def instruction_sequence_value(instrs: Optional[List[Instruction]]) -> int:
-    """Return the cost associated with instruction sequence `instrs`.
+def instruction_sequence_value(instrs: Optional[Union[Sequence[Instruction], array]]) -> int:
+    """Return the value that instruction sequence `instrs` multiplies
+    by. `instrs` can be encoded; see encode_instructions().
     """
     if instrs is None:
         return inf_cost
+    if isinstance(instrs, array):
+        return encoded_sequence_value(instrs)
+    n = 1
+    for n in partial_products(instrs):
+        pass
+    return n
+
+
+def partial_products(instrs: Iterable[Instruction]) -> Iterator[int]:
+    """Yield the value that the beginning of `instrs` up to each of its
+    instructions multiplies by. Nothing follows a "zero" instruction.
+    """
     n, m = 1, 1
     for instr in instrs:
         if instr.op == "shift":
             m = n
             n <<= instr.amount
+        elif instr.op == "shift_add":
+            m = n
+            n += n << instr.amount
         elif instr.op == "add":
             if instr.amount == OP_R1:
                 n += 1
@@ -308,17 +428,60 @@ def instruction_sequence_value(instrs: Optional[List[Instruction]]) -> int:
             else:
                 print(f"Invalid flag on subtract in {instr}")
         elif instr.op == "zero":
-            return 0
+            yield 0
+            return
         elif instr.op == "negate":
             n = -n
-        elif instr.op == "nop":
+        elif instr.op in ("nop", "copy"):
             pass
         else:
             print(f"unknown op {instr.op}")
+        yield n
         pass
+    return
+
+
 
+def encoded_sequence_value(codes: array) -> int:
+    """Return the value that the encoded instruction sequence `codes`
+    multiplies by, without decoding it into Instruction objects."""
+    shift, shift_add, add, subtract, zero, negate = (
+        OP_CODES[op] for op in ("shift", "shift_add", "add", "subtract", "zero", "negate")
+    )
+    n, m = 1, 1
+    for code in codes:
+        op = code & OP_MASK
+        amount = (code >> OP_BITS) - AMOUNT_BIAS
+        if op == shift:
+            m = n
+            n <<= amount
+        elif op == shift_add:
+            m = n
+            n += n << amount
+        elif op == add:
+            if amount == OP_R1:
+                n += 1
+            elif amount == FACTOR_FLAG:
+                n += m
+            elif amount == REVERSE_SUBTRACT_1:
+                n = -(n - 1)
+        elif op == subtract:
+            if amount == OP_R1:
+                n -= 1
+            elif amount == REVERSE_SUBTRACT_1:
+                n = 1 - n
+            elif amount == FACTOR_FLAG:
+                n -= m
+            elif amount == REVERSE_SUBTRACT_FACTOR:
+                n = m - n
+        elif op == zero:
+            return 0
+        elif op == negate:
+            n = -n
+        pass
     return n
 
+
 def find_negatable(instrs: List[Instruction]) -> int:
     for (i, inst) in enumerate(instrs):
         if inst.op in ("negate", "subtract"):
@@ -338,7 +501,7 @@ def str2instruction(s: str) -> Instruction:
             amount = 1
         elif s[2] == "n":
             if s[1] == "-":
-                amount = REVERSE_SUBTRACT_1
+                amount = REVERSE_SUBTRACT_FACTOR if s[0] == "m" else REVERSE_SUBTRACT_1
             else:
                 raise RuntimeError(f"Unconvertable amount in subtract {s}")
         else:
@@ -348,6 +511,12 @@ def str2instruction(s: str) -> Instruction:
     elif s in ("-n", "0", "nop"):
         amount = 0
         op = SHORT2OP[s]
+    elif s in ("copy n", "copy 1"):
+        amount = OP_R1 if s == "copy 1" else 0
+        op = SHORT2OP["copy"]
+    elif s.startswith("(n<<") and s.endswith(")+n"):
+        amount = int(s[4:-3], 10)
+        op = SHORT2OP["<<+"]
     elif s[1] == "<":
         if s[1:3] != "<<":
             raise RuntimeError(f"Expecting shift operator got {s}")
@@ -384,6 +553,8 @@ if __name__ == "__main__":
         f"Instruction value: {instruction_sequence_value(instrs)}, cost: {instruction_sequence_cost(instrs)}"
     )
 
+    instrs.append(Instruction("shift_add", 3))
+    instrs.append(Instruction("copy", OP_R1))
     for inst in instrs:
         roundtrip_inst = str2instruction(repr(inst))
         print(f"repr() vs roundtrip(): '{repr(inst)}' == '{repr(roundtrip_inst)}'")
@@ -32,11 +32,19 @@ def dump(cache, out=sys.stdout) -> None:
         else:
             cache_str = f"cost: ({lower},{upper_any:4}]"
             assert upper >= lower
+        registers = cache.registers(num)
+        if registers is not None:
+            cache_str += f"; registers: {registers}"
         out.write(f"{num:4}: {cache_str};\t{str(instrs)}\n")
     out.write("\n")
     out.write(f"Cache hits (finished):\t\t{cache.hits_exact:4}\n")
     out.write(f"Cache hits (unfinished):\t{cache.hits_partial:4}\n")
     out.write(f"Cache misses:\t\t\t{cache.misses:4}\n")
+    out.write(f"Partial bounds:\t\t\t{len(cache.partial):4}\n")
+    out.write(f"Partial bounds evicted:\t\t{cache.partial.evictions:4}\n")
+    if cache.max_entries is not None:
+        out.write(f"Cache entries evicted:\t\t{cache.evictions:4}\n")
+        out.write(f"  of them unfinished:\t\t{cache.evictions_unfinished:4}\n")
     print_sep(out=out)
     return
 
@@ -62,14 +70,16 @@ def dump_csv(cache: MultCache, out=sys.stdout) -> None:
     writer.writerows(table)
 
 
-def dump_json(cache: MultCache, out=sys.stdout, indent=2) -> None:
-    table = reformat_cache(cache)
+def dump_json(cache: MultCache, out=sys.stdout, indent=2, stats=None) -> None:
+    """Write the cache as JSON. If `stats`, a SearchStats, is given, the
+    statistics go under "stats" in the same document."""
+    table = reformat_cache(cache, stats)
     out.write(json.dumps(table, sort_keys=True, indent=indent))
     out.write("\n")
 
 
-def dump_yaml(cache: MultCache, out=sys.stdout, compact=False) -> None:
-    table = reformat_cache(cache)
+def dump_yaml(cache: MultCache, out=sys.stdout, compact=False, stats=None) -> None:
+    table = reformat_cache(cache, stats)
     yaml = YAML()
     if compact:
         yaml.compact(seq_seq=False, seq_map=False)
@@ -129,14 +139,16 @@ def load_yaml(fd, cache=MultCache()) -> MultCache:
     return mcache
 
 
-def reformat_cache(cache: MultCache) -> Dict[str, Dict[int, Any]]:
+def reformat_cache(cache: MultCache, stats=None) -> Dict[str, Any]:
     """Reorganize the instruction cache in a more machine-readable format"
     """
-    table: Dict[str, Dict[int, Any]] = {
+    table: Dict[str, Any] = {
         "version": cache.version,
         "cpu-profile": cache.cpu_profile.to_dict(),
         "products": {},
     }
+    if stats is not None:
+        table["stats"] = stats.to_dict(cache)
     products = table["products"]
     for num in sorted(cache.keys()):
         lower, upper, finished, instrs = cache.cache[num]
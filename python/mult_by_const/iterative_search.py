@@ -0,0 +1,68 @@
+# Copyright (c) 2019 by Rocky Bernstein <rb@dustyfeet.com>
+"""
+Alpha-beta search using an explicit stack instead of recursion.
+
+MultConst.alpha_beta_search() recurses to answer the search requests of
+the frames in search_methods.py. For large multipliers, chains of
+neighbors can go deep enough to hit Python's recursion limit.
+
+Here, when a frame yields an (n, lower, limit) request, the driver in
+iterative_alpha_beta_search() pushes a new alpha_beta_frame() for the
+request and, when that finishes, sends its (cost, instructions) result
+back to the frame that asked for it. As both engines run the same
+frames, they give identical results.
+
+Search methods without a frame in FRAME_METHODS, like search_cache(), are
+called directly, and so any searching they do is recursive.
+"""
+
+from typing import Any, List, Optional
+
+from mult_by_const.budget import SearchBudget
+from mult_by_const.multclass import MultConstClass
+from mult_by_const.search_methods import SearchFrame, SearchResult, alpha_beta_frame
+
+
+def iterative_alpha_beta_search(
+    self: MultConstClass,
+    n: int,
+    lower: float,
+    limit: float,
+    time_budget: Optional[float] = None,
+    node_budget: Optional[int] = None,
+) -> SearchResult:
+    """Does what MultConst.alpha_beta_search() does, but without recursion.
+    See that for a description of the parameters and the value returned.
+    """
+    if time_budget is not None or node_budget is not None:
+        saved_budget = self.budget
+        self.budget = SearchBudget(time_budget, node_budget)
+        try:
+            return iterative_alpha_beta_search(self, n, lower, limit)
+        finally:
+            self.budget = saved_budget
+
+    stack: List[SearchFrame] = [alpha_beta_frame(self, n, lower, limit)]
+    result: Any = None
+    while True:
+        try:
+            request = stack[-1].send(result)
+        except StopIteration as stop:
+            stack.pop()
+            if not stack:
+                return stop.value
+            result = stop.value
+        else:
+            stack.append(alpha_beta_frame(self, *request))
+            result = None
+        pass
+
+
+if __name__ == "__main__":
+    from mult_by_const.instruction import print_instructions
+    from mult_by_const.mult import MultConst
+
+    mconst = MultConst(engine="iterative")
+    for n in (51, 12345678, -12345678):
+        cost, instrs = mconst.find_mult_sequence(n)
+        print_instructions(instrs, n, cost)
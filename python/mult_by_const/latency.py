@@ -0,0 +1,196 @@
+# Copyright (c) 2019 by Rocky Bernstein <rb@dustyfeet.com>
+"""Other things to minimize than the sum of instruction costs.
+
+The cost of an instruction sequence, instruction_sequence_cost(), adds
+up the cost of each instruction. That measures how long the sequence
+takes on a machine that runs one instruction after another. There are
+other things we might want as small as possible:
+
+"latency"
+    the time from the input being available until the product is. A
+    CPU profile can give latencies, in "latencies", for operations
+    where this differs from their cost; say, a "shift_add" that costs
+    one instruction but whose result isn't ready for three cycles.
+
+"count"
+    the number of instructions. Without a true "shift", a "shift" by k
+    is k doubling "add"s.
+
+On a machine that can start several independent instructions at once
+(the profile's "issue_width"), latency is set by the longest chain of
+instructions that each need the result of the one before. In an
+instruction sequence though, every instruction uses n, the result of
+the instruction before it, so the whole sequence is such a chain and
+its latency is the sum of the latencies of its instructions. That means
+we can search for the sequence with the least latency, or the fewest
+instructions, by searching as usual with a CPU profile whose costs are
+latencies or instruction counts; objective_profile() makes that
+profile. Its lower bound is the original one, scaled down by the least
+ratio of new cost to old over all operations, so it still never
+overestimates.
+
+An adder graph, on the other hand, can have values that don't depend
+on each other. graph_latency() schedules the nodes of a graph, at most
+"issue_width" instructions starting in each cycle, to find its latency.
+"""
+
+from typing import TYPE_CHECKING, Dict, List
+
+from mult_by_const.cpu import CPUProfile, inf_cost
+from mult_by_const.instruction import Instruction
+
+if TYPE_CHECKING:
+    from mult_by_const.adder_graph import AdderGraph
+
+# What searching can minimize; see the module docstring. "cost" is the
+# sum of instruction costs.
+OBJECTIVES = ("cost", "latency", "count")
+
+
+def instruction_latency(instr: Instruction, cpu_model: CPUProfile) -> float:
+    """The latency of `instr` under `cpu_model`."""
+    if instr.op == "shift":
+        return cpu_model.shift_latency(instr.amount)
+    return cpu_model.latency(instr.op)
+
+
+def instruction_sequence_latency(instrs: List[Instruction], cpu_model: CPUProfile) -> float:
+    """The latency of the instruction sequence `instrs` under `cpu_model`.
+    Each instruction needs the result of the one before, so this is the
+    sum of their latencies."""
+    return sum(instruction_latency(instr, cpu_model) for instr in instrs)
+
+
+def instruction_count(instrs: List[Instruction], cpu_model: CPUProfile) -> int:
+    """The number of instructions needed to carry out `instrs` under `cpu_model`."""
+    count = 0
+    for instr in instrs:
+        if instr.op == "nop":
+            continue
+        elif instr.op == "shift" and not cpu_model.has_true_shift():
+            count += instr.amount
+        else:
+            count += 1
+        pass
+    return count
+
+
+def objective_profile(cpu_model: CPUProfile, objective: str) -> CPUProfile:
+    """Return a CPU profile whose costs are what `objective`, one of
+    OBJECTIVES, measures on `cpu_model`."""
+    if objective not in OBJECTIVES:
+        raise ValueError(f"""objective "{objective}" should be one of {OBJECTIVES}""")
+    if objective == "cost":
+        return cpu_model
+
+    costs: Dict[str, float] = {}
+    for op, cost in cpu_model.costs.items():
+        if op in ("eps", "nop") or cost == inf_cost:
+            costs[op] = cost
+        elif objective == "latency":
+            costs[op] = cpu_model.latency(op)
+        else:
+            costs[op] = 1
+        pass
+    if objective == "latency":
+        shift_cost_fn = cpu_model.shift_latency
+    elif cpu_model.has_true_shift():
+        shift_cost_fn = lambda amount: 1  # noqa: E731
+    else:
+        shift_cost_fn = lambda amount: amount  # noqa: E731
+
+    # The least ratio of new cost to old.
+    ratios = [
+        costs[op] / cost
+        for op, cost in cpu_model.costs.items()
+        if op not in ("eps", "nop") and 0 < cost < inf_cost
+    ]
+    for amount in range(1, 65):
+        shift_cost = cpu_model.shift_cost_fn(amount)
+        if 0 < shift_cost < inf_cost:
+            ratios.append(shift_cost_fn(amount) / shift_cost)
+        pass
+    ratio = min(ratios, default=0)
+    lower_bound_fn = cpu_model.lower_bound_fn
+
+    return CPUProfile(
+        name=f"{cpu_model.name}, least {objective}",
+        instruction_type=cpu_model.instruction_type,
+        max_registers=cpu_model.max_registers,
+        costs=costs,
+        shift_cost_fn=shift_cost_fn,
+        lower_bound_fn=lambda n: ratio * lower_bound_fn(n),
+        shift_add_max=cpu_model.shift_add_max,
+        latencies=cpu_model.latencies,
+        issue_width=cpu_model.issue_width,
+    )
+
+
+def graph_latency(graph: "AdderGraph", cpu_model: CPUProfile) -> float:
+    """The latency of `graph` under `cpu_model`. Nodes are scheduled in
+    order, each instruction as soon as its operands are ready and there
+    is an issue slot free in that cycle. A shifted operand is a "shift"
+    before the node's operation, unless a "shift_add" is quicker.
+    """
+    issued: Dict[int, int] = {}
+
+    def issue(ready: float, latency: float) -> float:
+        """Start an instruction at the first free cycle from `ready`.
+        Return when its result is ready."""
+        cycle = int(-(-ready // 1))
+        while issued.get(cycle, 0) >= cpu_model.issue_width:
+            cycle += 1
+        issued[cycle] = issued.get(cycle, 0) + 1
+        return cycle + latency
+
+    def operand(value: int, shift_amount: int) -> float:
+        if shift_amount == 0:
+            return ready[value]
+        return issue(ready[value], cpu_model.shift_latency(shift_amount))
+
+    ready: Dict[int, float] = {1: 0}
+    for value, node in graph.nodes.items():
+        if node.op == "zero":
+            ready[value] = issue(0, cpu_model.latency("zero"))
+        elif node.op == "shift":
+            ready[value] = operand(node.left, node.left_shift)
+        elif node.op == "negate":
+            ready[value] = issue(operand(node.left, node.left_shift), cpu_model.latency("negate"))
+        else:
+            assert node.right is not None
+            shift_amount = node.left_shift or node.right_shift
+            if (
+                node.op == "add"
+                and (node.left_shift == 0) != (node.right_shift == 0)
+                and cpu_model.shift_add_cost(shift_amount) < inf_cost
+                and cpu_model.latency("shift_add")
+                < cpu_model.shift_latency(shift_amount) + cpu_model.latency("add")
+            ):
+                start = max(ready[node.left], ready[node.right])
+                ready[value] = issue(start, cpu_model.latency("shift_add"))
+            else:
+                start = max(operand(node.left, node.left_shift), operand(node.right, node.right_shift))
+                ready[value] = issue(start, cpu_model.latency(node.op))
+        pass
+    latency: float = 0
+    for value, shift_amount in graph.outputs.values():
+        latency = max(latency, operand(value, shift_amount))
+    return latency
+
+
+if __name__ == "__main__":
+    from mult_by_const.cpu import superscalar
+    from mult_by_const.instruction import print_instructions
+    from mult_by_const.mult import MultConst
+
+    n = 12345
+    for objective in OBJECTIVES:
+        cost, instrs = MultConst(cpu_model=superscalar, objective=objective).find_mult_sequence(n)
+        print(
+            f"least {objective}: {len(instrs)} instructions, "
+            f"latency {instruction_sequence_latency(instrs, superscalar)}"
+        )
+        print_instructions(instrs, n, cost)
+
+    graph = MultConst(cpu_model=superscalar).find_mcm_graph((3, 5, 9, 17, 33))[2]
+    print(f"MCM graph latency: {graph_latency(graph, superscalar)}")
@@ -0,0 +1,141 @@
+# Copyright (c) 2019 by Rocky Bernstein <rb@dustyfeet.com>
+"""
+Enumerate multipliers by cost, one cost level or "layer" at a time.
+
+Starting out from the entries that MultCache preloads, we grow
+outward, cheapest first, using the forward versions of the steps that
+the alpha-beta search takes backwards:
+
+* an odd number can be shifted by any amount,
+* an even number can have one added to or subtracted from it,
+* an odd number can be multiplied by a factor 2**i + 1 or 2**i - 1.
+
+Each multiplier is settled the first time it is reached, which is at
+its cheapest cost, so there is no need to call find_mult_sequence()
+on each candidate.
+
+Note that for an odd n, the search can go through n + 1, so we allow
+intermediate values up to one more than the largest multiplier asked
+for.
+"""
+
+import heapq
+from typing import Dict, Iterator, List, Tuple
+
+from mult_by_const.cpu import inf_cost
+from mult_by_const.instruction import OP_R1, Instruction
+from mult_by_const.multclass import MultConstClass
+
+
+def cost_layers(
+    self: MultConstClass, max_cost: float, limit: int
+) -> Iterator[Tuple[float, List[int]]]:
+    """Yield (cost, multipliers) pairs in increasing order of cost,
+    where "multipliers" are all of the numbers from 0 to `limit` whose
+    optimal cost is exactly "cost". We stop after the layer with cost
+    `max_cost`.
+
+    The preloaded cache entries for 0, 1 and -1 appear in the layer for
+    their cost. Other negative numbers are not generated.
+
+    Each multiplier found is recorded as finished in the multiplication
+    cache.
+    """
+    use_subtract = self.cpu_model.can_negate()
+    add_cost = self.op_costs["add"]
+    subtract_cost = self.op_costs.get("subtract", inf_cost)
+    cache = self.mult_cache
+
+    # The frontier holds (cost, multiplier, parent, suffix instructions)
+    frontier: List[Tuple[float, int, int, Tuple[Instruction, ...]]] = []
+    best: Dict[int, float] = {}
+    sequences: Dict[int, List[Instruction]] = {}
+
+    for n in (1, 0, -1):
+        _, cost, finished, instrs = cache.__getitem__(n, record=False)
+        if finished and cost <= max_cost and instrs is not None:
+            best[n] = cost
+            heapq.heappush(frontier, (cost, n, n, ()))
+        pass
+
+    def push(n: int, cost: float, parent: int, suffix: Tuple[Instruction, ...]) -> None:
+        if (
+            cost <= max_cost
+            and cost < best.get(n, inf_cost)
+            and self.fits_registers(sequences[parent], suffix)
+        ):
+            best[n] = cost
+            heapq.heappush(frontier, (cost, n, parent, suffix))
+
+    while frontier:
+        layer_cost = frontier[0][0]
+        layer: List[int] = []
+        while frontier and frontier[0][0] == layer_cost:
+            cost, n, parent, suffix = heapq.heappop(frontier)
+            if n in sequences or best[n] < cost:
+                # We've already settled this one more cheaply.
+                continue
+
+            if parent == n:
+                _, _, _, instrs = cache.__getitem__(n, record=False)
+                sequences[n] = [] if n == 1 else instrs  # type: ignore
+            else:
+                sequences[n] = sequences[parent] + list(suffix)
+                cache.insert_or_update(n, cost, cost, True, sequences[n])
+            if n <= limit:
+                layer.append(n)
+
+            if n <= 0:
+                # We only grow the positive numbers.
+                continue
+
+            if n & 1:
+                amount, shifted = 1, n << 1
+                while shifted <= limit + 1:
+                    shift_cost = self.shift_cost(amount)
+                    push(shifted, cost + shift_cost, n, (Instruction("shift", amount, shift_cost),))
+                    amount += 1
+                    shifted <<= 1
+                    pass
+
+                i, j = 1, 2
+                while n * (j + 1) <= limit + 1:
+                    shift_op_cost, shift_op_instrs = self.shift_op_instrs("add", i, n == 1)
+                    push(n * (j + 1), cost + shift_op_cost, n, tuple(shift_op_instrs))
+                    i += 1
+                    j <<= 1
+                    pass
+
+                if use_subtract:
+                    i, j = 3, 8
+                    while n * (j - 1) <= limit + 1:
+                        shift_op_cost, shift_op_instrs = self.shift_op_instrs("subtract", i, n == 1)
+                        push(n * (j - 1), cost + shift_op_cost, n, tuple(shift_op_instrs))
+                        i += 1
+                        j <<= 1
+                        pass
+                    pass
+            else:
+                push(n + 1, cost + add_cost, n, (Instruction("add", OP_R1, add_cost),))
+                if use_subtract:
+                    push(
+                        n - 1,
+                        cost + subtract_cost,
+                        n,
+                        (Instruction("subtract", OP_R1, subtract_cost),),
+                    )
+                pass
+            pass
+
+        if layer:
+            yield layer_cost, sorted(layer)
+        pass
+    return
+
+
+if __name__ == "__main__":
+    from mult_by_const.cpu import chained_adds
+
+    mconst = MultConstClass(cpu_model=chained_adds)
+    for cost, multipliers in cost_layers(mconst, 7, 64):
+        print(f"{cost}: {multipliers}")
@@ -8,9 +8,15 @@ load, and dump.
 import click
 import os
 import sys
+from mult_by_const.adder_graph import print_graph
 from mult_by_const.binary_method import binary_sequence
 from mult_by_const.cpu import SHORT2MODEL
-from mult_by_const.mult import MultConst
+from mult_by_const.dp_method import dp_table
+from mult_by_const.latency import OBJECTIVES
+from mult_by_const.mult import ENGINES, MultConst, SEED_METHODS
+from mult_by_const.parallel import parallel_table
+from mult_by_const.stats import dump_stats
+from mult_by_const.trace import JSONTracer
 from mult_by_const.instruction import print_instructions
 from mult_by_const.io import dump, dump_csv, dump_json, dump_yaml
 from mult_by_const.version import VERSION
@@ -23,7 +29,7 @@ program = os.path.splitext(os.path.basename(__file__))[0]
 @click.option(
     "--model",
     "-m",
-    type=click.Choice(("RISC", "adds")),
+    type=click.Choice(("RISC", "adds", "801", "superscalar", "2addr")),
     multiple=False,
     default="RISC",
     help="Intruction model and costs.",
@@ -46,6 +52,61 @@ program = os.path.splitext(os.path.basename(__file__))[0]
     default=False,
     help="Use binary method instead of searching.",
 )
+@click.option(
+    "--seed",
+    type=click.Choice(tuple(SEED_METHODS.keys())),
+    default="binary",
+    help="Method used to get an initial upper bound before searching.",
+)
+@click.option(
+    "--engine",
+    type=click.Choice(ENGINES),
+    default="recursive",
+    help="How to run the search. 'iterative' avoids Python's recursion limit.",
+)
+@click.option(
+    "--objective",
+    type=click.Choice(OBJECTIVES),
+    default="cost",
+    help="What to minimize: the sum of instruction costs, the latency, or the number of instructions.",
+)
+@click.option(
+    "--dp/--no-dp",
+    default=False,
+    help="With --to, build the table bottom up using dynamic programming instead of searching each number.",
+)
+@click.option(
+    "--jobs",
+    "-j",
+    type=int,
+    default=1,
+    help="With --to, split the table across this many worker processes.",
+)
+@click.option(
+    "--dag/--no-dag",
+    default=False,
+    help="Search for adder graphs, which can reuse any earlier value, instead of instruction sequences.",
+)
+@click.option(
+    "--mcm/--no-mcm",
+    default=False,
+    help="Multiply one input by all of NUMBERS, sharing intermediate values, and show the adder graph.",
+)
+@click.option(
+    "--pareto/--no-pareto",
+    default=False,
+    help="Show every sequence that no other beats in all of cost, latency and registers needed.",
+)
+@click.option(
+    "--stats/--no-stats",
+    default=False,
+    help="Show per-search-method statistics. With --fmt json or yaml these go in the cache dump.",
+)
+@click.option(
+    "--trace",
+    type=click.File("w"),
+    help="Write search events to this file as JSON, one event per line. Use - for standard output.",
+)
 @click.option(
     "--fmt",
     type=click.Choice(["csv", "json", "text", "yaml"], case_sensitive=False),
@@ -58,13 +119,49 @@ program = os.path.splitext(os.path.basename(__file__))[0]
 @click.option("--output", "-o", type=click.File("w"), help="File path to dump cache.")
 @click.version_option(version=VERSION)
 @click.argument("numbers", nargs=-1, type=int)
-def main(to, model, showcache, debug, binary_method, fmt, compact, output, numbers):
+def main(
+    to,
+    model,
+    showcache,
+    debug,
+    binary_method,
+    seed,
+    engine,
+    objective,
+    dp,
+    jobs,
+    dag,
+    mcm,
+    pareto,
+    stats,
+    trace,
+    fmt,
+    compact,
+    output,
+    numbers,
+):
     """Searches for short sequences of shift, add, subtract instruction to compute multiplication
     by a constant.
     """
     model = SHORT2MODEL[model]
-    mult = MultConst(cpu_model=model, debug=debug)
-    if to:
+    mult = MultConst(
+        cpu_model=model,
+        debug=debug,
+        seed_method=SEED_METHODS[seed],
+        engine=engine,
+        objective=objective,
+        collect_stats=stats,
+        tracer=JSONTracer(trace) if trace else None,
+    )
+    if to and dp and not binary_method:
+        dp_table(mult, to)
+    elif to and jobs > 1:
+        parallel_table(to, jobs, model, binary_method, mult.mult_cache, objective, mult.stats)
+    elif mcm:
+        cost, separate_cost, graph = mult.find_mcm_graph(numbers)
+        print_graph(graph)
+        print(f"Cost {cost} versus {separate_cost} for separate instruction sequences.")
+    elif to:
         for number in range(2, to + 1):
             if binary_method:
                 cost, instrs = binary_sequence(mult, number)
@@ -73,29 +170,56 @@ def main(to, model, showcache, debug, binary_method, fmt, compact, output, numbe
                 pass
             pass
         pass
+    elif pareto:
+        for number in numbers:
+            for cost, latency, registers, instrs in mult.find_pareto_front(number):
+                print(f"Latency {latency}, {registers} registers:")
+                print_instructions(instrs, number, cost)
+                pass
+            pass
+        pass
+    elif dag:
+        for number in numbers:
+            cost, graph = mult.find_adder_graph(number)
+            print_graph(graph)
+            pass
+        pass
     else:
         for number in numbers:
             if binary_method:
                 cost, instrs = binary_sequence(mult, number)
             else:
-                cost, instrs = mult.find_mult_sequence(number)
+                cost, instrs = mult.find_sequence(number)
 
             print_instructions(instrs, number, cost)
             pass
         pass
-    if output or showcache or to:
-        if output is None:
-            output = sys.stdout
+    dump_cache = output or showcache or to
+    if output is None:
+        output = sys.stdout
+    # JSON and YAML dumps hold the statistics so that the output stays a
+    # single document.
+    nested_stats = mult.stats if stats and dump_cache and fmt in ("json", "yaml") else None
+    if dump_cache:
         if fmt == "text":
             dump(mult.mult_cache, out=output)
         elif fmt == "csv":
             dump_csv(mult.mult_cache, out=output)
         elif fmt == "yaml":
-            dump_yaml(mult.mult_cache, out=output, compact=compact)
+            dump_yaml(mult.mult_cache, out=output, compact=compact, stats=nested_stats)
         else:
             assert fmt == "json"
             indent = None if compact else 2
-            dump_json(mult.mult_cache, out=output, indent=indent)
+            dump_json(mult.mult_cache, out=output, indent=indent, stats=nested_stats)
+
+    if stats and nested_stats is None:
+        if fmt == "json":
+            output.write(mult.stats.to_json(mult.mult_cache, indent=None if compact else 2))
+            output.write("\n")
+        else:
+            # A text dump has already shown the cache counters.
+            cache = None if dump_cache and fmt == "text" else mult.mult_cache
+            dump_stats(mult.stats, cache, out=output)
 
     return
 
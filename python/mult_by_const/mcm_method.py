@@ -0,0 +1,133 @@
+# Copyright (c) 2019 by Rocky Bernstein <rb@dustyfeet.com>
+"""Multiple-constant multiplication (MCM).
+
+Multiplying one input by each of several constants, say the
+coefficients of a filter, can share intermediate values between the
+constants. Here we build a single adder graph (see adder_graph.py) for
+all of the constants.
+
+This is a greedy method in the spirit of Dempster and Macleod's RAG-n.
+Each constant's own instruction sequence, as found by searching and
+recorded in the multiplication cache, gives a way to add it to the
+graph; values that are already in the graph are reused rather than
+computed again. Once the graph has some values, a constant may instead
+be a single "add" or "subtract" of two shifted values already there. At
+each step, the constant that is cheapest to add next is added, in its
+cheapest way.
+
+The total cost of the graph is never more than the sum of the costs of
+the constants' individual sequences. On a two-address CPU model that sum
+includes the copies of the input needed to run the sequences one after
+another.
+"""
+
+from typing import TYPE_CHECKING, Iterable, Optional, Tuple
+
+from mult_by_const.adder_graph import AdderGraph
+from mult_by_const.util import consecutive_zeros
+
+if TYPE_CHECKING:
+    from mult_by_const.mult import MultConst
+
+
+def single_node(graph: AdderGraph, n: int) -> Optional[Tuple[float, str, int, int, int]]:
+    """Find the cheapest way to get odd `n` as an "add" or "subtract" of two
+    values in `graph`, one of them shifted. Return (cost, op, shifted value,
+    shift amount, other value), or None if there is none.
+    """
+    assert n & 1
+    op_costs = graph.op_costs
+    can_subtract = "subtract" in op_costs
+    values = graph.values()
+    have = set(values)
+    best: Optional[Tuple[float, str, int, int, int]] = None
+    for shifted in values:
+        if shifted == 0:
+            continue
+        for shift_amount in range(1, max(n.bit_length() - shifted.bit_length(), 0) + 2):
+            shift_cost = graph.operand_cost(shift_amount)
+            if best is not None and best[0] <= shift_cost + op_costs["add"]:
+                break
+            operand = shifted << shift_amount
+            # n = (shifted << shift_amount) + other
+            if n - operand in have:
+                op, other = "add", n - operand
+            elif can_subtract and operand - n in have:
+                # n = (shifted << shift_amount) - other
+                op, other = "subtract", operand - n
+            else:
+                continue
+            cost = shift_cost + op_costs[op]
+            if best is None or cost < best[0]:
+                best = (cost, op, shifted, shift_amount, other)
+            pass
+        pass
+    return best
+
+
+def mcm_graph(self: "MultConst", constants: Iterable[int]) -> Tuple[float, float, AdderGraph]:
+    """Build an adder graph computing each of `constants` times one input.
+    Return (cost, separate_cost, graph) where "cost" is the cost of the
+    graph and "separate_cost" is the sum of the costs of computing each
+    constant with its own instruction sequence.
+    """
+    targets = sorted(set(constants))
+    sequences = {n: self.find_sequence(n) for n in targets}
+    separate_cost = sum(cost for cost, _ in sequences.values())
+    if self.cpu_model.is_two_address():
+        # Each sequence starts from its own copy of the input, which it
+        # then overwrites. Done one after another, all but the first need
+        # a real copy. Only 0 and 1 don't overwrite the input.
+        overwrites = sum(1 for n in targets if n not in (0, 1))
+        separate_cost += max(overwrites - 1, 0) * self.op_costs["copy"]
+
+    graph = AdderGraph(self.cpu_model)
+    remaining = set(targets)
+    while remaining:
+        best_cost, best_n, best_graph = None, 0, graph
+        # On a two-address CPU model, what is added can change the copies
+        # needed for what is already there, so we compare the whole cost.
+        graph_cost = graph.cost()
+        for n in sorted(remaining):
+            if graph.find(n) is not None:
+                # Just a shift, if that, of a value we have.
+                trial = graph.copy()
+                trial.add_output(n)
+                cost = trial.cost() - graph_cost
+            else:
+                trial = graph.copy()
+                trial.add_sequence(sequences[n][1])
+                trial.add_output(n)
+                cost = trial.cost() - graph_cost
+
+                # See if a single node from what we have does better.
+                if n != 0:
+                    _, odd = consecutive_zeros(n)
+                    found = single_node(graph, odd)
+                    if found is not None:
+                        _, op, shifted, shifted_by, other = found
+                        node_trial = graph.copy()
+                        node_trial.add_node(op, shifted, shifted_by, other, 0)
+                        node_trial.add_output(n)
+                        node_cost = node_trial.cost() - graph_cost
+                        if node_cost < cost:
+                            trial, cost = node_trial, node_cost
+            if best_cost is None or cost < best_cost:
+                best_cost, best_n, best_graph = cost, n, trial
+            pass
+        graph = best_graph
+        remaining.remove(best_n)
+        pass
+
+    return graph.cost(), separate_cost, graph
+
+
+if __name__ == "__main__":
+    from mult_by_const.adder_graph import print_graph
+    from mult_by_const.mult import MultConst
+
+    # Coefficients of a small low-pass FIR filter, scaled to integers.
+    coefficients = (3, 13, 29, 45, 53, 45, 29, 13, 3, -7, 115, 229)
+    cost, separate_cost, graph = mcm_graph(MultConst(), coefficients)
+    print(f"cost {cost} versus {separate_cost} separately")
+    print_graph(graph)
@@ -1,12 +1,27 @@
 # Copyright (c) 2019 by Rocky Bernstein <rb@dustyfeet.com>
 """Multiplication sequence searching."""
 
-from typing import List, Tuple
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 
+from mult_by_const.adder_graph import AdderGraph
+from mult_by_const.budget import SearchBudget
 from mult_by_const.multclass import MultConstClass
 from mult_by_const.cpu import inf_cost, DEFAULT_CPU_PROFILE
 from mult_by_const.binary_method import binary_sequence
+from mult_by_const.compiled import COMPILED_CACHE_SIZE, CompiledCache
+from mult_by_const.csd_method import csd_sequence
+from mult_by_const.dag_search import DAG_NODE_BUDGET, dag_search
+from mult_by_const.iterative_search import iterative_alpha_beta_search
+from mult_by_const.latency import objective_profile
+from mult_by_const.layers import cost_layers
+from mult_by_const.mcm_method import mcm_graph
+from mult_by_const.pareto import find_pareto_front
+from mult_by_const.pattern_method import pattern_sequence
+from mult_by_const.sequence import as_list
+from mult_by_const.wide_method import wide_sequence
 from mult_by_const.search_methods import (
+    alpha_beta_frame,
+    run_frame,
     search_add_one,
     search_add_or_subtract_one,
     # search_binary_method_with_cache,
@@ -15,9 +30,23 @@ from mult_by_const.search_methods import (
     search_short_add_factors,
     search_short_factors,
     search_subtract_one,
+    try_plus_offset_frame,
+    try_shift_op_factor_frame,
 )
 
-from mult_by_const.instruction import FACTOR_FLAG, Instruction, instruction_sequence_cost
+from mult_by_const.cache import FrontEntry
+from mult_by_const.instruction import Instruction
+
+# Methods for getting an initial upper bound on the cost of a multiplier.
+SEED_METHODS = {"binary": binary_sequence, "csd": csd_sequence}
+
+# Ways of running the alpha-beta search. "iterative" keeps its own stack
+# rather than recursing; see iterative_search.py.
+ENGINES = ("recursive", "iterative")
+
+# find_sequence() searches for multipliers of at most this many bits.
+# Wider ones, where searching gets slow, use the common-subpattern method.
+SEARCH_BITS = 32
 
 class MultConst(MultConstClass):
     def __init__(
@@ -25,10 +54,47 @@ class MultConst(MultConstClass):
         cpu_model=DEFAULT_CPU_PROFILE,
         debug=False,
         search_methods=None,
+        seed_method=None,
+        collect_stats=False,
+        tracer=None,
+        engine="recursive",
+        compiled_cache_size=COMPILED_CACHE_SIZE,
+        objective="cost",
+        cache_range=None,
+        cache_size=None,
     ):
-        super().__init__(cpu_model, debug, search_methods)
+        # What searching minimizes; see latency.py. Other than for "cost",
+        # we search with a profile whose costs measure that instead.
+        self.objective = objective
+        self.base_cpu_model = cpu_model
+        super().__init__(
+            objective_profile(cpu_model, objective),
+            debug,
+            search_methods,
+            collect_stats,
+            tracer,
+            cache_range,
+            cache_size,
+        )
+
+        # seed_method gives the initial upper bound for searching. It is
+        # either binary_sequence() or csd_sequence(); see SEED_METHODS.
+        self.seed_method = binary_sequence if seed_method is None else seed_method
+
+        if engine not in ENGINES:
+            raise ValueError(f"""search engine "{engine}" should be one of {ENGINES}""")
+        self.engine = engine
+
+        # Python functions compiled from instruction sequences; see compiled.py.
+        self.compiled_cache = CompiledCache(compiled_cache_size)
+
+        # Searchers for other objectives that find_mult_sequence() is asked for.
+        self.objective_mconsts: Dict[str, "MultConst"] = {}
+
+        # Searchers with the register budgets and weightings that
+        # find_pareto_front() combines.
+        self.front_mconsts: List["MultConst"] = []
 
-    # FIXME: move info search_methods
     def try_shift_op_factor(
         self,
         n: int,  # Number we are seeking
@@ -42,38 +108,13 @@ class MultConst(MultConstClass):
             Instruction
         ],  # If not empty, the best instruction sequence seen so for with cost "limit".
     ) -> Tuple[float, List[Instruction]]:
-        if (n % factor) == 0:
-            shift_cost = self.shift_cost(shift_amount)
-            shift_op_cost = self.op_costs[op] + shift_cost
-
-            # FIXME: figure out why lower != instruction_sequence_cost(instrs)
-            lower = instruction_sequence_cost(instrs) + shift_op_cost
-
-            if lower < upper:
-                m = n // factor
-                self.debug_msg(f"Trying factor {factor}...")
-                try_cost, try_instrs = self.alpha_beta_search(
-                    m, lower=lower, limit=(upper - (lower - shift_op_cost))
-                )
-                if try_cost < upper - lower:
-                    try_instrs.append(Instruction("shift", shift_amount, shift_cost))
-                    try_instrs.append(Instruction(op, FACTOR_FLAG, self.op_costs[op]))
-                    try_cost += shift_op_cost
-                    self.debug_msg(
-                        f"*update {n} using factor {factor}; cost {try_cost} < previous limit {upper}"
-                    )
-                    self.mult_cache.update_field(
-                        n, upper=try_cost, instrs=try_instrs
-                    )
-                    # Upper is the cost for the entire sequence; the remaining cost is in "lower".
-                    # However, in candidate_cost we factored in the "shift_op_cost" so we need to remove that.
-                    upper = try_cost
-                    candidate_instrs = try_instrs
-                pass
-            pass
-        return upper, candidate_instrs
+        return run_frame(
+            self,
+            try_shift_op_factor_frame(
+                self, n, factor, op, shift_amount, upper, lower, instrs, candidate_instrs
+            ),
+        )
 
-    # FIXME: move info search_methods
     def try_plus_offset(
         self,
         n: int,  # Number we are seeking
@@ -89,51 +130,42 @@ class MultConst(MultConstClass):
         ],  # The best current candidate sequencer. It or a different sequence is returned.
         op_flag,
     ) -> Tuple[float, List[Instruction]]:
-
-        op_str = "add" if increment < 0 else "subtract"
-        op_cost = self.op_costs[op_str]
-        try_lower = lower + op_cost
-        if try_lower < limit:
-            n1 = n + increment
-
-            cache_lower, neighbor_cost, finished, neighbor_instrs = self.mult_cache[n1]
-            if not finished:
-                if self.debug:
-                    which = "lower" if n1 < n else "upper"
-                    self.debug_msg(f"Trying {which} neighbor {n1} of {n}...")
-                    pass
-
-                neighbor_cost, neighbor_instrs = self.alpha_beta_search(
-                    n1, try_lower, limit=limit
-                )
-
-            try_cost = neighbor_cost + op_cost
-
-            if try_cost < limit:
-                self.debug_msg(
-                    f"*neighbor {n} update cost {try_cost}, previously {limit}."
-                )
-                limit = try_cost
-                neighbor_instrs.append(Instruction(op_str, op_flag, op_cost))
-                lower = min(self.mult_cache[n][0], try_cost)
-                self.mult_cache.insert_or_update(
-                    n, lower, try_cost, False, neighbor_instrs
-                )
-                candidate_instrs = neighbor_instrs
-                pass
-
-        return limit, candidate_instrs
+        return run_frame(
+            self,
+            try_plus_offset_frame(
+                self, n, increment, limit, lower, instrs, candidate_instrs, op_flag
+            ),
+        )
 
     def find_mult_sequence(
-        self, n: int, search_methods=None
+        self,
+        n: int,
+        search_methods=None,
+        time_budget: Optional[float] = None,
+        node_budget: Optional[int] = None,
+        objective: Optional[str] = None,
     ) -> Tuple[float, List[Instruction]]:
         """Top-level searching routine. Computes binary method upper bound
         and then does setup to the alpha-beta search
+
+        If `time_budget` (in seconds) or `node_budget` (a number of
+        alpha-beta search nodes) is given, searching stops when that runs
+        out, and we return the best sequence found so far. In that case the
+        cache entry for `n` is left unfinished, and a later call picks up
+        from its bounds. Use find_mult_bounds() to get those bounds.
+
+        `objective`, if given, says what to minimize instead of the one
+        this object was made with; see latency.OBJECTIVES. The cost
+        returned is then in its terms: the latency, say.
         """
+        if objective is not None and objective != self.objective:
+            return self.objective_mconst(objective).find_mult_sequence(
+                n, search_methods, time_budget, node_budget
+            )
 
         cache_lower, limit, finished, cache_instrs = self.mult_cache[n]
         if finished:
-            return limit, cache_instrs
+            return limit, as_list(cache_instrs)
 
         if n < 0 and not self.cpu_model.can_negate():
             raise RuntimeError(f"""CPU model "{self.cpu_model.name}" can't handle negative numbers.""")
@@ -167,19 +199,148 @@ class MultConst(MultConstClass):
             pass
 
         if limit == inf_cost:
-            # The binary sequence gives a workable upper bound on the cost
-            cache_lower, cache_instrs = binary_sequence(self, n)
+            # The binary or CSD sequence gives a workable upper bound on the cost
+            limit, cache_instrs = self.seed_method(self, n)
             self.mult_cache.insert_or_update(n, 0, limit, False, cache_instrs)
 
-        cost, instrs = self.alpha_beta_search(n, 0, limit=limit)
-        self.mult_cache.update_field(n, upper=cost, finished=True, instrs=instrs)
+        saved_budget = self.budget
+        if time_budget is not None or node_budget is not None:
+            self.budget = SearchBudget(time_budget, node_budget)
+        try:
+            if self.engine == "iterative":
+                cost, instrs = iterative_alpha_beta_search(self, n, 0, limit)
+            else:
+                cost, instrs = self.alpha_beta_search(n, 0, limit=limit)
+            finished = not self.out_of_budget()
+        finally:
+            self.budget = saved_budget
+
+        self.mult_cache.update_field(n, upper=cost, finished=finished, instrs=instrs)
         if instrs:
-            return cost, instrs
+            return cost, as_list(instrs)
         else:
-            return limit, cache_instrs
+            return limit, as_list(cache_instrs)
+
+    def cost_layers(
+        self, max_cost: float, limit: int
+    ) -> Iterator[Tuple[float, List[int]]]:
+        """Yield (cost, multipliers) for each cost level up to `max_cost`, where
+        multipliers are those numbers up to `limit` whose cost is exactly that
+        cost. See layers.cost_layers().
+        """
+        return cost_layers(self, max_cost, limit)
+
+    def find_wide_sequence(
+        self, n: int, window_bits: Optional[int] = None
+    ) -> Tuple[float, List[Instruction]]:
+        """Find an instruction sequence for a very wide `n`, one with hundreds or
+        thousands of bits, where find_mult_sequence() would take too long.
+        The result is generally not optimal. See wide_method.wide_sequence().
+        """
+        return wide_sequence(self, n, window_bits)
+
+    def find_pattern_sequence(
+        self, n: int, window_bits: Optional[int] = None
+    ) -> Tuple[float, List[Instruction]]:
+        """Find an instruction sequence for a wide `n` using common subpatterns
+        in its CSD or binary form, after Lefèvre's algorithm. This is never worse than
+        find_wide_sequence(), but is generally not optimal.
+        See pattern_method.pattern_sequence().
+        """
+        return pattern_sequence(self, n, window_bits)
+
+    def find_adder_graph(
+        self, n: int, node_budget: Optional[int] = DAG_NODE_BUDGET
+    ) -> Tuple[float, AdderGraph]:
+        """Find an adder graph for multiplying by `n` whose instructions can use
+        any value computed earlier, not just those an instruction sequence
+        has. This is never more costly than find_mult_sequence(). See
+        dag_search.dag_search().
+        """
+        return dag_search(self, n, node_budget)
+
+    def find_mcm_graph(
+        self, constants: Iterable[int]
+    ) -> Tuple[float, float, AdderGraph]:
+        """Find an adder graph that multiplies one input by each of `constants`,
+        sharing intermediate values between them. Return (cost, separate_cost,
+        graph) where "separate_cost" is the sum of the costs of each constant's
+        own instruction sequence. See mcm_method.mcm_graph().
+        """
+        return mcm_graph(self, constants)
+
+    def find_sequence(self, n: int) -> Tuple[float, List[Instruction]]:
+        """Find an instruction sequence for `n`, choosing how by its size:
+        multipliers of up to SEARCH_BITS bits are searched for with
+        find_mult_sequence(); wider ones use find_pattern_sequence().
+        """
+        if n.bit_length() <= SEARCH_BITS:
+            return self.find_mult_sequence(n)
+        return self.find_pattern_sequence(n)
+
+    def find_pareto_front(self, n: int) -> List[FrontEntry]:
+        """Return every instruction sequence for `n` that no other beats in
+        all of cost, latency and registers needed, as (cost, latency,
+        registers, instructions), in order of cost. See
+        pareto.find_pareto_front().
+        """
+        return find_pareto_front(self, n)
+
+    def objective_mconst(self, objective: str) -> "MultConst":
+        """Return the object that searches for `objective` on our CPU model,
+        making it the first time we're asked."""
+        mconst = self.objective_mconsts.get(objective)
+        if mconst is None:
+            mconst = MultConst(
+                cpu_model=self.base_cpu_model,
+                seed_method=self.seed_method,
+                engine=self.engine,
+                objective=objective,
+                cache_size=self.mult_cache.max_entries,
+            )
+            self.objective_mconsts[objective] = mconst
+        return mconst
+
+    def compiled(self, n: int) -> Callable:
+        """Return a Python function that multiplies its argument by `n`,
+        compiled from the instruction sequence that find_sequence() gives.
+        The most recently used functions are kept; see compiled.py.
+        """
+        return self.compiled_cache.get(n, self.find_sequence)
+
+    def find_mult_bounds(
+        self,
+        n: int,
+        time_budget: Optional[float] = None,
+        node_budget: Optional[int] = None,
+    ) -> Tuple[float, float, bool, List[Instruction]]:
+        """Search for `n` as find_mult_sequence() does, with the given
+        budget, and return (lower, upper, finished, instructions) where
+        "instructions" is the best sequence found, with cost "upper".
+        "lower" is a bound that no sequence for `n` can cost less than.
+        If "finished" is True, "upper" is the cost that a full search gives.
+        """
+        upper, instrs = self.find_mult_sequence(
+            n, time_budget=time_budget, node_budget=node_budget
+        )
+        cache_lower, _, finished, _ = self.mult_cache.__getitem__(n, record=False)
+        if finished:
+            return upper, upper, True, instrs
+        lower = min(max(cache_lower, self.lower_bound(n)), upper)
+        if lower == upper:
+            # The sequence is as cheap as any can be.
+            self.mult_cache.update_field(n, lower=lower, finished=True)
+            return lower, upper, True, instrs
+        self.mult_cache.update_field(n, lower=lower)
+        return lower, upper, False, instrs
 
     def alpha_beta_search(
-        self, n: int, lower: float, limit: float
+        self,
+        n: int,
+        lower: float,
+        limit: float,
+        time_budget: Optional[float] = None,
+        node_budget: Optional[int] = None,
     ) -> Tuple[float, List[Instruction]]:
         """Alpha-beta search
 
@@ -201,88 +362,23 @@ class MultConst(MultConstClass):
         We return the lowest cost we can find using "n" in the sequence. Note that we
         don't return the cost of computing "n", but rather of the total sequence. If
         you subtract the "lower" value *on entry* than that is the cost of computing "n".
-        """
-
-        self.debug_msg(
-            f"alpha-beta search for {n} in at most {limit-lower} = max alotted cost: {limit}, incurred cost {lower}",
-            2,
-        )
-
-        # FIXME: should be done in caller?
-        cache_lower, cache_upper, finished, cache_instrs = self.mult_cache[n]
-        if finished:
-            self.debug_msg(
-                f"alpha-beta using cache entry for {n} cost: {cache_upper}", -2
-            )
-            return cache_upper, [] if n == 1 else cache_instrs
 
-        orig_n = n
-        n, need_negation = self.need_negation(n)
+        time_budget, node_budget: if given, limit searching as described in
+               find_mult_sequence(). When the budget runs out, results are
+               recorded in the cache as unfinished.
 
-        assert n > 0
-
-        instrs: List[Instruction] = []
-        m, shift_cost, shift_amount = self.make_odd(n, 0, instrs)
-
-        lower += shift_cost
-        if lower > limit:
-            self.debug_msg(
-                f"**alpha cutoff after shift for {n} incurred {lower} > {limit} alotted",
-                -2,
-            )
-            return inf_cost, []
-
-        # Make "m" negative if "n" was and search for that directly
-        if need_negation:
-            m = -m
-
-        candidate_instrs: List[Instruction] = []
-
-        # If we have caching enabled, m != 1 since caching will catch earlier.
-        # However for saftey and extreme cases where we don't have caching,
-        # we will test here.
-        if m in (-1, 0, 1):
-            _, limit, _, candidate_instrs = self.mult_cache[m]
-            limit += shift_cost
-            lower = limit
-        else:
-
-            # FIXME: might be "limit - shift" cost, but possibly a bug in
-            # add/subtract one will prevent a needed cost update when this
-            # happens. Investigate and fix.
-            search_limit = limit
-
-            for fn in self.search_methods:
-                candidate_upper, candidate_instrs = fn(
-                    self, m, search_limit, lower, instrs, candidate_instrs
-                )
-                if candidate_upper + shift_cost < search_limit:
-                    search_limit = candidate_upper
-                    self.debug_msg(
-                        f"*alpha-beta lowering limit of {m} cost to {search_limit} via search {fn.__name__}"
-                    )
-                    pass
-                pass
-            if search_limit < limit:
-                limit = search_limit + shift_cost
-            pass
-        if candidate_instrs:
-            if shift_amount:
-                candidate_instrs.append(Instruction("shift", shift_amount, shift_cost))
-            limit = instruction_sequence_cost(candidate_instrs)
-            self.mult_cache.insert_or_update(orig_n, limit, limit, True, candidate_instrs)
-        else:
-            candidate_instrs = cache_instrs
-
-        if not candidate_instrs:
-            self.debug_msg(
-                f"**cutoffs before anything found for {orig_n}; check/update instructions used to {limit - lower}"
-            )
-            self.mult_cache.update_field(orig_n, lower=limit - lower)
-
-        self.dedent()
-
-        return limit, candidate_instrs
+        The search at each node is search_methods.alpha_beta_frame(); we
+        answer the searches it asks for by recursing.
+        """
+        if time_budget is not None or node_budget is not None:
+            saved_budget = self.budget
+            self.budget = SearchBudget(time_budget, node_budget)
+            try:
+                return self.alpha_beta_search(n, lower, limit)
+            finally:
+                self.budget = saved_budget
+
+        return run_frame(self, alpha_beta_frame(self, n, lower, limit))
 
     pass
 
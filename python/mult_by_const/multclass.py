@@ -1,11 +1,22 @@
 # Copyright (c) 2019 by Rocky Bernstein <rb@dustyfeet.com>
 """Multiplication sequence searching."""
 
-from typing import List, Tuple
+from typing import List, Optional, Sequence, Tuple
 
+from mult_by_const.array_cache import ArrayMultCache
+from mult_by_const.budget import SearchBudget
 from mult_by_const.cache import MultCache
 from mult_by_const.cpu import DEFAULT_CPU_PROFILE
-from mult_by_const.instruction import Instruction
+from mult_by_const.instruction import (
+    FACTOR_FLAG,
+    OP_R1,
+    REVERSE_SUBTRACT_1,
+    Instruction,
+    shared_instruction,
+)
+from mult_by_const.registers import SEQUENCE_REGISTERS, register_count
+from mult_by_const.stats import SearchStats
+from mult_by_const.trace import PrintTracer, Tracer
 from mult_by_const.util import consecutive_zeros
 
 
@@ -15,6 +26,10 @@ class MultConstClass:
         cpu_model=DEFAULT_CPU_PROFILE,
         debug=False,
         search_methods=None,
+        collect_stats=False,
+        tracer=None,
+        cache_range=None,
+        cache_size=None,
     ):
 
         # Op_costs gives costs of using each kind of instruction.
@@ -24,6 +39,10 @@ class MultConstClass:
         self.op_costs = cpu_model.costs
         self.shift_cost = cpu_model.shift_cost_fn
 
+        # A cost that computing a number can never be less than.
+        # Used to cut off branches of the search before recursing.
+        self.lower_bound = cpu_model.lower_bound_fn
+
         # Cache prior searches
         # The key is the positive number looked up.
         # The value is a tuple of: lower bound, upper bound,
@@ -39,24 +58,37 @@ class MultConstClass:
 
         # FIXME: give an examples here. Also attach names "alpha" and
         # and "beta" with the different types of cutoffs.
-        self.mult_cache = MultCache(cpu_model)
-        self.debug = debug
+        #
+        # If "cache_range" is given as (start, stop), entries for numbers
+        # in range(start, stop) are kept in compact arrays; see array_cache.py.
+        # If "cache_size" is given, the cache keeps to that many entries;
+        # see MultCache.evict().
+        if cache_range is None:
+            self.mult_cache = MultCache(cpu_model, max_entries=cache_size)
+        else:
+            self.mult_cache = ArrayMultCache(cpu_model, *cache_range, max_entries=cache_size)
         self.eps = self.op_costs["eps"]
         self.search_methods = search_methods
 
-        # We use indent show nesting in debug output
-        self.indent = 0
-        return
+        # Per-search-method counters; see stats.py. Gathering these slows
+        # searching down, so it is only done when asked for.
+        self.stats: Optional[SearchStats] = SearchStats() if collect_stats else None
 
-    def dedent(self) -> None:
-        if self.debug:
-            self.indent -= 2
+        # Search events are reported to the tracer, if there is one; see trace.py.
+        # "debug" is a shorthand for human-readable tracing.
+        if tracer is None and debug:
+            tracer = PrintTracer()
+        self.tracer: Optional[Tracer] = tracer
 
-    def debug_msg(self, s: str, relative_indent=0) -> None:
-        if self.debug:
-            print(f"{' '*self.indent}{s}")
-            if relative_indent:
-                self.indent += relative_indent
+        # Limits on searching, if any; see budget.py.
+        self.budget: Optional[SearchBudget] = None
+        return
+
+    def out_of_budget(self) -> bool:
+        """Return True if searching is being cut short because the search
+        budget has run out. Search results are then not known to be optimal.
+        """
+        return self.budget is not None and self.budget.exhausted
 
     def make_odd(
         self, n: int, cost: float, result: List[Instruction]
@@ -70,17 +102,76 @@ class MultConstClass:
         if shift_amount:
             shift_cost = self.shift_cost(shift_amount)
             cost += shift_cost
-            result.append(Instruction("shift", shift_amount, shift_cost))
+            result.append(shared_instruction("shift", shift_amount, shift_cost))
             pass
         return (n, cost, shift_amount)
 
+    def copy_instrs(self, what: int) -> List[Instruction]:
+        """Return the "copy" of n (`what` 0) or of r1 (`what` OP_R1) that a
+        two-address CPU model needs; other models don't need any."""
+        if not self.cpu_model.is_two_address():
+            return []
+        return [shared_instruction("copy", what, self.op_costs["copy"])]
+
+    def shift_op_instrs(
+        self, op: str, shift_amount: int, input_unchanged: bool = False
+    ) -> Tuple[float, List[Instruction]]:
+        """Return the cost of and the cheapest instructions for shifting by
+        `shift_amount` and then doing `op`, "add" or "subtract", with the
+        value before the shift. That is a "shift" followed by `op`, or for
+        "add", a single "shift_add" when the CPU model has a cheaper one.
+
+        On a two-address CPU model the value before the shift has to be
+        copied first, unless `input_unchanged` says it is still the input,
+        which r1 holds.
+        """
+        shift_cost = self.shift_cost(shift_amount)
+        instrs = [] if input_unchanged else self.copy_instrs(0)
+        cost = self.op_costs[op] + shift_cost + sum(instr.cost for instr in instrs)
+        if op == "add":
+            shift_add_cost = self.cpu_model.shift_add_cost(shift_amount)
+            if shift_add_cost < cost:
+                return shift_add_cost, [shared_instruction("shift_add", shift_amount, shift_add_cost)]
+        return cost, instrs + [
+            shared_instruction("shift", shift_amount, shift_cost),
+            shared_instruction(op, FACTOR_FLAG, self.op_costs[op]),
+        ]
+
+    def op_instrs(self, op_name: str, op_flag: int) -> Tuple[float, List[Instruction]]:
+        """Return the cost of and the instructions for `op_name` with
+        `op_flag`. On a two-address CPU model, a reverse subtract from r1
+        needs a copy of r1 to subtract from."""
+        instrs = self.copy_instrs(OP_R1) if op_flag == REVERSE_SUBTRACT_1 else []
+        instrs.append(shared_instruction(op_name, op_flag, self.op_costs[op_name]))
+        return sum(instr.cost for instr in instrs), instrs
+
     def add_instruction(
         self, bin_instrs: List[Instruction], op_name: str, op_flag: int
     ) -> float:
-        cost = self.op_costs[op_name]
-        bin_instrs.append(Instruction(op_name, op_flag, cost))
+        cost, instrs = self.op_instrs(op_name, op_flag)
+        bin_instrs.extend(instrs)
         return cost
 
+    def fits_registers(
+        self,
+        instrs: Sequence[Instruction],
+        suffix: Sequence[Instruction] = (),
+        input_needed: bool = False,
+    ) -> bool:
+        """Return True if `instrs` followed by `suffix` needs no more
+        registers than the CPU model has; see registers.py. `input_needed`
+        says whether r1 is used after that."""
+        max_registers = self.cpu_model.max_registers
+        if max_registers >= SEQUENCE_REGISTERS:
+            return True
+        return register_count(list(instrs) + list(suffix), input_needed) <= max_registers
+
+    def reverse_subtract_one(self, instrs: List[Instruction]) -> float:
+        """Turn the final n - 1 of `instrs` into 1 - n, its negative.
+        Return the change in cost."""
+        subtract = instrs.pop()
+        return self.add_instruction(instrs, "subtract", REVERSE_SUBTRACT_1) - subtract.cost
+
     def need_negation(self, n: int) -> Tuple[int, bool]:
         """
         See if we need to negate n and check that the CPU model can handle negation.
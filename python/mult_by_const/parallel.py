@@ -0,0 +1,129 @@
+# Copyright (c) 2019 by Rocky Bernstein <rb@dustyfeet.com>
+"""
+Build multiplication tables in parallel using a pool of processes.
+
+The range of numbers is split into shards of consecutive numbers.
+Each worker process keeps its own MultConst, and so its own MultCache,
+from one shard to the next. When a shard is done, the worker sends
+back the entries for the numbers in that shard, and these are merged
+into a single cache, keeping the cheaper finished entry for each
+number. Search statistics, when they are asked for, are merged the
+same way.
+
+Note that for some cost models, like "chained adds", what the search
+finds depends on what is already in the cache. So a worker that starts
+a shard with a cache that hasn't seen the numbers just below it may
+report a slightly more costly sequence than a single sequential run
+would.
+"""
+
+from multiprocessing import Pool
+from typing import List, Optional, Tuple
+
+from mult_by_const.binary_method import binary_sequence
+from mult_by_const.cache import CacheEntry, MultCache
+from mult_by_const.cpu import DEFAULT_CPU_PROFILE, NAME2MODEL
+from mult_by_const.latency import objective_profile
+from mult_by_const.mult import MultConst
+from mult_by_const.stats import SearchStats
+
+# The number of shards handed out per worker. More shards than workers
+# evens out the load, since larger numbers take longer to search.
+SHARDS_PER_JOB = 4
+
+# The MultConst object for a worker process. This is set in _init_worker().
+_worker_mconst: Optional[MultConst] = None
+_worker_binary_method = False
+
+ShardResult = Tuple[List[Tuple[int, CacheEntry]], int, int, int, Optional[SearchStats]]
+
+
+def _init_worker(model_name: str, binary_method: bool, objective: str, collect_stats: bool) -> None:
+    global _worker_mconst, _worker_binary_method
+    _worker_mconst = MultConst(
+        cpu_model=NAME2MODEL[model_name], objective=objective, collect_stats=collect_stats
+    )
+    _worker_binary_method = binary_method
+
+
+def _build_shard(shard: Tuple[int, int]) -> ShardResult:
+    """Compute entries for the numbers in the half-open range `shard`.
+    We return the cache entries for those numbers, along with the
+    changes in the worker's cache statistics and, if it collects them,
+    its search statistics for the shard.
+    """
+    mconst = _worker_mconst
+    assert mconst is not None, "_init_worker() should have been called"
+    mcache = mconst.mult_cache
+    hits_exact, hits_partial, misses = mcache.hits_exact, mcache.hits_partial, mcache.misses
+    if mconst.stats is not None:
+        mconst.stats.clear()
+    start, stop = shard
+    for n in range(start, stop):
+        if _worker_binary_method:
+            binary_sequence(mconst, n)
+        else:
+            mconst.find_mult_sequence(n)
+        pass
+    entries = [(n, mcache.cache[n]) for n in range(start, stop) if n in mcache]
+    return (
+        entries,
+        mcache.hits_exact - hits_exact,
+        mcache.hits_partial - hits_partial,
+        mcache.misses - misses,
+        mconst.stats,
+    )
+
+
+def make_shards(start: int, stop: int, count: int) -> List[Tuple[int, int]]:
+    """Split the half-open range [start, stop) into at most `count`
+    half-open ranges of consecutive numbers."""
+    size = max(1, -(-(stop - start) // count))
+    return [(i, min(i + size, stop)) for i in range(start, stop, size)]
+
+
+def parallel_table(
+    to: int,
+    jobs: int,
+    cpu_model=DEFAULT_CPU_PROFILE,
+    binary_method: bool = False,
+    mcache: Optional[MultCache] = None,
+    objective: str = "cost",
+    stats: Optional[SearchStats] = None,
+) -> MultCache:
+    """Compute multiplication sequences for 2..`to` using `jobs` worker
+    processes, and return a cache holding the merged results.
+
+    `cpu_model` has to be one of the profiles in cpu.NAME2MODEL, since it
+    is passed to the workers by name. `objective` is what searching
+    minimizes; see latency.py. If `stats` is given, the workers collect
+    search statistics and they are added into it.
+    """
+    if cpu_model.name not in NAME2MODEL:
+        raise ValueError(
+            f"""CPU model "{cpu_model.name}" is not known by name, so it can't be used in a worker process."""
+        )
+    if mcache is None:
+        mcache = MultCache(objective_profile(cpu_model, objective))
+
+    shards = make_shards(2, to + 1, jobs * SHARDS_PER_JOB)
+    initargs = (cpu_model.name, binary_method, objective, stats is not None)
+    with Pool(jobs, initializer=_init_worker, initargs=initargs) as pool:
+        for entries, hits_exact, hits_partial, misses, shard_stats in pool.imap_unordered(
+            _build_shard, shards
+        ):
+            mcache.merge(entries)
+            mcache.hits_exact += hits_exact
+            mcache.hits_partial += hits_partial
+            mcache.misses += misses
+            if stats is not None and shard_stats is not None:
+                stats.merge(shard_stats)
+            pass
+        pass
+    return mcache
+
+
+if __name__ == "__main__":
+    from mult_by_const.io import dump
+
+    dump(parallel_table(100, 4))
@@ -0,0 +1,171 @@
+# Copyright (c) 2019 by Rocky Bernstein <rb@dustyfeet.com>
+"""Sequences that trade cost, latency and registers off against each other.
+
+find_mult_sequence() gives one sequence: the one that minimizes a single
+objective. A compiler that picks a sequence only once it knows how many
+registers are free, or how much latency it can hide, wants all the
+sequences that might be the right choice. Those are the ones that are
+not "dominated": no other sequence is at least as good in cost, latency
+and registers needed, and better in one of them. Together they are the
+Pareto front.
+
+The searches can't keep more than one sequence per number, so the front
+is put together from several searches:
+
+* Registers are few and small, so they are handled as a constraint: we
+  search with a register budget of SEQUENCE_REGISTERS, then with one
+  less, down to 2; see registers.py. Every sequence but a lone shift
+  needs the input and the product, so a budget of 1 can't be kept.
+
+* Within a budget, each search minimizes a weighted sum of cost and
+  latency, for each pair of weights in FRONT_WEIGHTS. Large weights on
+  one side find the least cost or latency and break ties on the other.
+
+Weighted sums can only find the sequences on the convex hull of the
+front. A sequence whose cost and latency are both between those of two
+others, but not below the line joining them, is missed. For instruction
+sequences, where latency is mostly the sum of costs, that is rare.
+
+find_pareto_front() caches the front it finds in the MultCache, see
+MultCache.insert_front(), so each number's front is searched for once.
+"""
+
+from typing import TYPE_CHECKING, Dict, List
+
+from mult_by_const.cache import FrontEntry
+from mult_by_const.cpu import CPUProfile, inf_cost
+from mult_by_const.instruction import Instruction, instruction_sequence_cost
+from mult_by_const.latency import instruction_sequence_latency, objective_profile
+from mult_by_const.registers import SEQUENCE_REGISTERS, register_count
+
+if TYPE_CHECKING:
+    from mult_by_const.mult import MultConst
+
+# (cost weight, latency weight) of each search for a register budget.
+# Integer weights keep costs that are whole numbers exact.
+FRONT_WEIGHTS = ((64, 1), (4, 1), (1, 1), (1, 4), (1, 64))
+
+
+def instruction_cost(instr: Instruction, cpu_model: CPUProfile) -> float:
+    """The cost of `instr` under `cpu_model`, whatever profile costed it."""
+    return cpu_model.op_cost(instr.op, instr.amount)
+
+
+def front_entry(instrs: List[Instruction], cpu_model: CPUProfile) -> FrontEntry:
+    """Measure `instrs`, which a search with some other profile found,
+    under `cpu_model`, and cost its instructions that way too."""
+    instrs = [Instruction(instr.op, instr.amount, instruction_cost(instr, cpu_model)) for instr in instrs]
+    return (
+        instruction_sequence_cost(instrs),
+        instruction_sequence_latency(instrs, cpu_model),
+        register_count(instrs),
+        instrs,
+    )
+
+
+def dominates(a: FrontEntry, b: FrontEntry) -> bool:
+    """Return True if `a` is at least as good as `b` in cost, latency and
+    registers, and better in at least one of them."""
+    return a[:3] != b[:3] and all(x <= y for x, y in zip(a[:3], b[:3]))
+
+
+def pareto_filter(entries: List[FrontEntry]) -> List[FrontEntry]:
+    """Return the entries of `entries` that no other entry dominates, in
+    order of cost. Of entries that measure the same, only the first is kept."""
+    front: List[FrontEntry] = []
+    for entry in sorted(entries, key=lambda entry: entry[:3]):
+        if not any(kept[:3] == entry[:3] or dominates(kept, entry) for kept in front):
+            front.append(entry)
+        pass
+    return front
+
+
+def weighted_profile(
+    cpu_model: CPUProfile, cost_weight: int, latency_weight: int, max_registers: int
+) -> CPUProfile:
+    """Return a CPU profile with `max_registers` registers whose costs
+    are `cost_weight` times those of `cpu_model` plus `latency_weight`
+    times its latencies."""
+    latency_model = objective_profile(cpu_model, "latency")
+    costs: Dict[str, float] = {}
+    for op, cost in cpu_model.costs.items():
+        if op in ("eps", "nop") or cost == inf_cost:
+            costs[op] = cost
+        else:
+            costs[op] = cost_weight * cost + latency_weight * latency_model.costs[op]
+        pass
+
+    def shift_cost_fn(amount: int) -> float:
+        shift_cost = cpu_model.shift_cost_fn(amount)
+        return cost_weight * shift_cost + latency_weight * cpu_model.shift_latency(amount)
+
+    def lower_bound_fn(n: int) -> float:
+        # Each part never overestimates, so neither does their sum.
+        return cost_weight * cpu_model.lower_bound_fn(n) + latency_weight * latency_model.lower_bound_fn(n)
+
+    return CPUProfile(
+        name=f"{cpu_model.name}, {cost_weight} cost + {latency_weight} latency, {max_registers} registers",
+        instruction_type=cpu_model.instruction_type,
+        max_registers=max_registers,
+        costs=costs,
+        shift_cost_fn=shift_cost_fn,
+        lower_bound_fn=lower_bound_fn,
+        shift_add_max=cpu_model.shift_add_max,
+        latencies=cpu_model.latencies,
+        issue_width=cpu_model.issue_width,
+    )
+
+
+def front_mconsts(self: "MultConst") -> List["MultConst"]:
+    """Return the searchers that find_pareto_front() combines, making
+    them the first time we're asked."""
+    if not self.front_mconsts:
+        from mult_by_const.mult import MultConst
+
+        cpu_model = self.base_cpu_model
+        for max_registers in range(min(cpu_model.max_registers, SEQUENCE_REGISTERS), 1, -1):
+            for cost_weight, latency_weight in FRONT_WEIGHTS:
+                self.front_mconsts.append(
+                    MultConst(
+                        cpu_model=weighted_profile(cpu_model, cost_weight, latency_weight, max_registers),
+                        seed_method=self.seed_method,
+                        engine=self.engine,
+                        cache_size=self.mult_cache.max_entries,
+                    )
+                )
+            pass
+        pass
+    return self.front_mconsts
+
+
+def find_pareto_front(self: "MultConst", n: int) -> List[FrontEntry]:
+    """Return the (cost, latency, registers, instructions) of each
+    sequence for `n` on the Pareto front, in order of cost. Cost and
+    latency are those of our CPU model, not of the objective we search
+    for."""
+    front = self.mult_cache.front(n)
+    if front is not None:
+        return front
+
+    cpu_model = self.base_cpu_model
+    entries = [front_entry(self.find_mult_sequence(n, objective="cost")[1], cpu_model)]
+    for mconst in front_mconsts(self):
+        cost, instrs = mconst.find_mult_sequence(n)
+        if cost < inf_cost:
+            entries.append(front_entry(instrs, cpu_model))
+        pass
+
+    front = pareto_filter(entries)
+    self.mult_cache.insert_front(n, front)
+    return self.mult_cache.front(n) or []
+
+
+if __name__ == "__main__":
+    from mult_by_const.cpu import superscalar
+    from mult_by_const.mult import MultConst
+
+    mconst = MultConst(cpu_model=superscalar)
+    for n in (51, 12345):
+        print(f"{n}:")
+        for cost, latency, registers, instrs in mconst.find_pareto_front(n):
+            print(f"  cost {cost}, latency {latency}, {registers} registers: {instrs}")
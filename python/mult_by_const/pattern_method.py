@@ -0,0 +1,235 @@
+# Copyright (c) 2019 by Rocky Bernstein <rb@dustyfeet.com>
+"""
+Multiplication using common subpatterns, after V. Lefèvre's algorithm.
+
+See vinc17/rigo/rigo.c for Raphaël Rigo's C implementation of the
+algorithm, and "Multiplication by an integer constant" by Lefèvre.
+
+Lefèvre's algorithm looks in the canonical signed-digit (CSD) form of a
+number n for a pattern P of nonzero digits that occurs twice, at some
+distance d apart, with either the same signs or opposite signs. So
+n = P * 2**d + P + R or n = P * 2**d - P + R, where R is the
+remainder: the digits not in either occurrence. Each distance is given
+a weight, the number of digit pairs that line up at that distance, and
+the pattern for the distance with the most weight is used. Multiplying
+by P is then done by recursing on P.
+
+The remainder R has to be computed separately and added in, which the
+instruction sequences here can't do: they only have the number being
+built up, the original input, and the value before the last shift. So
+we only use patterns that start at the top digit of n, where n's digits
+down to some position s are exactly those of P * 2**d + P or
+P * 2**d - P. That part is computed with P's sequence followed by a
+"shift" and an "add" or "subtract" of the value before the shift. The
+digits below s are then added in one at a time as in the CSD method.
+
+Carries can break up a pattern in the CSD form that the binary form
+still shows, so we look in both. Where the two copies of P overlap, the
+digits of neither form need show a pattern, so we also try the largest
+d for which n is a multiple of 2**d + 1 or 2**d - 1.
+
+As in wide_method.py, numbers that are narrow enough are searched for
+directly, and if no pattern is worth using we fall back to the wide
+method.
+"""
+
+from typing import TYPE_CHECKING, Dict, List, Optional, Set, Tuple
+
+from mult_by_const.csd_method import naf_digits
+from mult_by_const.instruction import (
+    OP_R1,
+    Instruction,
+    instruction_sequence_cost,
+)
+from mult_by_const.sequence import as_list
+from mult_by_const.util import consecutive_zeros
+from mult_by_const.wide_method import (
+    WIDE_WINDOW_BITS,
+    WINDOW_NODE_BUDGET,
+    naf_prefixes,
+    wide_sequence,
+)
+
+if TYPE_CHECKING:
+    from mult_by_const.mult import MultConst
+
+# A pattern has to pair up at least this many digits to be used.
+MIN_PATTERN_WEIGHT = 2
+
+
+def binary_digits(n: int) -> List[Tuple[int, int]]:
+    """Return the one bits of `n` > 0 as a list of (position, 1) pairs, with
+    the most-significant bit first, as naf_digits() does for the CSD form.
+    """
+    return [(position, 1) for position in range(n.bit_length() - 1, -1, -1) if (n >> position) & 1]
+
+
+def top_pattern(digits: List[Tuple[int, int]]) -> Optional[Tuple[int, int, int]]:
+    """Given the nonzero CSD or binary digits of an odd number n, most
+    significant first, find the heaviest pattern starting at the top digit. We return
+    (weight, distance, sign) where the top 2 * weight digits of n are
+    P * (2**distance + sign) for some P with "weight" nonzero digits, or
+    None if there is no pattern of at least MIN_PATTERN_WEIGHT.
+
+    Like Compute_Weights_Unique() in rigo.c, we only consider distances
+    that pair the top digit with some other nonzero digit.
+    """
+    digit_at: Dict[int, int] = dict(digits)
+    top_position = digits[0][0]
+    best = None
+    best_weight = MIN_PATTERN_WEIGHT - 1
+    for partner_position, partner_digit in digits[1:]:
+        distance = top_position - partner_position
+        sign = partner_digit  # The top digit is 1.
+
+        # Walk down the digits. Each one is either the lower copy of an
+        # earlier digit, or the upper copy of a digit that has to be
+        # "distance" positions below it.
+        expected: Set[int] = set()
+        weight = 0
+        for position, digit in digits:
+            if position in expected:
+                expected.remove(position)
+                if not expected and weight > best_weight:
+                    best, best_weight = (weight, distance, sign), weight
+            elif digit_at.get(position - distance) == sign * digit:
+                expected.add(position - distance)
+                weight += 1
+            else:
+                break
+            pass
+        pass
+    return best
+
+
+def top_factor(n: int) -> Optional[Tuple[int, int]]:
+    """Return (distance, sign) for the largest distance, at least 2, where
+    the odd number n is a multiple of 2**distance + sign, with sign 1 or -1.
+    Return None if there is no such distance.
+    """
+    for distance in range(n.bit_length(), 1, -1):
+        for sign in (1, -1):
+            if n % ((1 << distance) + sign) == 0:
+                return distance, sign
+            pass
+        pass
+    return None
+
+
+def pattern_splits(n: int) -> List[Tuple[int, int, int, int, List[Tuple[int, int]]]]:
+    """Return the ways we find of writing the odd number n as
+    P * (2**distance + sign) shifted up to some position, plus digits below
+    that position. Each is (P, distance, sign, position, digits) where
+    "digits" are the nonzero digits below "position", most significant
+    first.
+    """
+    splits = []
+    for digits in (naf_digits(n), binary_digits(n)):
+        pattern = top_pattern(digits)
+        if pattern is not None:
+            weight, distance, sign = pattern
+            prefix_count = 2 * weight
+            prefix = naf_prefixes(digits[:prefix_count])[-1]
+            multiplier = (1 << distance) + sign
+            assert prefix % multiplier == 0
+            position = digits[prefix_count - 1][0]
+            split = (prefix // multiplier, distance, sign, position, digits[prefix_count:])
+            if split not in splits:
+                splits.append(split)
+        pass
+    factor = top_factor(n)
+    if factor is not None:
+        distance, sign = factor
+        split = (n // ((1 << distance) + sign), distance, sign, 0, [])
+        if split not in splits:
+            splits.append(split)
+    return splits
+
+
+def pattern_sequence(
+    self: "MultConst", n: int, window_bits: Optional[int] = None
+) -> Tuple[float, List[Instruction]]:
+    """Return the cost and an instruction sequence for multiplying by `n`
+    using common subpatterns. See the module docstring for how this is
+    done. `window_bits` is as in wide_method.wide_sequence().
+
+    The sequence found is recorded in the multiplication cache as
+    unfinished, since it may not be the cheapest.
+    """
+    if window_bits is None:
+        window_bits = WIDE_WINDOW_BITS
+
+    cache_lower, cache_upper, finished, cache_instrs = self.mult_cache[n]
+    if finished:
+        return cache_upper, as_list(cache_instrs)
+
+    if n.bit_length() <= window_bits or not self.cpu_model.can_subtract():
+        return self.find_mult_sequence(n, node_budget=WINDOW_NODE_BUDGET)
+
+    orig_n = n
+    n, need_negation = self.need_negation(n)
+    final_shift, n = consecutive_zeros(n)
+
+    # Without a pattern, or if the wide method does better, use that.
+    cost, instrs = wide_sequence(self, n, window_bits)
+
+    for pattern, distance, sign, previous_position, low_digits in pattern_splits(n):
+        pattern_cost, pattern_instrs = pattern_sequence(self, pattern, window_bits)
+        shift_op_cost, shift_op_instrs = self.shift_op_instrs(
+            "add" if sign > 0 else "subtract", distance, pattern == 1
+        )
+        try_instrs = pattern_instrs + shift_op_instrs
+        try_cost = pattern_cost + shift_op_cost
+
+        # Add in the digits below the pattern.
+        for position, digit in low_digits:
+            shift_amount = previous_position - position
+            shift_cost = self.shift_cost(shift_amount)
+            try_instrs.append(Instruction("shift", shift_amount, shift_cost))
+            op = "add" if digit > 0 else "subtract"
+            try_cost += shift_cost + self.add_instruction(try_instrs, op, OP_R1)
+            previous_position = position
+            if try_cost >= cost:
+                break
+            pass
+        else:
+            if try_cost < cost and self.fits_registers(try_instrs):
+                cost, instrs = try_cost, try_instrs
+        pass
+
+    instrs = instrs[:]
+    if need_negation:
+        if (
+            self.cpu_model.subtract_can_negate()
+            and instrs
+            and instrs[-1].op == "subtract"
+            and instrs[-1].amount == OP_R1
+        ):
+            # 1 - n is the negative of n - 1.
+            cost += self.reverse_subtract_one(instrs)
+        elif "negate" in self.op_costs:
+            cost += self.add_instruction(instrs, "negate", 0)
+        else:
+            return wide_sequence(self, orig_n, window_bits)
+        pass
+
+    if final_shift:
+        shift_cost = self.shift_cost(final_shift)
+        cost += shift_cost
+        instrs.append(Instruction("shift", final_shift, shift_cost))
+
+    assert cost == instruction_sequence_cost(instrs)
+    if self.tracer is not None:
+        self.tracer.sequence_computed("pattern", orig_n, cost)
+    self.mult_cache.insert_or_update(orig_n, 0, cost, False, instrs)
+    return cost, instrs
+
+
+if __name__ == "__main__":
+    from mult_by_const.instruction import print_instructions
+    from mult_by_const.mult import MultConst
+
+    mconst = MultConst()
+    for n in (int("123456789" * 5), int("b" * 20, 16) * 1001, -(3 ** 100)):
+        cost, instrs = pattern_sequence(mconst, n)
+        print_instructions(instrs, n, cost)
@@ -0,0 +1,81 @@
+# Copyright (c) 2019 by Rocky Bernstein <rb@dustyfeet.com>
+"""How many registers an instruction sequence needs.
+
+A sequence works with at most three values: r1, the input; n, the value
+computed so far; and m, the value of n before the last shift. Not all of
+them have to be kept all the time:
+
+* r1 is needed only until the last instruction that uses it;
+
+* m is needed only from its shift until the last instruction before the
+  next shift that uses it, and only if n had changed before that shift.
+  Otherwise m is the input, which r1 has;
+
+* a "copy" (see two_address.py) needs a register until the instruction
+  after it has used the copy.
+
+register_count() gives the most values a sequence has to keep at once.
+When a CPU profile has fewer than SEQUENCE_REGISTERS "max_registers",
+the searches pass over sequences that need more than that; see
+MultConstClass.fits_registers(). Otherwise the sequence would have to
+spill a value to memory, which costs more than any instruction we count.
+"""
+
+from typing import List, Sequence
+
+from mult_by_const.instruction import (
+    FACTOR_FLAG,
+    OP_R1,
+    REVERSE_SUBTRACT_1,
+    REVERSE_SUBTRACT_FACTOR,
+    Instruction,
+)
+
+# The most registers any instruction sequence needs: r1, n and m.
+SEQUENCE_REGISTERS = 3
+
+
+def register_count(instrs: Sequence[Instruction], input_needed: bool = False) -> int:
+    """Return the most registers that `instrs` needs at any one time.
+    `input_needed` says whether r1 is still needed after `instrs`, as it
+    is when they start a longer sequence that uses r1 later on."""
+    instrs = list(instrs)
+
+    # m_distinct[i] is whether m, after instruction i, differs from the input.
+    m_distinct: List[bool] = []
+    changed = distinct = False
+    for instr in instrs:
+        if instr.op in ("shift", "shift_add"):
+            distinct = changed
+        if instr.op not in ("nop", "copy"):
+            changed = True
+        m_distinct.append(distinct)
+        pass
+
+    # Go backwards so we know what is used later.
+    peak = 1
+    r1_needed, m_needed = input_needed, False
+    for i in range(len(instrs) - 1, -1, -1):
+        instr = instrs[i]
+        live = 1 + int(r1_needed) + int(m_needed and m_distinct[i]) + int(instr.op == "copy")
+        peak = max(peak, live)
+        if instr.op in ("shift", "shift_add"):
+            # Uses of m after this are of the m that this shift sets.
+            m_needed = False
+        elif instr.op in ("add", "subtract"):
+            if instr.amount in (OP_R1, REVERSE_SUBTRACT_1):
+                r1_needed = True
+            elif instr.amount in (FACTOR_FLAG, REVERSE_SUBTRACT_FACTOR):
+                if m_distinct[i]:
+                    m_needed = True
+                else:
+                    r1_needed = True
+        pass
+    return peak
+
+
+if __name__ == "__main__":
+    from mult_by_const.instruction import str2instructions
+
+    for s in ("[n<<4, n+m, n<<1, n+m]", "[n<<4, n-m, n<<1, n+m, n<<2, n+1]"):
+        print(f"{s}: {register_count(str2instructions(s))} registers")
@@ -13,9 +13,22 @@ All searching methods start with "search" have the same interface:
         ],  # The best current candidate sequencer. It or a different sequence is returned.
     ) -> Tuple[float, List[Instruction]]:
 
+Search methods that recurse into the alpha-beta search are written once,
+as generators, or "frames", with names ending in "_frame". When a frame
+needs the result of searching some number, it yields an (n, lower, limit)
+request, and is sent back the (cost, instructions) result. alpha_beta_frame()
+is the frame for one node of the search itself.
+
+Both search engines run these same frames. MultConst.alpha_beta_search()
+answers a frame's requests by calling itself, via run_frame(), and so
+recurses. iterative_search.iterative_alpha_beta_search() keeps its own
+stack of frames instead. The plain search methods, like search_add_one(),
+run their frame with run_frame().
 """
 
-from typing import List, Tuple
+from time import perf_counter
+from typing import Any, Callable, Dict, Generator, List, Tuple
+
 from mult_by_const.binary_method import binary_sequence_inner
 from mult_by_const.cpu import inf_cost
 from mult_by_const.instruction import (
@@ -25,10 +38,28 @@ from mult_by_const.instruction import (
     REVERSE_SUBTRACT_1,
     Instruction,
     instruction_sequence_cost,
-    instruction_sequence_value,
+    shared_instruction,
 )
 from mult_by_const.util import signum
 
+SearchResult = Tuple[float, List[Instruction]]
+
+# A frame yields (n, lower, limit) search requests, is sent back their
+# results, and returns its own result.
+SearchFrame = Generator[Tuple[int, float, float], SearchResult, SearchResult]
+
+
+def run_frame(self, frame: SearchFrame) -> SearchResult:
+    """Run `frame` to its end, answering each of its search requests with
+    self.alpha_beta_search(). Return the frame's result."""
+    result: Any = None
+    while True:
+        try:
+            request = frame.send(result)
+        except StopIteration as stop:
+            return stop.value
+        result = self.alpha_beta_search(*request)
+
 
 def search_add_one(
     self,
@@ -40,8 +71,9 @@ def search_add_one(
         Instruction
     ],  # If not empty, the best instruction sequence seen so for with cost "limit".
 ) -> Tuple[float, List[Instruction]]:
-    inc = signum(n) * -1
-    return self.try_plus_offset(n, inc, upper, lower, instrs, candidate_instrs, OP_R1)
+    return run_frame(
+        self, search_add_one_frame(self, n, upper, lower, instrs, candidate_instrs)
+    )
 
 
 def search_binary_method_with_cache(
@@ -60,13 +92,12 @@ def search_binary_method_with_cache(
     cache_upper, cache_instrs = binary_sequence_inner(self, n)
     try_cost = cache_upper + instruction_sequence_cost(instrs)
     if try_cost < upper:
-        self.debug_msg(
-            f"Include cache value {n} in sequence; cost {try_cost} < {upper}."
-        )
+        if self.tracer is not None:
+            self.tracer.bound_lowered(n, try_cost, upper, "binary method")
         if n == 1:
             candidate_instrs = instrs
         else:
-            candidate_instrs = instrs + cache_instrs
+            candidate_instrs = instrs + list(cache_instrs)
         upper = try_cost
     return upper, candidate_instrs
 
@@ -84,9 +115,8 @@ def search_cache(
     cache_lower, cache_upper, finished, cache_instrs = self.mult_cache[n]
     try_limit = cache_upper + instruction_sequence_cost(instrs)
     if try_limit < limit:
-        self.debug_msg(
-            f"*include cache value {n} in sequence; search limit {try_limit} < {limit}."
-        )
+        if self.tracer is not None:
+            self.tracer.bound_lowered(n, try_limit, limit, "cache")
         candidate_instrs = cache_instrs
         limit = cache_upper
     return limit, candidate_instrs
@@ -100,33 +130,9 @@ def search_add_or_subtract_one(
     instrs: List[Instruction],
     candidate_instrs: List[Instruction],
 ) -> Tuple[float, List[Instruction]]:
-
-    # To improve searching and make use of the cache better search towards zero before
-    # searching away from zero.
-    if abs(n) == 1:
-        cache_lower, cache_upper, finished, cache_instrs = self.mult_cache[n]
-    elif n > 0:
-        upper, candidate_instrs = search_subtract_one(
-            self, n, upper, lower, instrs, candidate_instrs
-        )
-        upper, candidate_instrs = search_add_one(
-            self, n, upper, lower, instrs, candidate_instrs
-        )
-    else:
-        # We search on  "negate" first since that will succeed and give a close bound (within an instruction
-        # of the optimal) to speed searching. The searches below this when they work will be better.
-        # but we just don't know if they will succeed at all. Overall in alpha-beta searching it is useful
-        # to start out with something that will always work so that we can set a reasonable bound on searching.
-        upper, candidate_instrs = search_negate(
-            self, n, upper, lower, instrs, candidate_instrs
-        )
-        upper, candidate_instrs = search_add_one(
-            self, n, upper, lower, instrs, candidate_instrs
-        )
-        upper, candidate_instrs = search_subtract_one(
-            self, n, upper, lower, instrs, candidate_instrs
-        )
-    return upper, candidate_instrs
+    return run_frame(
+        self, search_add_or_subtract_one_frame(self, n, upper, lower, instrs, candidate_instrs)
+    )
 
 
 def search_negate(
@@ -139,29 +145,28 @@ def search_negate(
 ) -> Tuple[float, List[Instruction]]:
 
     if n < 0 and self.cpu_model.can_negate():
-        if self.debug:
-            self.debug_msg(f"Looking at cached positive value {-n} of {n}")
+        if self.tracer is not None:
+            self.tracer.trying(n, "negate", -n)
 
         negate_cost = self.op_costs["negate"]
         lower += negate_cost
         if lower >= upper:
             # We have another cutoff
-            if self.debug:
-                self.debug_msg(
-                    f"**alpha cutoff in negate for {n} in cost {lower} >= {upper}"
-                )
-                return upper, candidate_instrs
+            if self.stats is not None:
+                self.stats.cutoff()
+            if self.tracer is not None:
+                self.tracer.cutoff(n, "negate", lower, upper)
+            return upper, candidate_instrs
 
-        cache_lower, cache_upper, finished, instrs = self.mult_cache[-n]
+        cache_lower, cache_upper, finished, cache_instrs = self.mult_cache[-n]
         if cache_upper == inf_cost:
-            cache_upper, instrs = binary_sequence_inner(self, -n)
+            cache_upper, cache_instrs = binary_sequence_inner(self, -n)
 
         cache_upper += negate_cost
         if cache_upper < upper:
-            if self.debug:
-                self.debug_msg(f"Negation {n} update {cache_upper} < {upper} ...")
-            instrs.append(Instruction("negate", 0, negate_cost))
-            return cache_upper, instrs
+            if self.tracer is not None:
+                self.tracer.bound_lowered(n, cache_upper, upper, "negate")
+            return cache_upper, cache_instrs + [shared_instruction("negate", 0, negate_cost)]
     return upper, candidate_instrs
 
 
@@ -173,6 +178,373 @@ def search_negate_subtract_one(
     instrs: List[Instruction],
     candidate_instrs: List[Instruction],
 ) -> Tuple[float, List[Instruction]]:
+    return run_frame(
+        self, search_negate_subtract_one_frame(self, n, upper, lower, instrs, candidate_instrs)
+    )
+
+
+def search_short_add_factors(
+    self,
+    n: int,
+    upper: float,
+    lower: float,
+    instrs: List[Instruction],
+    candidate_instrs: List[Instruction],
+) -> Tuple[float, List[Instruction]]:
+    """Handles factors only of the form 2**i + 1. We keep this
+    short and simple and without subtract handling, to make certain cost
+    models work, like "chained adds" more streamlined. More complex
+    models can use this in conjunction with other factor searching.
+    """
+    return run_frame(
+        self, search_short_add_factors_frame(self, n, upper, lower, instrs, candidate_instrs)
+    )
+
+
+def search_short_factors(
+    self,
+    n: int,
+    upper: float,
+    lower: float,
+    instrs: List[Instruction],
+    candidate_instrs: List[Instruction],
+) -> Tuple[float, List[Instruction]]:
+    return run_frame(
+        self, search_short_factors_frame(self, n, upper, lower, instrs, candidate_instrs)
+    )
+
+
+# FIXME add cache lookup as a decorator
+def search_subtract_one(
+    self,
+    n: int,
+    upper: float,  # maximum allowed cost for an instruction sequence.
+    lower: float,  # cost of instructions seen so far, or inf_cost
+    instrs: List[Instruction],  # We build on this
+    candidate_instrs: List[Instruction],
+) -> Tuple[float, List[Instruction]]:
+    return run_frame(
+        self, search_subtract_one_frame(self, n, upper, lower, instrs, candidate_instrs)
+    )
+
+
+def alpha_beta_frame(self, n: int, lower: float, limit: float) -> SearchFrame:
+    """The frame for one node of the alpha-beta search. See
+    MultConst.alpha_beta_search() for a description of the parameters and
+    the value returned."""
+    stats, tracer = self.stats, self.tracer
+    if stats is not None:
+        stats.enter_node()
+    if tracer is not None:
+        tracer.node_entered(n, lower, limit)
+
+    # FIXME: should be done in caller?
+    cache_lower, cache_upper, finished, cache_instrs = self.mult_cache[n]
+    if finished:
+        if stats is not None:
+            stats.leave_node()
+        if tracer is not None:
+            tracer.cache_hit(n, cache_upper)
+            tracer.node_exited(n, cache_upper)
+        return cache_upper, [] if n == 1 else cache_instrs
+
+    orig_n = n
+    budget = self.budget
+    if budget is not None and budget.spend():
+        # Out of time or nodes: unwind with what we have so far.
+        if stats is not None:
+            stats.cutoff()
+            stats.leave_node()
+        if tracer is not None:
+            tracer.cutoff(n, "budget", lower, limit)
+            tracer.node_exited(n, inf_cost)
+        return inf_cost, []
+
+    n, need_negation = self.need_negation(n)
+
+    assert n > 0
+
+    m, shift_cost, shift_amount = self.make_odd(n, 0, [])
+
+    lower += shift_cost
+    if lower > limit:
+        if stats is not None:
+            stats.cutoff()
+            stats.leave_node()
+        if tracer is not None:
+            tracer.cutoff(n, "shift", lower, limit)
+            tracer.node_exited(orig_n, inf_cost)
+        return inf_cost, []
+
+    # Make "m" negative if "n" was and search for that directly
+    if need_negation:
+        m = -m
+
+    candidate_instrs: List[Instruction] = []
+
+    # If we have caching enabled, m != 1 since caching will catch earlier.
+    # However for saftey and extreme cases where we don't have caching,
+    # we will test here.
+    if m in (-1, 0, 1):
+        _, limit, _, candidate_instrs = self.mult_cache[m]
+        limit += shift_cost
+        lower = limit
+    else:
+
+        # The search methods look for m on its own: what it may cost is
+        # what is left of the limit after the instructions around it.
+        search_limit = limit - lower
+
+        for fn in self.search_methods:
+            if stats is not None:
+                stats.enter_method(fn.__name__)
+                start_time = perf_counter()
+            # Search methods without a frame, like search_cache(), don't
+            # recurse, or else recurse through run_frame().
+            frame_fn = FRAME_METHODS.get(fn)
+            if frame_fn is None:
+                candidate_upper, candidate_instrs = fn(
+                    self, m, search_limit, 0, [], candidate_instrs
+                )
+            else:
+                candidate_upper, candidate_instrs = yield from frame_fn(
+                    self, m, search_limit, 0, [], candidate_instrs
+                )
+            improved = candidate_upper < search_limit
+            if stats is not None:
+                stats.leave_method(perf_counter() - start_time, improved)
+            if improved:
+                if tracer is not None:
+                    tracer.bound_lowered(m, candidate_upper, search_limit, fn.__name__)
+                search_limit = candidate_upper
+                pass
+            pass
+        pass
+    if candidate_instrs:
+        if shift_amount:
+            candidate_instrs = candidate_instrs + [
+                shared_instruction("shift", shift_amount, shift_cost)
+            ]
+        limit = instruction_sequence_cost(candidate_instrs)
+        if self.out_of_budget():
+            self.mult_cache.insert_or_update(
+                orig_n, min(cache_lower, limit), limit, False, candidate_instrs
+            )
+        else:
+            self.mult_cache.insert_or_update(orig_n, limit, limit, True, candidate_instrs)
+            if budget is not None:
+                self.mult_cache.update_field(orig_n, finished=True)
+    else:
+        candidate_instrs = cache_instrs
+
+    if not candidate_instrs and not self.out_of_budget():
+        if tracer is not None:
+            tracer.cutoff(orig_n, "exhausted", limit - lower, limit)
+        self.mult_cache.update_field(orig_n, lower=limit - lower)
+
+    if stats is not None:
+        stats.leave_node()
+    if tracer is not None:
+        tracer.node_exited(orig_n, limit)
+
+    return limit, candidate_instrs
+
+
+def try_shift_op_factor_frame(
+    self,
+    n: int,  # Number we are seeking
+    factor: int,  # factor to try to divide "n" by
+    op: str,  # operation after "shift"; either "add" or "subtract"
+    shift_amount: int,  # shift amount used in shift operation
+    upper: float,  # maximum allowed cost for an instruction sequence.
+    lower: float,  # cost of instructions seen so far
+    instrs: List[Instruction],  # We build on this.
+    candidate_instrs: List[
+        Instruction
+    ],  # If not empty, the best instruction sequence seen so for with cost "limit".
+) -> SearchFrame:
+    if (n % factor) == 0:
+        # The cost of the shift, the op and, on two-address CPU models,
+        # the copy of m they need count against what m may cost.
+        shift_op_cost, shift_op_instrs = self.shift_op_instrs(op, shift_amount, n == factor)
+        lower += shift_op_cost
+
+        if lower < upper:
+            m = n // factor
+            if lower + self.lower_bound(m) >= upper:
+                # Even the cheapest way to get m, costs too much.
+                if self.tracer is not None:
+                    self.tracer.cutoff(
+                        n, "lower-bound", lower + self.lower_bound(m), upper, factor
+                    )
+                if self.stats is not None:
+                    self.stats.cutoff()
+                return upper, candidate_instrs
+            if self.tracer is not None:
+                self.tracer.trying(n, "factor", factor)
+            try_cost, try_instrs = yield (m, lower, upper)
+            if try_cost < upper - lower and self.fits_registers(try_instrs, shift_op_instrs):
+                try_instrs = try_instrs + shift_op_instrs
+                try_cost += shift_op_cost
+                if self.tracer is not None:
+                    self.tracer.bound_lowered(n, try_cost, upper, "factor", factor)
+                self.mult_cache.update_field(
+                    n,
+                    upper=try_cost,
+                    # With a budget, n is finished only once its search is done.
+                    finished=False if self.budget is not None else None,
+                    instrs=try_instrs,
+                )
+                # Upper is now what n costs this way, shift, op and copy included.
+                upper = try_cost
+                candidate_instrs = try_instrs
+            pass
+        else:
+            if self.stats is not None:
+                self.stats.cutoff()
+            if self.tracer is not None:
+                self.tracer.cutoff(n, "factor", lower, upper, factor)
+        pass
+    return upper, candidate_instrs
+
+
+def try_plus_offset_frame(
+    self,
+    n: int,  # Number we are seeking
+    increment: int,  # +1 or -1 for now
+    limit: float,  # maximum allowed cost for an instruction sequence.
+    lower: float,  # cost of instructions seen so far
+    instrs: List[
+        Instruction
+    ],  # If not empty, an instruction sequence with cost "limit".
+    # We build on this.
+    candidate_instrs: List[
+        Instruction
+    ],  # The best current candidate sequencer. It or a different sequence is returned.
+    op_flag: int,
+) -> SearchFrame:
+    op_str = "add" if increment < 0 else "subtract"
+    op_cost, op_instrs = self.op_instrs(op_str, op_flag)
+    try_lower = lower + op_cost
+    if try_lower < limit:
+        n1 = n + increment
+        if op_cost + self.lower_bound(n1) >= limit:
+            # Even the cheapest way to get n1, costs too much.
+            if self.tracer is not None:
+                self.tracer.cutoff(n, "lower-bound", op_cost + self.lower_bound(n1), limit, n1)
+            if self.stats is not None:
+                self.stats.cutoff()
+            return limit, candidate_instrs
+
+        cache_lower, neighbor_cost, finished, neighbor_instrs = self.mult_cache[n1]
+        if not finished:
+            if self.tracer is not None:
+                self.tracer.trying(n, "neighbor", n1)
+
+            neighbor_cost, neighbor_instrs = yield (n1, try_lower, limit)
+
+        try_cost = neighbor_cost + op_cost
+
+        if try_cost < limit and self.fits_registers(neighbor_instrs, op_instrs):
+            if self.tracer is not None:
+                self.tracer.bound_lowered(n, try_cost, limit, "neighbor", n1)
+            limit = try_cost
+            neighbor_instrs = neighbor_instrs + op_instrs
+            # A reversed subtract computes 1 - (n + 1), or -n. Its bound
+            # here is only good under our limit, so we leave caching it
+            # to the caller, which caches the final result for -n.
+            if op_flag != REVERSE_SUBTRACT_1:
+                lower = min(self.mult_cache[n][0], try_cost)
+                self.mult_cache.insert_or_update(n, lower, try_cost, False, neighbor_instrs)
+            candidate_instrs = neighbor_instrs
+            pass
+    else:
+        if self.stats is not None:
+            self.stats.cutoff()
+        if self.tracer is not None:
+            self.tracer.cutoff(n, "neighbor", try_lower, limit, n + increment)
+
+    return limit, candidate_instrs
+
+
+# Frames for the search methods above that recurse.
+#
+# Creating a frame costs more than a function call, so the factor searches
+# below only make a frame when the factor divides n; try_shift_op_factor_frame()
+# returns its input unchanged otherwise. Similarly, search_add_one_frame()
+# and search_subtract_one_frame() hand back try_plus_offset_frame()'s
+# frame rather than wrapping it in one of their own.
+
+
+def search_add_one_frame(
+    self,
+    n: int,
+    upper: float,
+    lower: float,
+    instrs: List[Instruction],
+    candidate_instrs: List[Instruction],
+) -> SearchFrame:
+    inc = signum(n) * -1
+    return try_plus_offset_frame(self, n, inc, upper, lower, instrs, candidate_instrs, OP_R1)
+
+
+def search_subtract_one_frame(
+    self,
+    n: int,
+    upper: float,
+    lower: float,
+    instrs: List[Instruction],
+    candidate_instrs: List[Instruction],
+) -> SearchFrame:
+    inc = signum(n) * 1
+    return try_plus_offset_frame(self, n, inc, upper, lower, instrs, candidate_instrs, OP_R1)
+
+
+def search_add_or_subtract_one_frame(
+    self,
+    n: int,
+    upper: float,
+    lower: float,
+    instrs: List[Instruction],
+    candidate_instrs: List[Instruction],
+) -> SearchFrame:
+
+    # To improve searching and make use of the cache better search towards zero before
+    # searching away from zero.
+    if abs(n) == 1:
+        cache_lower, cache_upper, finished, cache_instrs = self.mult_cache[n]
+    elif n > 0:
+        upper, candidate_instrs = yield from search_subtract_one_frame(
+            self, n, upper, lower, instrs, candidate_instrs
+        )
+        upper, candidate_instrs = yield from search_add_one_frame(
+            self, n, upper, lower, instrs, candidate_instrs
+        )
+    else:
+        # We search on  "negate" first since that will succeed and give a close bound (within an instruction
+        # of the optimal) to speed searching. The searches below this when they work will be better.
+        # but we just don't know if they will succeed at all. Overall in alpha-beta searching it is useful
+        # to start out with something that will always work so that we can set a reasonable bound on searching.
+        upper, candidate_instrs = search_negate(
+            self, n, upper, lower, instrs, candidate_instrs
+        )
+        upper, candidate_instrs = yield from search_add_one_frame(
+            self, n, upper, lower, instrs, candidate_instrs
+        )
+        upper, candidate_instrs = yield from search_subtract_one_frame(
+            self, n, upper, lower, instrs, candidate_instrs
+        )
+    return upper, candidate_instrs
+
+
+def search_negate_subtract_one_frame(
+    self,
+    n: int,
+    upper: float,
+    lower: float,
+    instrs: List[Instruction],
+    candidate_instrs: List[Instruction],
+) -> SearchFrame:
 
     cache_lower, cache_upper, finished, cache_instrs = self.mult_cache[n]
     if finished:
@@ -182,50 +554,46 @@ def search_negate_subtract_one(
         # so there is no benefit in reversing a subtraction here.
         return upper, candidate_instrs
 
-    # FIXME: for some reason for -12345678 we get the wrong value 15
-    # (under default cost model) when we combine the < 0 test below as part of the "if"
-    # above. Investigate.
-    op_flag = OP_R1 if instruction_sequence_value(candidate_instrs) < 0 else REVERSE_SUBTRACT_1
-    return self.try_plus_offset(
-        -n, +1, upper + self.eps, lower, instrs, candidate_instrs, op_flag
+    # n is 1 - (-n + 1).
+    return (
+        yield from try_plus_offset_frame(
+            self, -n, +1, upper + self.eps, lower, instrs, candidate_instrs, REVERSE_SUBTRACT_1
+        )
     )
 
 
-def search_short_add_factors(
+def search_short_add_factors_frame(
     self,
     n: int,
     upper: float,
     lower: float,
     instrs: List[Instruction],
     candidate_instrs: List[Instruction],
-) -> Tuple[float, List[Instruction]]:
-    """Handles factors only of the form 2**i + 1. We keep this
-    short and simple and without subtract handling, to make certain cost
-    models work, like "chained adds" more streamlined. More complex
-    models can use this in conjunction with other factor searching.
-    """
+) -> SearchFrame:
     i, j = 1, 2
     while j - 1 <= n:
-        upper, candidate_instrs = self.try_shift_op_factor(
-            n, j + 1, "add", i, upper, lower, instrs, candidate_instrs
-        )
+        if n % (j + 1) == 0:
+            upper, candidate_instrs = yield from try_shift_op_factor_frame(
+                self, n, j + 1, "add", i, upper, lower, instrs, candidate_instrs
+            )
         i += 1
         j <<= 1
         pass
 
     return upper, candidate_instrs
 
-def search_short_factors(
+
+def search_short_factors_frame(
     self,
     n: int,
     upper: float,
     lower: float,
     instrs: List[Instruction],
     candidate_instrs: List[Instruction],
-) -> Tuple[float, List[Instruction]]:
+) -> SearchFrame:
 
-    upper, candidate_instrs = search_short_add_factors(
-            self, n, upper, lower, instrs, candidate_instrs
+    upper, candidate_instrs = yield from search_short_add_factors_frame(
+        self, n, upper, lower, instrs, candidate_instrs
     )
 
     abs_n = abs(n)
@@ -234,32 +602,47 @@ def search_short_factors(
     # can start a little bit further out.
     i, j = 3, 8
     while j - 1 <= abs_n:
-        if n < 0:
+        if n < 0 and n % (j - 1) == 0:
             # We'll increase upper, to allow equal ties to succeed with subtraction since
             # that's what we want when we have a negative number.
-            try_cost, try_instrs = self.try_shift_op_factor(
-                -n, j - 1, "subtract", i, upper + self.eps, lower, instrs, candidate_instrs
+            try_cost, try_instrs = yield from try_shift_op_factor_frame(
+                self, -n, j - 1, "subtract", i, upper + self.eps, lower, instrs, candidate_instrs
             )
-            if try_cost < upper and try_instrs and try_instrs[-1].op == "subtract":
-                self.debug_msg(
-                    f"*update {n} using factor {j - 1}; cost {try_cost} < previous limit {upper}"
-                )
-                self.mult_cache.update_field(
-                        n, upper=try_cost, instrs=try_instrs
-                    )
+            # On a two-address CPU model, m - n with m the input would need
+            # a copy of r1 that try_cost doesn't include.
+            if (
+                try_cost < upper
+                and try_instrs
+                and try_instrs[-1].op == "subtract"
+                and not (self.cpu_model.is_two_address() and n == 1 - j)
+            ):
+                if self.tracer is not None:
+                    self.tracer.bound_lowered(n, try_cost, upper, "factor", j - 1)
                 assert try_instrs[-1].amount == FACTOR_FLAG
-                try_instrs[-1].amount = REVERSE_SUBTRACT_FACTOR
+                # The instructions are shared with the cache entry for -n, so
+                # replace the last one rather than changing it.
+                try_instrs = try_instrs[:-1] + [
+                    shared_instruction("subtract", REVERSE_SUBTRACT_FACTOR, try_instrs[-1].cost)
+                ]
+                self.mult_cache.update_field(
+                    n,
+                    upper=try_cost,
+                    finished=False if self.budget is not None else None,
+                    instrs=try_instrs,
+                )
                 candidate_instrs = try_instrs
                 upper = try_cost
 
-            # FIXME: we seem need this for -12345678, why?
-            upper, candidate_instrs = self.try_shift_op_factor(
-                n, j + 1, "add", i, upper, lower, instrs, candidate_instrs
+        # FIXME: we seem need this for -12345678, why?
+        if n < 0 and n % (j + 1) == 0:
+            upper, candidate_instrs = yield from try_shift_op_factor_frame(
+                self, n, j + 1, "add", i, upper, lower, instrs, candidate_instrs
             )
 
-        upper, candidate_instrs = self.try_shift_op_factor(
-            n, j - 1, "subtract", i, upper, lower, instrs, candidate_instrs
-        )
+        if n % (j - 1) == 0:
+            upper, candidate_instrs = yield from try_shift_op_factor_frame(
+                self, n, j - 1, "subtract", i, upper, lower, instrs, candidate_instrs
+            )
 
         # Any other factors to try?
 
@@ -270,14 +653,12 @@ def search_short_factors(
     return upper, candidate_instrs
 
 
-# FIXME add cache lookup as a decorator
-def search_subtract_one(
-    self,
-    n: int,
-    upper: float,  # maximum allowed cost for an instruction sequence.
-    lower: float,  # cost of instructions seen so far, or inf_cost
-    instrs: List[Instruction],  # We build on this
-    candidate_instrs: List[Instruction],
-) -> Tuple[float, List[Instruction]]:
-    inc = signum(n) * 1
-    return self.try_plus_offset(n, inc, upper, lower, instrs, candidate_instrs, OP_R1)
+# Maps a search method to its frame.
+FRAME_METHODS: Dict[Callable, Callable[..., SearchFrame]] = {
+    search_add_one: search_add_one_frame,
+    search_subtract_one: search_subtract_one_frame,
+    search_add_or_subtract_one: search_add_or_subtract_one_frame,
+    search_negate_subtract_one: search_negate_subtract_one_frame,
+    search_short_add_factors: search_short_add_factors_frame,
+    search_short_factors: search_short_factors_frame,
+}
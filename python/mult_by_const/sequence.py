@@ -0,0 +1,170 @@
+# Copyright (c) 2019 by Rocky Bernstein <rb@dustyfeet.com>
+"""Instruction sequences that share their beginnings.
+
+Almost every sequence the search finds is a sequence it found before,
+for a smaller number, with an instruction or two added on the end. As
+lists, each of these is a copy of the sequence before it, and
+MultCache copied them again on every lookup and update, so that a
+caller changing one wouldn't change the cache.
+
+An InstructionSequence is instead its last instruction and the
+sequence before it, its "parent". It can't be changed, so the cache can
+hand out the one it has, and adding instructions to the end makes new
+sequences that point back to the old one rather than copy it. The cache
+then takes memory in proportion to the number of different
+instructions-after-a-sequence there are, rather than to the total
+length of its sequences.
+
+An InstructionSequence can be used like a list of instructions that
+isn't changed: iterated over, indexed, sliced, compared with lists, and
+added to. Adding to it gives another InstructionSequence; taking all
+but the last few instructions, as in instrs[:-1], gives an ancestor.
+Anything else that needs a whole list, like printing, dumping or
+giving a result to a caller, makes one with list().
+"""
+
+from typing import Iterable, Iterator, List, Optional, Sequence, Union, overload
+
+from mult_by_const.instruction import Instruction
+
+
+class InstructionSequence(Sequence[Instruction]):
+    """An immutable instruction sequence: `last` added to the end of
+    `parent`. Without `last` it is the empty sequence."""
+
+    __slots__ = ("parent", "last", "length")
+
+    def __init__(self, parent: Optional["InstructionSequence"] = None, last: Optional[Instruction] = None):
+        self.parent = parent
+        self.last = last
+        if last is None:
+            self.length = 0
+        else:
+            self.length = 1 if parent is None else parent.length + 1
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __iter__(self) -> Iterator[Instruction]:
+        return iter(self.to_list())
+
+    def __reversed__(self) -> Iterator[Instruction]:
+        node: Optional[InstructionSequence] = self
+        while node is not None and node.last is not None:
+            yield node.last
+            node = node.parent
+        pass
+
+    def to_list(self) -> List[Instruction]:
+        """Return the instructions as a new list."""
+        instrs: List[Optional[Instruction]] = [None] * self.length
+        node: Optional[InstructionSequence] = self
+        for i in range(self.length - 1, -1, -1):
+            assert node is not None
+            instrs[i] = node.last
+            node = node.parent
+        return instrs  # type: ignore
+
+    def prefixes(self) -> List["InstructionSequence"]:
+        """Return the sequence's non-empty beginnings, shortest first: the
+        sequences ending at each of its instructions."""
+        nodes: List[InstructionSequence] = []
+        node: Optional[InstructionSequence] = self
+        while node is not None and node.last is not None:
+            nodes.append(node)
+            node = node.parent
+        nodes.reverse()
+        return nodes
+
+    def ancestor(self, drop: int) -> "InstructionSequence":
+        """Return the sequence without its last `drop` instructions."""
+        node: InstructionSequence = self
+        for _ in range(min(drop, self.length)):
+            node = node.parent if node.parent is not None else EMPTY_SEQUENCE
+        return node
+
+    @overload
+    def __getitem__(self, i: int) -> Instruction:
+        ...
+
+    @overload
+    def __getitem__(self, i: slice) -> Sequence[Instruction]:
+        ...
+
+    def __getitem__(self, i: Union[int, slice]) -> Union[Instruction, Sequence[Instruction]]:
+        if isinstance(i, slice):
+            if i.step is None and i.start in (None, 0):
+                # A beginning of the sequence is one of its ancestors.
+                if i.stop is None:
+                    return self
+                elif i.stop < 0:
+                    return self.ancestor(-i.stop)
+                return self.ancestor(max(self.length - i.stop, 0))
+            return self.to_list()[i]
+        index = i + self.length if i < 0 else i
+        if not 0 <= index < self.length:
+            raise IndexError("instruction sequence index out of range")
+        return self.ancestor(self.length - 1 - index).last  # type: ignore
+
+    def __add__(self, instrs: Iterable[Instruction]) -> "InstructionSequence":
+        result = self
+        for instr in instrs:
+            result = InstructionSequence(result if result.length else None, instr)
+        return result
+
+    def __radd__(self, instrs: List[Instruction]) -> List[Instruction]:
+        return list(instrs) + self.to_list()
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, (InstructionSequence, list, tuple)):
+            return len(other) == self.length and self.to_list() == list(other)
+        return NotImplemented
+
+    __hash__ = None  # type: ignore
+
+    def __repr__(self) -> str:
+        return repr(self.to_list())
+
+
+EMPTY_SEQUENCE = InstructionSequence()
+
+
+@overload
+def as_sequence(instrs: None) -> None:
+    ...
+
+
+@overload
+def as_sequence(instrs: Iterable[Instruction]) -> InstructionSequence:
+    ...
+
+
+def as_sequence(instrs: Optional[Iterable[Instruction]]) -> Optional[InstructionSequence]:
+    """Return `instrs` as an InstructionSequence; None stays None."""
+    if instrs is None or isinstance(instrs, InstructionSequence):
+        return instrs
+    return EMPTY_SEQUENCE + instrs
+
+
+@overload
+def as_list(instrs: None) -> None:
+    ...
+
+
+@overload
+def as_list(instrs: Iterable[Instruction]) -> List[Instruction]:
+    ...
+
+
+def as_list(instrs: Optional[Iterable[Instruction]]) -> Optional[List[Instruction]]:
+    """Return `instrs` as a new list; None stays None."""
+    return None if instrs is None else list(instrs)
+
+
+if __name__ == "__main__":
+    from mult_by_const.instruction import str2instructions
+
+    seventeen = as_sequence(str2instructions("[n<<4, n+m]"))
+    fifty_one = seventeen + str2instructions("[n<<1, n+m]")
+    thirty_three = seventeen + str2instructions("[n<<1, n-1]")
+    print(fifty_one, thirty_three, fifty_one[:-2] is thirty_three[:-2] is seventeen)
@@ -0,0 +1,145 @@
+# Copyright (c) 2019 by Rocky Bernstein <rb@dustyfeet.com>
+"""Search statistics, gathered per search method.
+
+These help in deciding which search methods earn their keep, and so
+which to put in MultConst's "search_methods" tuple.
+"""
+
+import json
+import sys
+from typing import Any, Dict, List, Optional
+
+from mult_by_const.util import print_sep
+
+# The name cutoffs are recorded under when no search method is active,
+# e.g. for the cutoff after the initial shift in alpha_beta_search().
+TOP_LEVEL = "alpha_beta_search"
+
+METHOD_FIELDS = ("calls", "improvements", "cutoffs", "max_depth", "time")
+
+
+class SearchStats:
+    """Counters for searching. For each search method we record:
+
+    calls:        the number of times the method was called
+    improvements: the number of times the method lowered the cost bound
+    cutoffs:      the number of alpha cutoffs made while the method was the
+                  innermost one active
+    max_depth:    the deepest alpha-beta recursion level the method was called at
+    time:         cumulative wall-clock time in seconds spent in the method.
+                  This includes time in nested searches, so the times of
+                  methods that call each other add up to more than the total.
+
+    We also count alpha-beta search nodes and the deepest level of recursion
+    seen overall.
+    """
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self) -> None:
+        self.methods: Dict[str, Dict[str, float]] = {}
+        self.nodes = 0
+        self.depth = 0
+        self.max_depth = 0
+
+        # Stack of names of the search methods currently running.
+        self.active: List[str] = []
+
+    def method_stats(self, name: str) -> Dict[str, float]:
+        stats = self.methods.get(name)
+        if stats is None:
+            stats = self.methods[name] = {field: 0 for field in METHOD_FIELDS}
+        return stats
+
+    def enter_node(self) -> None:
+        self.nodes += 1
+        self.depth += 1
+        if self.depth > self.max_depth:
+            self.max_depth = self.depth
+
+    def leave_node(self) -> None:
+        self.depth -= 1
+
+    def enter_method(self, name: str) -> None:
+        stats = self.method_stats(name)
+        stats["calls"] += 1
+        if self.depth > stats["max_depth"]:
+            stats["max_depth"] = self.depth
+        self.active.append(name)
+
+    def leave_method(self, elapsed: float, improved: bool) -> None:
+        stats = self.methods[self.active.pop()]
+        stats["time"] += elapsed
+        if improved:
+            stats["improvements"] += 1
+
+    def cutoff(self) -> None:
+        name = self.active[-1] if self.active else TOP_LEVEL
+        self.method_stats(name)["cutoffs"] += 1
+
+    def merge(self, other: "SearchStats") -> None:
+        """Add in the counts from `other`, e.g. those of a worker process.
+        Depths are the deeper of the two."""
+        self.nodes += other.nodes
+        self.max_depth = max(self.max_depth, other.max_depth)
+        for name, other_stats in other.methods.items():
+            stats = self.method_stats(name)
+            for field in METHOD_FIELDS:
+                if field == "max_depth":
+                    stats[field] = max(stats[field], other_stats[field])
+                else:
+                    stats[field] += other_stats[field]
+                pass
+            pass
+        return
+
+    def to_dict(self, cache=None) -> Dict[str, Any]:
+        """Return the statistics as a dictionary suitable for JSON or YAML output.
+        If `cache`, a MultCache, is given, its hit and miss counts are included.
+        """
+        d: Dict[str, Any] = {
+            "nodes": self.nodes,
+            "max-depth": self.max_depth,
+            "methods": {name: dict(stats) for name, stats in sorted(self.methods.items())},
+        }
+        if cache is not None:
+            d["cache"] = {
+                "hits-finished": cache.hits_exact,
+                "hits-unfinished": cache.hits_partial,
+                "misses": cache.misses,
+                "entries": len(cache),
+                "partial-bounds": len(cache.partial),
+                "partial-evictions": cache.partial.evictions,
+                "evictions": cache.evictions,
+                "evictions-unfinished": cache.evictions_unfinished,
+            }
+        return d
+
+    def to_json(self, cache=None, indent: Optional[int] = 2) -> str:
+        return json.dumps(self.to_dict(cache), sort_keys=True, indent=indent)
+
+
+def dump_stats(stats: SearchStats, cache=None, out=sys.stdout) -> None:
+    """Print search statistics in a human-readable form."""
+    out.write(f"Search nodes:\t\t\t{stats.nodes:4}\n")
+    out.write(f"Maximum search depth:\t\t{stats.max_depth:4}\n")
+    out.write(
+        f"{'method':30} {'calls':>8} {'improved':>8} {'cutoffs':>8} {'depth':>6} {'time':>9}\n"
+    )
+    for name, method in sorted(stats.methods.items()):
+        out.write(
+            f"{name:30} {method['calls']:8} {method['improvements']:8} "
+            f"{method['cutoffs']:8} {method['max_depth']:6} {method['time']:9.4f}\n"
+        )
+    if cache is not None:
+        out.write(f"Cache hits (finished):\t\t{cache.hits_exact:4}\n")
+        out.write(f"Cache hits (unfinished):\t{cache.hits_partial:4}\n")
+        out.write(f"Cache misses:\t\t\t{cache.misses:4}\n")
+        out.write(f"Partial bounds:\t\t\t{len(cache.partial):4}\n")
+        out.write(f"Partial bounds evicted:\t\t{cache.partial.evictions:4}\n")
+        if cache.max_entries is not None:
+            out.write(f"Cache entries evicted:\t\t{cache.evictions:4}\n")
+            out.write(f"  of them unfinished:\t\t{cache.evictions_unfinished:4}\n")
+    print_sep(out=out)
+    return
@@ -0,0 +1,169 @@
+# Copyright (c) 2019 by Rocky Bernstein <rb@dustyfeet.com>
+"""Tracing of multiplication-sequence searching.
+
+A tracer is given structured events as the search progresses. Searching
+only calls a tracer when one is installed, so when there isn't one, no
+trace messages are formatted and no event arguments are computed.
+
+PrintTracer gives indented, human-readable output; it is what
+MultConst(debug=True) installs. JSONTracer writes one JSON object per
+event per line, which is easier for other programs to consume.
+"""
+
+import json
+import sys
+from typing import Any, Optional
+
+from mult_by_const.util import bin2str
+
+
+class Tracer:
+    """Base class for search tracers. The event methods here do nothing
+    except keep track of how deeply nested the alpha-beta search is.
+
+    Events are:
+
+    node_entered:      alpha-beta search starts on `n`, with `lower` cost incurred
+                       so far and an overall cost `limit`
+    node_exited:       alpha-beta search on `n` is done; this pairs with node_entered
+    cache_hit:         a finished cache entry for `n`, with cost `cost`, was used
+    trying:            `n` is about to be searched via `operand`, e.g. a factor
+                       or neighbor of `n`
+    cutoff:            searching `n` stopped early because cost `cost` is not
+                       less than `limit`. `reason` says which kind of cutoff it is.
+    bound_lowered:     the best cost for `n` went from `previous` to `cost` via
+                       `via`, e.g. "factor", "neighbor", or a search-method name
+    sequence_computed: `method`, e.g. "binary", found a sequence for `n` costing `cost`
+    """
+
+    def __init__(self):
+        self.depth = 0
+
+    def node_entered(self, n: int, lower: float, limit: float) -> None:
+        self.depth += 1
+
+    def node_exited(self, n: int, cost: float) -> None:
+        self.depth -= 1
+
+    def cache_hit(self, n: int, cost: float) -> None:
+        pass
+
+    def trying(self, n: int, via: str, operand: int) -> None:
+        pass
+
+    def cutoff(
+        self, n: int, reason: str, cost: float, limit: float, operand: Optional[int] = None
+    ) -> None:
+        pass
+
+    def bound_lowered(
+        self, n: int, cost: float, previous: float, via: str, operand: Optional[int] = None
+    ) -> None:
+        pass
+
+    def sequence_computed(self, method: str, n: int, cost: float) -> None:
+        pass
+
+
+class PrintTracer(Tracer):
+    """Human-readable trace output, indented by the alpha-beta search depth."""
+
+    def __init__(self, out=sys.stdout):
+        super().__init__()
+        self.out = out
+
+    def msg(self, s: str) -> None:
+        self.out.write(f"{' ' * (2 * self.depth)}{s}\n")
+
+    def node_entered(self, n: int, lower: float, limit: float) -> None:
+        self.msg(
+            f"alpha-beta search for {n} in at most {limit-lower} = max alotted cost: {limit}, incurred cost {lower}"
+        )
+        super().node_entered(n, lower, limit)
+
+    def cache_hit(self, n: int, cost: float) -> None:
+        self.msg(f"alpha-beta using cache entry for {n} cost: {cost}")
+
+    def trying(self, n: int, via: str, operand: int) -> None:
+        if via == "neighbor":
+            which = "lower" if operand < n else "upper"
+            self.msg(f"Trying {which} neighbor {operand} of {n}...")
+        elif via == "negate":
+            self.msg(f"Looking at cached positive value {operand} of {n}")
+        else:
+            self.msg(f"Trying {via} {operand}...")
+
+    def cutoff(
+        self, n: int, reason: str, cost: float, limit: float, operand: Optional[int] = None
+    ) -> None:
+        if reason == "shift":
+            self.msg(f"**alpha cutoff after shift for {n} incurred {cost} > {limit} alotted")
+        elif reason == "lower-bound":
+            self.msg(f"**lower-bound cutoff on {operand} of {n}")
+        elif reason == "exhausted":
+            self.msg(
+                f"**cutoffs before anything found for {n}; check/update instructions used to {cost}"
+            )
+        else:
+            self.msg(f"**alpha cutoff in {reason} for {n} in cost {cost} >= {limit}")
+
+    def bound_lowered(
+        self, n: int, cost: float, previous: float, via: str, operand: Optional[int] = None
+    ) -> None:
+        if operand is None:
+            self.msg(f"*update {n} via {via}; cost {cost} < previous limit {previous}")
+        else:
+            self.msg(f"*update {n} using {via} {operand}; cost {cost} < previous limit {previous}")
+
+    def sequence_computed(self, method: str, n: int, cost: float) -> None:
+        self.msg(f"{method} method for {n} = {bin2str(n)} has cost {cost}")
+
+
+class JSONTracer(Tracer):
+    """Machine-readable trace output: one JSON object per line for each event.
+    Each object has an "event" field naming the event, a "depth" field giving
+    the alpha-beta search depth, and the event's arguments.
+    """
+
+    def __init__(self, out=sys.stdout):
+        super().__init__()
+        self.out = out
+
+    def emit(self, event: str, **fields: Any) -> None:
+        fields["event"] = event
+        fields["depth"] = self.depth
+        self.out.write(json.dumps(fields, sort_keys=True))
+        self.out.write("\n")
+
+    def node_entered(self, n: int, lower: float, limit: float) -> None:
+        self.emit("node_entered", n=n, lower=lower, limit=limit)
+        super().node_entered(n, lower, limit)
+
+    def node_exited(self, n: int, cost: float) -> None:
+        super().node_exited(n, cost)
+        self.emit("node_exited", n=n, cost=cost)
+
+    def cache_hit(self, n: int, cost: float) -> None:
+        self.emit("cache_hit", n=n, cost=cost)
+
+    def trying(self, n: int, via: str, operand: int) -> None:
+        self.emit("trying", n=n, via=via, operand=operand)
+
+    def cutoff(
+        self, n: int, reason: str, cost: float, limit: float, operand: Optional[int] = None
+    ) -> None:
+        self.emit("cutoff", n=n, reason=reason, cost=cost, limit=limit, operand=operand)
+
+    def bound_lowered(
+        self, n: int, cost: float, previous: float, via: str, operand: Optional[int] = None
+    ) -> None:
+        self.emit("bound_lowered", n=n, cost=cost, previous=previous, via=via, operand=operand)
+
+    def sequence_computed(self, method: str, n: int, cost: float) -> None:
+        self.emit("sequence_computed", method=method, n=n, cost=cost)
+
+
+if __name__ == "__main__":
+    from mult_by_const.mult import MultConst
+
+    MultConst(tracer=JSONTracer()).find_mult_sequence(51)
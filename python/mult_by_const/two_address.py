@@ -0,0 +1,104 @@
+# Copyright (c) 2019 by Rocky Bernstein <rb@dustyfeet.com>
+"""Register copies on two-address machines.
+
+On a three-address machine an instruction names a place for its result,
+so both of its operands survive: n = m - n leaves m alone. On a
+two-address machine, like the x86, the result goes where one of the
+operands was, so a value that is still needed afterwards must first be
+copied somewhere else.
+
+Our registers are r1, which holds the input and is never changed, n,
+and m, the value of n before the last shift. n starts out as its own
+copy of the input; that copy is the same for every sequence, so like
+"nop" it isn't counted. After that, a "copy" instruction is needed:
+
+* before a shift whose m is used afterwards, unless n hasn't changed
+  since the start. Then m is the input, which r1 still has.
+
+* before 1 - n, since subtracting n from r1 in place would lose r1.
+  "copy 1" puts r1 somewhere that the subtraction can overwrite. m - n
+  is the same when m is the input; otherwise m is a copy of its own
+  that the subtraction can overwrite.
+
+A "shift_add" computes (n << k) + n in one instruction and doesn't need
+a copy for itself.
+
+Searching with a two-address CPU profile adds these copies as it goes,
+see MultConstClass.shift_op_instrs() and op_instrs(), so it looks for
+the cheapest sequence counting them. two_address_sequence() adds the
+copies that a sequence found some other way needs.
+"""
+
+from typing import List
+
+from mult_by_const.cpu import CPUProfile
+from mult_by_const.instruction import (
+    FACTOR_FLAG,
+    OP_R1,
+    REVERSE_SUBTRACT_1,
+    REVERSE_SUBTRACT_FACTOR,
+    Instruction,
+)
+
+
+def uses_m(instrs: List[Instruction]) -> bool:
+    """Return True if some instruction of `instrs` before the next shift
+    uses m."""
+    for instr in instrs:
+        if instr.op in ("shift", "shift_add"):
+            return False
+        if instr.op in ("add", "subtract") and instr.amount in (
+            FACTOR_FLAG,
+            REVERSE_SUBTRACT_FACTOR,
+        ):
+            return True
+        pass
+    return False
+
+
+def two_address_sequence(instrs: List[Instruction], cpu_model: CPUProfile) -> List[Instruction]:
+    """Return `instrs` with the copies that a two-address machine needs,
+    costed by `cpu_model`. Copies already in `instrs` are replaced."""
+    copy_cost = cpu_model.costs["copy"]
+    result: List[Instruction] = []
+    changed = False  # Has n changed since the start?
+    m_is_input = True
+    instrs = [instr for instr in instrs if instr.op != "copy"]
+    for i, instr in enumerate(instrs):
+        if instr.op in ("shift", "shift_add"):
+            if changed and uses_m(instrs[i + 1:]):
+                result.append(Instruction("copy", 0, copy_cost))
+            m_is_input = not changed
+        elif instr.op == "subtract" and (
+            instr.amount == REVERSE_SUBTRACT_1
+            or (instr.amount == REVERSE_SUBTRACT_FACTOR and m_is_input)
+        ):
+            result.append(Instruction("copy", OP_R1, copy_cost))
+        result.append(instr)
+        if instr.op != "nop":
+            changed = True
+        pass
+    return result
+
+
+def copy_count(instrs: List[Instruction]) -> int:
+    """Return the number of copies in `instrs`."""
+    return sum(1 for instr in instrs if instr.op == "copy")
+
+
+if __name__ == "__main__":
+    from mult_by_const.cpu import x86_2addr_3reg
+    from mult_by_const.instruction import instruction_sequence_cost, print_instructions
+    from mult_by_const.mult import MultConst
+
+    three_address = MultConst()
+    two_address = MultConst(cpu_model=x86_2addr_3reg)
+    for n in (51, -7, 340, 12345):
+        _, instrs = three_address.find_mult_sequence(n)
+        copied = two_address_sequence(instrs, x86_2addr_3reg)
+        cost, two_address_instrs = two_address.find_mult_sequence(n)
+        print(
+            f"{n}: three-address sequence needs {copy_count(copied)} copies, "
+            f"cost {instruction_sequence_cost(copied)}; two-address search: cost {cost}"
+        )
+        print_instructions(two_address_instrs, n, cost)
@@ -10,19 +10,31 @@ def signum(n):
 
 
 def consecutive_zeros(n: int) -> Tuple[int, int]:
-    shift_amount = 0
-    while n % 2 == 0:
-        shift_amount += 1
-        n >>= 1
-    return (shift_amount, n)
+    """Return the number of low-order 0 bits in `n`, and `n` with them
+    shifted out. For 0, we return (0, 0).
+    """
+    # n & -n isolates the lowest 1 bit.
+    shift_amount = max((n & -n).bit_length() - 1, 0)
+    return (shift_amount, n >> shift_amount)
 
 
 def consecutive_ones(n: int) -> Tuple[int, int]:
-    one_run_count = 0
-    while n % 2 == 1:
-        one_run_count += 1
-        n >>= 1
-    return (one_run_count, n)
+    """Return the number of low-order 1 bits in `n` >= 0, and `n` with them
+    shifted out.
+    """
+    # ~n & (n + 1) isolates the lowest 0 bit.
+    one_run_count = (~n & (n + 1)).bit_length() - 1
+    return (one_run_count, n >> one_run_count)
+
+
+def naf_weight(n: int) -> int:
+    """Return the number of nonzero digits in the non-adjacent form (NAF)
+    of `n`. This is the smallest number of nonzero digits that any
+    representation of `n` using digits 1, 0 and -1 can have.
+    """
+    n = abs(n)
+    half = n >> 1
+    return bin(half ^ (n + half)).count("1")
 
 
 def bin2str(n: int) -> str:
@@ -0,0 +1,233 @@
+# Copyright (c) 2019 by Rocky Bernstein <rb@dustyfeet.com>
+"""Running instruction sequences on NumPy arrays.
+
+instruction_sequence_value() interprets a single instruction sequence
+for the input 1. Here we instead apply sequences to whole arrays of
+64-bit integers, the way a machine would: shifts, adds and subtracts
+wrap around modulo 2**64.
+
+execute_sequence() runs one sequence on an array of operands, with one
+NumPy operation per instruction.
+
+validate_cache() checks every finished entry of a multiplication cache
+against random operands. All of the entries are run at once: the
+sequences are encoded as rows of an array of operation codes, and each
+instruction step is a handful of NumPy operations across all entries.
+So the time taken depends mostly on the length of the longest sequence
+rather than on the number of entries.
+
+This module needs NumPy, which the rest of the package does not.
+"""
+
+from typing import Iterable, List, Tuple
+
+import numpy as np
+
+from mult_by_const.cache import MultCache
+from mult_by_const.instruction import (
+    FACTOR_FLAG,
+    OP_R1,
+    REVERSE_SUBTRACT_1,
+    REVERSE_SUBTRACT_FACTOR,
+    Instruction,
+)
+
+WORD_BITS = 64
+WORD_MASK = (1 << WORD_BITS) - 1
+
+# Operation codes used in encoding instruction sequences.
+OP_NOP = 0
+OP_SHIFT = 1
+OP_ADD_1 = 2  # n + r1
+OP_SUBTRACT_1 = 3  # n - r1
+OP_ADD_M = 4  # n + m
+OP_SUBTRACT_M = 5  # n - m
+OP_REVERSE_SUBTRACT_1 = 6  # r1 - n
+OP_REVERSE_SUBTRACT_M = 7  # m - n
+OP_NEGATE = 8
+OP_ZERO = 9
+OP_SHIFT_ADD = 10  # (n << amount) + n
+
+
+def instruction_opcode(instr: Instruction) -> int:
+    """Return the operation code for `instr`."""
+    if instr.op == "shift":
+        return OP_SHIFT
+    elif instr.op == "shift_add":
+        return OP_SHIFT_ADD
+    elif instr.op in ("add", "subtract"):
+        if instr.amount == REVERSE_SUBTRACT_1:
+            return OP_REVERSE_SUBTRACT_1
+        elif instr.amount == REVERSE_SUBTRACT_FACTOR:
+            return OP_REVERSE_SUBTRACT_M
+        elif instr.amount == OP_R1:
+            return OP_ADD_1 if instr.op == "add" else OP_SUBTRACT_1
+        elif instr.amount == FACTOR_FLAG:
+            return OP_ADD_M if instr.op == "add" else OP_SUBTRACT_M
+    elif instr.op == "negate":
+        return OP_NEGATE
+    elif instr.op == "zero":
+        return OP_ZERO
+    elif instr.op in ("nop", "copy"):
+        return OP_NOP
+    raise RuntimeError(f"Can't encode instruction {instr}")
+
+
+def as_words(x: np.ndarray) -> np.ndarray:
+    """View int64 or uint64 array `x` as uint64, where arithmetic wraps."""
+    if x.dtype not in (np.int64, np.uint64):
+        raise TypeError(f"Expecting an int64 or uint64 array, got {x.dtype}")
+    return x.view(np.uint64)
+
+
+def execute_sequence(instrs: List[Instruction], x: np.ndarray) -> np.ndarray:
+    """Multiply each element of the int64 or uint64 array `x` using the
+    instruction sequence `instrs`. The result has the same type as `x`,
+    and wraps around as machine arithmetic does.
+    """
+    r1 = as_words(x)
+    n = r1.copy()
+    m = r1
+    for instr in instrs:
+        if instr.op == "shift":
+            m = n
+            if instr.amount >= WORD_BITS:
+                n = np.zeros_like(n)
+            else:
+                n = n << np.uint64(instr.amount)
+            continue
+        elif instr.op == "shift_add":
+            m = n
+            if instr.amount < WORD_BITS:
+                n = (n << np.uint64(instr.amount)) + n
+            continue
+        opcode = instruction_opcode(instr)
+        if opcode == OP_ADD_1:
+            n = n + r1
+        elif opcode == OP_SUBTRACT_1:
+            n = n - r1
+        elif opcode == OP_ADD_M:
+            n = n + m
+        elif opcode == OP_SUBTRACT_M:
+            n = n - m
+        elif opcode == OP_REVERSE_SUBTRACT_1:
+            n = r1 - n
+        elif opcode == OP_REVERSE_SUBTRACT_M:
+            n = m - n
+        elif opcode == OP_NEGATE:
+            n = np.uint64(0) - n
+        elif opcode == OP_ZERO:
+            n = np.zeros_like(n)
+        pass
+    return n.view(x.dtype)
+
+
+def encode_sequences(sequences: List[List[Instruction]]) -> Tuple[np.ndarray, np.ndarray]:
+    """Encode `sequences` as two arrays with a row for each sequence: the
+    operation codes, and the shift amounts. Shorter sequences are padded
+    out with OP_NOP.
+    """
+    length = max((len(instrs) for instrs in sequences), default=0)
+    opcodes = np.zeros((len(sequences), length), dtype=np.int8)
+    amounts = np.zeros((len(sequences), length), dtype=np.uint64)
+    for i, instrs in enumerate(sequences):
+        for j, instr in enumerate(instrs):
+            opcodes[i, j] = instruction_opcode(instr)
+            if instr.op in ("shift", "shift_add"):
+                amounts[i, j] = min(instr.amount, WORD_BITS)
+            pass
+        pass
+    return opcodes, amounts
+
+
+def execute_sequences(opcodes: np.ndarray, amounts: np.ndarray, x: np.ndarray) -> np.ndarray:
+    """Run each of the encoded sequences (see encode_sequences()) on each
+    element of the uint64 array `x`. Return an array with a row for each
+    sequence and a column for each element of `x`.
+    """
+    r1 = np.broadcast_to(x, (opcodes.shape[0], x.shape[0]))
+    n = r1.copy()
+    m = r1.copy()
+    zero = np.uint64(0)
+    for step in range(opcodes.shape[1]):
+        opcode = opcodes[:, step, np.newaxis]
+        amount = amounts[:, step, np.newaxis]
+
+        shifting = opcode == OP_SHIFT
+        shift_adding = opcode == OP_SHIFT_ADD
+        shifted = np.where(amount >= WORD_BITS, zero, n << (amount % WORD_BITS))
+        m = np.where(shifting | shift_adding, n, m)
+        n = np.select(
+            [
+                shifting,
+                shift_adding,
+                opcode == OP_ADD_1,
+                opcode == OP_SUBTRACT_1,
+                opcode == OP_ADD_M,
+                opcode == OP_SUBTRACT_M,
+                opcode == OP_REVERSE_SUBTRACT_1,
+                opcode == OP_REVERSE_SUBTRACT_M,
+                opcode == OP_NEGATE,
+                opcode == OP_ZERO,
+            ],
+            [shifted, shifted + n, n + r1, n - r1, n + m, n - m, r1 - n, m - n, zero - n, zero],
+            n,
+        )
+        pass
+    return n
+
+
+def validate_cache(
+    cache: MultCache, samples: int = 16, seed: int = 0, chunk_size: int = 4096
+) -> List[int]:
+    """Run each finished entry of `cache` on `samples` random 64-bit
+    operands, and compare with multiplying. Return the multipliers whose
+    sequences give the wrong answer. Entries are done `chunk_size` at a
+    time, to bound the memory used.
+    """
+    rng = np.random.default_rng(seed)
+    x = rng.integers(0, 1 << WORD_BITS, size=samples, dtype=np.uint64, endpoint=False)
+    entries = [(n, instrs) for n, (_, _, finished, instrs) in cache.items() if finished and instrs]
+    wrong: List[int] = []
+    for start in range(0, len(entries), chunk_size):
+        chunk = entries[start:start + chunk_size]
+        opcodes, amounts = encode_sequences([instrs for _, instrs in chunk])
+        results = execute_sequences(opcodes, amounts, x)
+        multipliers = np.array([n & WORD_MASK for n, _ in chunk], dtype=np.uint64)
+        expected = multipliers[:, np.newaxis] * x
+        bad = np.any(results != expected, axis=1)
+        wrong.extend(chunk[i][0] for i in np.flatnonzero(bad))
+        pass
+    return wrong
+
+
+def multiply_check(n: int, instrs: List[Instruction], x: Iterable[int]) -> bool:
+    """Return True if `instrs` multiplies each of the numbers in `x` by `n`,
+    modulo 2**64."""
+    operands = np.array([value & WORD_MASK for value in x], dtype=np.uint64)
+    return bool(np.all(execute_sequence(instrs, operands) == operands * np.uint64(n & WORD_MASK)))
+
+
+if __name__ == "__main__":
+    from time import perf_counter
+    from mult_by_const.mult import MultConst
+
+    mconst = MultConst()
+    for n in range(-200, 2000):
+        mconst.find_mult_sequence(n)
+    start = perf_counter()
+    wrong = validate_cache(mconst.mult_cache)
+    print(f"{len(mconst.mult_cache)} cache entries checked in {perf_counter() - start:.3f}s; wrong: {wrong}")
+
+    # Shift-and-add versus native multiplication.
+    x = np.arange(1_000_000, dtype=np.int64)
+    n = 12345
+    _, instrs = mconst.find_mult_sequence(n)
+    start = perf_counter()
+    product = execute_sequence(instrs, x)
+    shift_add_time = perf_counter() - start
+    start = perf_counter()
+    expected = x * n
+    multiply_time = perf_counter() - start
+    assert np.array_equal(product, expected)
+    print(f"{n} times {len(x)} numbers: shift-add {shift_add_time:.4f}s, multiply {multiply_time:.4f}s")
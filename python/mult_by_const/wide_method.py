@@ -0,0 +1,168 @@
+# Copyright (c) 2019 by Rocky Bernstein <rb@dustyfeet.com>
+"""
+Multiplication by very wide constants: hundreds or thousands of bits.
+
+Alpha-beta searching gets expensive well before 64 bits. For wider
+multipliers, we work from the canonical signed-digit (CSD) form of the
+number (see csd_method.py), and combine three things:
+
+* The top window of digits, a number of at most `window_bits` bits, is
+  found by the regular search, using the multiplication cache.
+* The remaining digits are added in by Horner's rule: "shift" to the
+  next nonzero digit, and then "add" or "subtract" one.
+* When the digits that follow repeat the digits seen so far, i.e. the
+  number so far is v and the next digits make v * (2**i + 1) or
+  v * (2**i - 1), a single "shift" and an "add" or "subtract" of the
+  value before the shift takes care of all of them.
+
+Each step looks at the digits once, so the time taken grows about
+linearly in the bit length, apart from the cost of the window search.
+"""
+
+from typing import TYPE_CHECKING, List, Optional, Tuple
+
+from mult_by_const.csd_method import csd_sequence, naf_digits
+from mult_by_const.instruction import (
+    OP_R1,
+    Instruction,
+    instruction_sequence_cost,
+)
+from mult_by_const.sequence import as_list
+from mult_by_const.util import consecutive_zeros
+
+if TYPE_CHECKING:
+    from mult_by_const.mult import MultConst
+
+# Numbers of at most this many bits are searched for directly.
+WIDE_WINDOW_BITS = 24
+
+# The most alpha-beta search nodes used in searching for the top window.
+WINDOW_NODE_BUDGET = 5000
+
+
+def naf_prefixes(digits: List[Tuple[int, int]]) -> List[int]:
+    """Given the nonzero CSD digits of a number as returned by naf_digits(),
+    return the values of its prefixes: the k-th entry is the value of the
+    first k + 1 digits, scaled so that the last of these is in the
+    units position.
+    """
+    prefixes = []
+    value = 0
+    previous_position = digits[0][0]
+    for position, digit in digits:
+        value = (value << (previous_position - position)) + digit
+        prefixes.append(value)
+        previous_position = position
+        pass
+    return prefixes
+
+
+def wide_sequence(
+    self: "MultConst", n: int, window_bits: Optional[int] = None
+) -> Tuple[float, List[Instruction]]:
+    """Return the cost and an instruction sequence for multiplying by `n`,
+    which is expected to be a wide number. See the module docstring for
+    how this is done.
+
+    The top window is `window_bits` bits wide, WIDE_WINDOW_BITS by
+    default. If `n` fits in the window, this is the same as
+    find_mult_sequence().
+
+    The sequence found is recorded in the multiplication cache as
+    unfinished, since it may not be the cheapest.
+    """
+    if window_bits is None:
+        window_bits = WIDE_WINDOW_BITS
+
+    cache_lower, cache_upper, finished, cache_instrs = self.mult_cache[n]
+    if finished:
+        return cache_upper, as_list(cache_instrs)
+
+    if n.bit_length() <= window_bits or not self.cpu_model.can_subtract():
+        return self.find_mult_sequence(n, node_budget=WINDOW_NODE_BUDGET)
+
+    orig_n = n
+    n, need_negation = self.need_negation(n)
+    final_shift, n = consecutive_zeros(n)
+
+    digits = naf_digits(n)
+    prefixes = naf_prefixes(digits)
+
+    # Find the longest prefix that fits in the window, and search for that.
+    k = 0
+    while k + 1 < len(prefixes) and prefixes[k + 1].bit_length() <= window_bits:
+        k += 1
+    window_cost, window_instrs = self.find_mult_sequence(
+        prefixes[k], node_budget=WINDOW_NODE_BUDGET
+    )
+    instrs = [] if prefixes[k] == 1 else window_instrs[:]
+    cost = window_cost
+
+    while k + 1 < len(prefixes):
+        value, position = prefixes[k], digits[k][0]
+
+        # Do the next digits repeat the number so far?
+        j = 2 * k + 1
+        if k > 0 and j < len(prefixes):
+            shift_amount = position - digits[j][0]
+            shifted = value << shift_amount
+            if prefixes[j] in (shifted + value, shifted - value):
+                op = "add" if prefixes[j] == shifted + value else "subtract"
+                shift_op_cost, shift_op_instrs = self.shift_op_instrs(op, shift_amount, not instrs)
+                # Any digits after these use r1.
+                if self.fits_registers(instrs, shift_op_instrs, j + 1 < len(prefixes)):
+                    instrs += shift_op_instrs
+                    cost += shift_op_cost
+                    k = j
+                    continue
+
+        shift_amount = position - digits[k + 1][0]
+        shift_cost = self.shift_cost(shift_amount)
+        instrs.append(Instruction("shift", shift_amount, shift_cost))
+        if digits[k + 1][1] > 0:
+            cost += shift_cost + self.add_instruction(instrs, "add", OP_R1)
+        else:
+            cost += shift_cost + self.add_instruction(instrs, "subtract", OP_R1)
+        k += 1
+        pass
+
+    if need_negation:
+        if (
+            self.cpu_model.subtract_can_negate()
+            and instrs
+            and instrs[-1].op == "subtract"
+            and instrs[-1].amount == OP_R1
+        ):
+            # 1 - n is the negative of n - 1.
+            cost += self.reverse_subtract_one(instrs)
+        elif "negate" in self.op_costs:
+            cost += self.add_instruction(instrs, "negate", 0)
+        else:
+            return self.find_mult_sequence(orig_n, node_budget=WINDOW_NODE_BUDGET)
+        pass
+
+    if final_shift:
+        shift_cost = self.shift_cost(final_shift)
+        cost += shift_cost
+        instrs.append(Instruction("shift", final_shift, shift_cost))
+
+    if not self.fits_registers(instrs):
+        # The window's sequence needs more registers once the digits
+        # below it use r1. The CSD method only uses r1 and n.
+        return csd_sequence(self, orig_n)
+
+    assert cost == instruction_sequence_cost(instrs)
+    if self.tracer is not None:
+        self.tracer.sequence_computed("wide", orig_n, cost)
+    self.mult_cache.insert_or_update(orig_n, 0, cost, False, instrs)
+    return cost, instrs
+
+
+if __name__ == "__main__":
+    from mult_by_const.instruction import print_instructions
+    from mult_by_const.mult import MultConst
+
+    mconst = MultConst()
+    for n in (12345678901234567891, int("5" * 40, 16) + 2, -(3 ** 100)):
+        cost, instrs = wide_sequence(mconst, n)
+        print_instructions(instrs, n, cost)
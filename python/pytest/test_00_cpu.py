@@ -9,6 +9,7 @@ def test_cpu_profiles():
     for cpu_profile, can_negate, subtract_can_negate, shift1_cost, shift2_cost, in (
         (cpu.POWER_3addr_3reg, True, True, 1, 1),
         (cpu.chained_adds, False, False, 1, 2),
+        (cpu.IBM_801, True, True, 1, 1),
     ):
         assert cpu_profile.can_negate() == can_negate
         assert cpu_profile.subtract_can_negate() == subtract_can_negate
@@ -16,6 +17,32 @@ def test_cpu_profiles():
         assert cpu_profile.shift_cost_fn(2) == shift2_cost
 
 
+def test_lower_bounds():
+    for cpu_profile, expected_bounds in (
+        (cpu.POWER_3addr_3reg, ((0, 0), (1, 0), (2, 1), (3, 2), (7, 2), (11, 3), (-11, 3))),
+        (cpu.chained_adds, ((0, 0), (1, 0), (2, 1), (3, 2), (8, 3), (9, 4), (23, 5))),
+        (cpu.IBM_801, ((0, 0), (1, 0), (2, 0), (3, 1), (7, 1), (11, 2), (-11, 2))),
+    ):
+        for n, expected in expected_bounds:
+            bound = cpu_profile.lower_bound_fn(n)
+            assert bound == expected, f"{cpu_profile.name} bound for {n} is {bound}; expected {expected}"
+
+
+def test_shift_add_cost():
+    assert cpu.POWER_3addr_3reg.shift_add_cost(1) == cpu.inf_cost
+    assert cpu.IBM_801.has_shift_add()
+    assert cpu.IBM_801.shift_add_cost(20) == 1
+    lea = cpu.CPUProfile(
+        "lea", "three-address", 3, cpu.RISC_shift_add_cost_profile, shift_add_max=3
+    )
+    assert lea.shift_add_cost(3) == 1
+    assert lea.shift_add_cost(4) == cpu.inf_cost
+    assert lea.to_dict()["shift_add_max"] == 3
+    assert "shift_add_max" not in cpu.POWER_3addr_3reg.to_dict()
+
+
 # If run as standalone
 if __name__ == "__main__":
     test_cpu_profiles()
+    test_lower_bounds()
+    test_shift_add_cost()
@@ -1,6 +1,18 @@
-from mult_by_const import MultConstClass, print_instructions, binary_method
+from mult_by_const import MultConst, MultConstClass, print_instructions, binary_method
+from mult_by_const.cpu import CPUProfile, POWER_3addr_3reg, RISC_equal_time_cost_profile
+from mult_by_const.instruction import instruction_sequence_cost, instruction_sequence_value
 import os
 
+# With two registers, subtracts can't negate.
+two_registers = CPUProfile(
+    name="two registers",
+    instruction_type="three-address",
+    max_registers=2,
+    costs=RISC_equal_time_cost_profile,
+    shift_cost_fn=POWER_3addr_3reg.shift_cost_fn,
+    lower_bound_fn=POWER_3addr_3reg.lower_bound_fn,
+)
+
 
 def test_binary_method():
     debug = "DEBUG" in os.environ
@@ -27,6 +39,21 @@ def test_binary_method():
         assert expect_cost == cost, f"cost({n}) = {cost}; expected it to be {expect_cost}."
 
 
+def test_binary_negative_prefix():
+    # The binary method can start from a cached -n. Without subtracts
+    # that negate, the adds and subtracts of 1 below it have to flip.
+    for mconst in (MultConst(cpu_model=two_registers), MultConst()):
+        for n in range(-300, -190):
+            mconst.find_mult_sequence(n)
+            for m in (n, -n):
+                cost, result = binary_method.binary_sequence(mconst, m)
+                assert instruction_sequence_value(result) == m, f"{m}: {result}"
+                assert instruction_sequence_cost(result) == cost
+            pass
+        mconst.mult_cache.check()
+
+
 # If run as standalone
 if __name__ == "__main__":
     test_binary_method()
+    test_binary_negative_prefix()
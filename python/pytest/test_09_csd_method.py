@@ -0,0 +1,52 @@
+from mult_by_const import MultConst, MultConstClass, print_instructions, csd_method
+from mult_by_const.cpu import chained_adds
+from mult_by_const.instruction import check_instruction_sequence_cost, check_instruction_sequence_value
+import os
+
+
+def test_csd_method():
+    debug = "DEBUG" in os.environ
+    mconst = MultConstClass(debug=debug)
+    for (n, expect_cost) in (
+        (0, 1),
+        (1, 0),
+        (-1, 1),
+        (2, 1),
+        (3, 2),
+        (7, 2),
+        (-7, 2),
+        (11, 4),
+        (45, 6),
+        (53, 6),
+        (340, 7),
+    ):
+        cost, result = csd_method.csd_sequence(mconst, n)
+        if debug:
+            print_instructions(result, n, cost)
+        assert expect_cost == cost, f"cost({n}) = {cost}; expected it to be {expect_cost}."
+        check_instruction_sequence_value(n, result)
+        check_instruction_sequence_cost(cost, result)
+
+    assert csd_method.naf_digits(7) == [(3, 1), (0, -1)]
+
+    # Without subtraction, we get the binary method.
+    mconst = MultConstClass(cpu_model=chained_adds)
+    cost, result = csd_method.csd_sequence(mconst, 7)
+    assert cost == 4
+    check_instruction_sequence_value(7, result)
+
+
+def test_csd_seed():
+    binary_mconst = MultConst()
+    csd_mconst = MultConst(seed_method=csd_method.csd_sequence)
+    for n in list(range(2, 100)) + [12345678]:
+        binary_cost, _ = binary_mconst.find_mult_sequence(n)
+        csd_cost, csd_instrs = csd_mconst.find_mult_sequence(n)
+        assert binary_cost == csd_cost, f"seeding shouldn't change the cost for {n}"
+        check_instruction_sequence_value(n, csd_instrs)
+
+
+# If run as standalone
+if __name__ == "__main__":
+    test_csd_method()
+    test_csd_seed()
@@ -73,6 +73,36 @@ def test_negate():
     check(n, s_cost, instrs=s_instrs, debug=debug)
 
 
+def test_negative_and_positive():
+    # Searching for a negative number shouldn't change what is found for
+    # its positive counterpart, or the other way around.
+    for engine in ("recursive", "iterative"):
+        mconst = MultConst(engine=engine)
+        for n in (-975, 975, -2252, 2252, -53, 27, -27, -771606, -12345678):
+            cost, instrs = mconst.find_mult_sequence(n)
+            check(n, cost, instrs, debug=False)
+            pass
+        mconst.mult_cache.check()
+        for n, (_, _, _, instrs) in mconst.mult_cache.cache.items():
+            if instrs:
+                check_instruction_sequence_value(n, instrs)
+
+
+def test_shared_cache_negatives():
+    # What an earlier search leaves in the cache shouldn't make a later one
+    # worse: -204 costs 5 with [n<<2, 1-n, n<<4, n+m, n<<2], and -205 6.
+    for engine in ("recursive", "iterative"):
+        mconst = MultConst(engine=engine)
+        found = {n: mconst.find_mult_sequence(n) for n in range(-300, -190)}
+        for n, cost in ((-204, 5), (-205, 6)):
+            assert found[n][0] == cost, (engine, n)
+            check(n, *found[n], debug=False)
+            pass
+        mconst.mult_cache.check()
+
+
 # If run as standalone
 if __name__ == "__main__":
     test_negate()
+    test_negative_and_positive()
+    test_shared_cache_negatives()
@@ -20,7 +20,7 @@ def test_add_chains():
         [7, 10, 12, 9, 16], # cost 4
         [14, 11, 20, 15, 24, 13, 17, 18, 32], # cost 5
         [19, 28, 21, 22,
-         # 23, # 23 reuses 3 on the path to 1 which we don't pick up.
+         # 23, # 23 reuses 3 on the path to 1 which we don't pick up; see test_56_dag_search.py.
          40, 27,
          # 30, # 30 reuses 12 + 3 on the path to 1 which we don't pick up.
          25, 48, 26, 34, 36, 33, 64], # cost 6
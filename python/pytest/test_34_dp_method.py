@@ -0,0 +1,50 @@
+"""
+Test bottom-up dynamic-programming table building against alpha-beta search.
+"""
+from mult_by_const import MultConst
+from mult_by_const.cpu import chained_adds, POWER_3addr_3reg
+from mult_by_const.dp_method import dp_table
+
+
+def test_dp_table():
+    for cpu_model, to in ((POWER_3addr_3reg, 300), (chained_adds, 150)):
+        dp_mconst = MultConst(cpu_model=cpu_model)
+        mcache = dp_table(dp_mconst, to)
+        mcache.check()
+        search_mconst = MultConst(cpu_model=cpu_model)
+        for n in range(1, to + 1):
+            lower, cost, finished, instrs = mcache[n]
+            assert finished, f"{n} should have been finished in dp table"
+            search_cost, _ = search_mconst.find_mult_sequence(n)
+            assert (
+                cost == search_cost
+            ), f"dp cost for {n} is {cost}; search gives {search_cost}"
+            pass
+        pass
+
+    # Once the table is built, searching just uses it.
+    mconst = MultConst()
+    dp_table(mconst, 51)
+    cost, instrs = mconst.find_mult_sequence(51)
+    assert cost == 4, f"for 51 expected cost 4; got {cost}"
+    return
+
+
+def test_lower_bounds_admissible():
+    """The search relies on a CPU profile's lower bound never being more
+    than the actual cost."""
+    for cpu_model, to in ((POWER_3addr_3reg, 2000), (chained_adds, 2000)):
+        mcache = dp_table(MultConst(cpu_model=cpu_model), to)
+        for n in range(1, to + 1):
+            cost = mcache[n][1]
+            bound = cpu_model.lower_bound_fn(n)
+            assert bound <= cost, f"{cpu_model.name} bound {bound} for {n} exceeds cost {cost}"
+            pass
+        pass
+    return
+
+
+# If run as standalone
+if __name__ == "__main__":
+    test_dp_table()
+    test_lower_bounds_admissible()
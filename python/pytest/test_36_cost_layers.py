@@ -0,0 +1,40 @@
+"""
+Test enumerating multipliers by cost layer.
+"""
+from mult_by_const import MultConst
+from mult_by_const.cpu import chained_adds, POWER_3addr_3reg
+
+
+def test_cost_layers():
+    for cpu_model, max_cost, limit in ((POWER_3addr_3reg, 6, 200), (chained_adds, 7, 64)):
+        mconst = MultConst(cpu_model=cpu_model)
+        search_mconst = MultConst(cpu_model=cpu_model)
+        previous_cost = -1
+        seen = set()
+        for cost, multipliers in mconst.cost_layers(max_cost, limit):
+            assert previous_cost < cost <= max_cost
+            previous_cost = cost
+            for n in multipliers:
+                assert n not in seen, f"{n} appears in more than one layer"
+                seen.add(n)
+                if n > 0:
+                    search_cost, _ = search_mconst.find_mult_sequence(n)
+                    assert (
+                        cost == search_cost
+                    ), f"{n} is in layer {cost}, but search gives cost {search_cost}"
+                pass
+            pass
+        mconst.mult_cache.check()
+
+    # See also test_32_add_chain.py. 23 needs an intermediate value that
+    # isn't the previous factor, so it isn't reached until cost 7.
+    layers = dict(MultConst(cpu_model=chained_adds).cost_layers(7, 64))
+    assert layers[0] == [1]
+    assert layers[4] == [7, 9, 10, 12, 16]
+    assert 23 in layers[7]
+    return
+
+
+# If run as standalone
+if __name__ == "__main__":
+    test_cost_layers()
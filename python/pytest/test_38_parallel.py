@@ -0,0 +1,36 @@
+"""
+Test building a multiplication table with a pool of worker processes.
+"""
+from mult_by_const import MultConst
+from mult_by_const.cpu import chained_adds, POWER_3addr_3reg
+from mult_by_const.parallel import make_shards, parallel_table
+
+
+def test_parallel_table():
+    assert make_shards(2, 12, 3) == [(2, 6), (6, 10), (10, 12)]
+    assert make_shards(2, 4, 8) == [(2, 3), (3, 4)]
+
+    to = 200
+    mcache = parallel_table(to, 3, POWER_3addr_3reg)
+    mcache.check()
+    mconst = MultConst(cpu_model=POWER_3addr_3reg)
+    for n in range(2, to + 1):
+        lower, cost, finished, instrs = mcache[n]
+        assert finished, f"{n} should have been finished"
+        search_cost, _ = mconst.find_mult_sequence(n)
+        assert (
+            cost == search_cost
+        ), f"parallel cost for {n} is {cost}; search gives {search_cost}"
+        pass
+
+    # In the "chained adds" model, search results depend on what is in the
+    # cache, so we just check that what we get is consistent.
+    mcache = parallel_table(80, 2, chained_adds)
+    mcache.check()
+    assert all(mcache[n][2] for n in range(2, 81))
+    return
+
+
+# If run as standalone
+if __name__ == "__main__":
+    test_parallel_table()
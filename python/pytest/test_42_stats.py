@@ -0,0 +1,86 @@
+"""
+Test search statistics gathering.
+"""
+import json
+import os
+from io import StringIO
+from tempfile import TemporaryDirectory
+
+from click.testing import CliRunner
+from ruamel.yaml import YAML
+
+from mult_by_const import MultConst
+from mult_by_const.main import main
+from mult_by_const.stats import dump_stats, TOP_LEVEL
+
+
+def test_stats():
+    mconst = MultConst()
+    assert mconst.stats is None, "statistics should be off by default"
+
+    mconst = MultConst(collect_stats=True)
+    stats = mconst.stats
+    for n in (51, 340, 12345):
+        mconst.find_mult_sequence(n)
+    assert stats.nodes > 0
+    assert stats.max_depth > 1
+    assert stats.depth == 0, "enter_node() and leave_node() calls should balance"
+    assert stats.active == [], "enter_method() and leave_method() calls should balance"
+
+    names = set(fn.__name__ for fn in mconst.search_methods)
+    assert names <= set(stats.methods.keys()) | {TOP_LEVEL}
+    for name in names:
+        method = stats.methods[name]
+        assert method["calls"] >= method["improvements"]
+        assert method["time"] >= 0
+
+    d = json.loads(stats.to_json(mconst.mult_cache))
+    assert d["nodes"] == stats.nodes
+    assert d["cache"]["entries"] == len(mconst.mult_cache)
+
+    out = StringIO()
+    dump_stats(stats, mconst.mult_cache, out=out)
+    assert "Search nodes" in out.getvalue()
+
+    stats.clear()
+    assert stats.nodes == 0 and stats.methods == {}
+    return
+
+
+def test_stats_cli():
+    # With a cache dump, the statistics are part of the same document.
+    runner = CliRunner()
+    result = runner.invoke(main, ["--to", "5", "--fmt", "json", "--stats"])
+    assert result.exit_code == 0, result.output
+    d = json.loads(result.output)
+    assert set(d["products"]) == {str(n) for n in range(-1, 6)}
+    assert d["stats"]["nodes"] > 0 and "cache" in d["stats"]
+
+    result = runner.invoke(main, ["--to", "5", "--fmt", "yaml", "--stats"])
+    assert result.exit_code == 0, result.output
+    assert YAML().load(result.output)["stats"]["nodes"] > 0
+
+    with TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "out.json")
+        result = runner.invoke(main, ["--fmt", "json", "--stats", "-o", path, "51"])
+        assert result.exit_code == 0, result.output
+        assert "stats" not in result.output
+        with open(path) as fd:
+            assert json.load(fd)["stats"]["nodes"] > 0
+
+    # Worker processes' statistics are added in.
+    result = runner.invoke(main, ["--to", "60", "--jobs", "2", "--fmt", "json", "--stats"])
+    assert result.exit_code == 0, result.output
+    stats = json.loads(result.output)["stats"]
+    assert stats["nodes"] > 0 and stats["methods"]
+
+    # A text dump shows the cache counters; the statistics don't repeat them.
+    result = runner.invoke(main, ["--to", "5", "--stats"])
+    assert result.exit_code == 0, result.output
+    assert result.output.count("Cache misses") == 1
+
+
+# If run as standalone
+if __name__ == "__main__":
+    test_stats()
+    test_stats_cli()
@@ -0,0 +1,41 @@
+"""
+Test search tracing.
+"""
+import json
+from io import StringIO
+
+from mult_by_const import MultConst
+from mult_by_const.trace import JSONTracer, PrintTracer
+
+
+def test_trace():
+    assert MultConst().tracer is None, "there should be no tracer by default"
+    assert isinstance(MultConst(debug=True).tracer, PrintTracer)
+
+    out = StringIO()
+    tracer = JSONTracer(out)
+    mconst = MultConst(tracer=tracer)
+    untraced = MultConst()
+    for n in (51, 340, 12345, 12345):
+        cost, _ = mconst.find_mult_sequence(n)
+        assert cost == untraced.find_mult_sequence(n)[0], "tracing should not change costs"
+        pass
+    assert tracer.depth == 0, "node entries and exits should balance"
+
+    events = [json.loads(line) for line in out.getvalue().splitlines()]
+    kinds = [event["event"] for event in events]
+    assert kinds.count("node_entered") == kinds.count("node_exited")
+    for kind in ("node_entered", "cache_hit", "trying", "cutoff", "bound_lowered"):
+        assert kind in kinds, f"expecting a {kind} event"
+    assert all(event["depth"] >= 0 for event in events)
+
+    out = StringIO()
+    mconst = MultConst(tracer=PrintTracer(out))
+    mconst.find_mult_sequence(51)
+    assert out.getvalue().startswith("binary method for 51")
+    return
+
+
+# If run as standalone
+if __name__ == "__main__":
+    test_trace()
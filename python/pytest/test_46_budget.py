@@ -0,0 +1,50 @@
+"""
+Test searching with time and node budgets.
+"""
+from mult_by_const import MultConst
+from mult_by_const.cpu import chained_adds
+
+
+def test_node_budget():
+    for cpu_model, n in ((None, 987654321), (None, -12345678), (chained_adds, 12345)):
+        kwargs = {} if cpu_model is None else {"cpu_model": cpu_model}
+        full_cost, _ = MultConst(**kwargs).find_mult_sequence(n)
+
+        mconst = MultConst(**kwargs)
+        lower, upper, finished, instrs = mconst.find_mult_bounds(n, node_budget=0)
+        assert not finished, f"searching for {n} should have been cut short"
+        assert lower <= full_cost <= upper
+        assert not mconst.mult_cache[n][2], "cache entry should be unfinished"
+        assert mconst.budget is None, "budget should be removed after searching"
+
+        # Bigger budgets pick up from where we left off, and never get worse.
+        for node_budget in (10, 100, 1000):
+            lower2, upper2, finished, instrs = mconst.find_mult_bounds(n, node_budget=node_budget)
+            assert lower2 >= lower and upper2 <= upper
+            assert lower2 <= full_cost <= upper2
+            lower, upper = lower2, upper2
+
+        cost, instrs = mconst.find_mult_sequence(n)
+        assert cost == full_cost, f"unbudgeted search for {n} should finish"
+        assert mconst.mult_cache[n][2]
+        assert mconst.find_mult_bounds(n)[:3] == (cost, cost, True)
+        if n > 0:
+            mconst.mult_cache.check()
+
+
+def test_time_budget():
+    mconst = MultConst()
+    lower, upper, finished, instrs = mconst.find_mult_bounds(2147471303, time_budget=0)
+    assert not finished and lower < upper
+    assert instrs, "we should get the seed sequence"
+
+    mconst = MultConst()
+    cost, _ = mconst.alpha_beta_search(51, 0, 6, node_budget=0)
+    assert not mconst.mult_cache[51][2]
+    return
+
+
+# If run as standalone
+if __name__ == "__main__":
+    test_node_budget()
+    test_time_budget()
@@ -0,0 +1,50 @@
+"""
+Test that the explicit-stack search engine matches the recursive one.
+"""
+import inspect
+import sys
+
+import pytest
+
+from mult_by_const import MultConst
+from mult_by_const.cpu import chained_adds
+
+
+def test_iterative_search():
+    for cpu_model, numbers in (
+        (None, list(range(1, 300)) + list(range(-1, -100, -1)) + [12345678, -12345678]),
+        (chained_adds, range(1, 200)),
+    ):
+        kwargs = {} if cpu_model is None else {"cpu_model": cpu_model}
+        recursive = MultConst(**kwargs)
+        iterative = MultConst(engine="iterative", **kwargs)
+        for n in numbers:
+            expect, _ = recursive.find_mult_sequence(n)
+            cost, instrs = iterative.find_mult_sequence(n)
+            assert cost == expect, f"iterative cost for {n} is {cost}; recursive gives {expect}"
+        assert iterative.mult_cache.cache == recursive.mult_cache.cache
+
+    with pytest.raises(ValueError):
+        MultConst(engine="bogus")
+
+
+def test_deep_search():
+    # Each level of alpha-beta search takes a few Python frames when done
+    # recursively, but none when done iteratively.
+    n = 1234567891
+    limit = sys.getrecursionlimit()
+    sys.setrecursionlimit(len(inspect.stack()) + 25)
+    try:
+        with pytest.raises(RecursionError):
+            MultConst().find_mult_sequence(n)
+        cost, instrs = MultConst(engine="iterative").find_mult_sequence(n)
+    finally:
+        sys.setrecursionlimit(limit)
+    assert cost == MultConst().find_mult_sequence(n)[0]
+    return
+
+
+# If run as standalone
+if __name__ == "__main__":
+    test_iterative_search()
+    test_deep_search()
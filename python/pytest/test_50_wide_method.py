@@ -0,0 +1,49 @@
+"""
+Test multiplication by very wide constants.
+"""
+import random
+
+from mult_by_const import MultConst
+from mult_by_const.csd_method import csd_sequence_inner
+from mult_by_const.instruction import (
+    check_instruction_sequence_value,
+    instruction_sequence_cost,
+)
+from mult_by_const.util import consecutive_ones, consecutive_zeros
+
+
+def test_bit_runs():
+    for n, zeros, ones in ((1, 0, 1), (12, 2, 0), (-12, 2, 0), (0b10111, 0, 3), (1 << 300, 300, 0)):
+        assert consecutive_zeros(n) == (zeros, n >> zeros)
+        assert consecutive_ones(n) == (ones, n >> ones)
+
+
+def test_wide_method():
+    random.seed(10)
+    mconst = MultConst()
+    for bits in (64, 256, 1024):
+        n = random.getrandbits(bits) | (1 << (bits - 1))
+        for multiplier in (n, -n, n << 3):
+            cost, instrs = mconst.find_wide_sequence(multiplier)
+            check_instruction_sequence_value(multiplier, instrs)
+            assert cost == instruction_sequence_cost(instrs)
+            csd_cost, _ = csd_sequence_inner(MultConst(), multiplier)
+            assert cost <= csd_cost, f"wide cost {cost} for {multiplier} is more than CSD {csd_cost}"
+            lower, upper, finished, _ = mconst.mult_cache[multiplier]
+            assert upper == cost and not finished
+
+    # Repeated digit patterns are handled by factors.
+    n = int("5" * 64, 16)
+    cost, instrs = mconst.find_wide_sequence(n)
+    check_instruction_sequence_value(n, instrs)
+    assert cost < 100, f"0x5555... should use factors; cost is {cost}"
+
+    # Narrow numbers are just searched for.
+    assert mconst.find_wide_sequence(12345678)[0] == MultConst().find_mult_sequence(12345678)[0]
+    return
+
+
+# If run as standalone
+if __name__ == "__main__":
+    test_bit_runs()
+    test_wide_method()
@@ -0,0 +1,89 @@
+"""
+Test the common-subpattern method for wide constants.
+"""
+import random
+
+from mult_by_const import MultConst
+from mult_by_const.csd_method import csd_sequence, naf_digits
+from mult_by_const.instruction import (
+    check_instruction_sequence_value,
+    instruction_sequence_cost,
+)
+from mult_by_const.mult import SEARCH_BITS
+from mult_by_const.pattern_method import binary_digits, top_factor, top_pattern
+from mult_by_const.wide_method import naf_prefixes
+
+
+def test_top_pattern():
+    # The digits of pattern * (2**distance + sign) where the two copies of
+    # the pattern don't overlap.
+    for pattern, distance, sign in ((0b1011, 7, 1), (0b10011, 8, -1), (0b1101101, 12, 1)):
+        n = pattern * ((1 << distance) + sign)
+        digits = naf_digits(n)
+        weight, found_distance, found_sign = top_pattern(digits)
+        assert weight >= len(naf_digits(pattern))
+        prefix = naf_prefixes(digits[: 2 * weight])[-1]
+        assert prefix % ((1 << found_distance) + found_sign) == 0
+
+    # No pattern at all.
+    assert top_pattern(naf_digits(0b1000001)) is None
+
+    # Carries hide this pattern in the CSD form, but not in binary.
+    n = int("1011" * 2, 2)
+    assert binary_digits(n) == [(7, 1), (5, 1), (4, 1), (3, 1), (1, 1), (0, 1)]
+    assert top_pattern(binary_digits(n)) == (3, 4, 1)
+    assert top_pattern(naf_digits(n)) is None
+
+    # Overlapping copies show up in neither form.
+    assert top_factor(0b1101 * ((1 << 3) + 1)) == (3, 1)
+    assert top_factor(523) is None
+
+
+def test_pattern_method():
+    random.seed(11)
+    mconst = MultConst()
+    for bits in (64, 256, 1024):
+        n = random.getrandbits(bits) | (1 << (bits - 1))
+        for multiplier in (n, -n, n << 3):
+            cost, instrs = mconst.find_pattern_sequence(multiplier)
+            check_instruction_sequence_value(multiplier, instrs)
+            assert cost == instruction_sequence_cost(instrs)
+            wide_cost, _ = MultConst().find_wide_sequence(multiplier)
+            assert cost <= wide_cost
+
+    # Patterns that the wide method's repeats don't catch.
+    for n in (
+        int("b3" * 40, 16) * ((1 << 300) - 1),
+        int("5" * 64, 16),
+        int("b" * 20, 16) * 1001,
+        int("1011" * 40, 2),
+    ):
+        cost, instrs = mconst.find_pattern_sequence(n)
+        check_instruction_sequence_value(n, instrs)
+        wide_cost, _ = MultConst().find_wide_sequence(n)
+        assert cost < wide_cost, n
+    n = int("5" * 64, 16)
+    assert mconst.find_pattern_sequence(n)[0] < 20
+
+    # 1011 repeated is 1011 * (2**80 + 1) * ..., which CSD digits don't show.
+    n = int("1011" * 40, 2)
+    assert mconst.find_pattern_sequence(n)[0] < csd_sequence(MultConst(), n)[0] // 2
+
+
+def test_find_sequence():
+    mconst = MultConst()
+    narrow = (1 << SEARCH_BITS) - 3
+    assert mconst.find_sequence(narrow) == MultConst().find_mult_sequence(narrow)
+    assert mconst.mult_cache[narrow][2]
+
+    wide = int("123456789" * 10)
+    cost, instrs = mconst.find_sequence(wide)
+    check_instruction_sequence_value(wide, instrs)
+    assert not mconst.mult_cache[wide][2]
+
+
+# If run as standalone
+if __name__ == "__main__":
+    test_top_pattern()
+    test_pattern_method()
+    test_find_sequence()
@@ -0,0 +1,48 @@
+"""
+Test multiple-constant multiplication with adder graphs.
+"""
+import random
+
+from mult_by_const import MultConst
+from mult_by_const.adder_graph import AdderGraph
+from mult_by_const.cpu import chained_adds
+from mult_by_const.instruction import str2instructions
+
+
+def test_adder_graph():
+    graph = AdderGraph(MultConst().cpu_model)
+    # 45 = 5 * 9 and 85 = 5 * 17 share 5.
+    n, cost = graph.add_sequence(str2instructions("[n<<2, n+1, n<<3, n+m]"))
+    assert (n, cost) == (45, 4)
+    n, cost = graph.add_sequence(str2instructions("[n<<2, n+1, n<<4, n+m]"))
+    assert (n, cost) == (85, 2)
+    assert graph.find(90) == (45, 1)
+    assert graph.find(7) is None
+    assert graph.add_output(90) == 1
+    assert graph.add_output(85) == 0
+    assert graph.cost() == 7
+    graph.check()
+
+
+def test_mcm():
+    random.seed(12)
+    for cpu_model, constants in (
+        (MultConst().cpu_model, [3, 13, 29, 45, 53, 45, 29, 13, 3, -7, 115, 229, 0, 1, 64]),
+        (MultConst().cpu_model, [random.randrange(-4000, 4000) for _ in range(30)]),
+        (chained_adds, [random.randrange(1, 1000) for _ in range(20)]),
+    ):
+        mconst = MultConst(cpu_model=cpu_model)
+        cost, separate_cost, graph = mconst.find_mcm_graph(constants)
+        graph.check()
+        assert set(graph.outputs) == set(constants)
+        assert cost == graph.cost()
+        assert cost <= separate_cost
+        assert separate_cost == sum(mconst.find_mult_sequence(n)[0] for n in set(constants))
+    # Sharing should help a lot here.
+    assert cost < separate_cost * 0.75
+
+
+# If run as standalone
+if __name__ == "__main__":
+    test_adder_graph()
+    test_mcm()
@@ -0,0 +1,50 @@
+"""
+Test adder-graph searching, which can reuse any earlier value.
+"""
+from mult_by_const import MultConst
+from mult_by_const.adder_graph import check_graph_cost
+from mult_by_const.cpu import chained_adds
+
+
+def check(mconst, n, cost, graph):
+    graph.check()
+    check_graph_cost(cost, graph)
+    assert graph.evaluate(7) == {n: 7 * n}
+    assert graph.registers_needed() <= mconst.cpu_model.max_registers
+
+
+def test_dag_add_chains():
+    mconst = MultConst(cpu_model=chained_adds)
+    # These are addition chains; see test_32_add_chain.py. The instruction
+    # sequences for 23 and 30 miss the cheapest ones since those reuse a
+    # value other than the last two.
+    for n, expected_cost in ((23, 6), (30, 6), (19, 6), (17, 5), (127, 10)):
+        cost, graph = mconst.find_adder_graph(n)
+        check(mconst, n, cost, graph)
+        assert cost == expected_cost, f"for {n} expecting {expected_cost}, got {cost}."
+    assert mconst.find_mult_sequence(23)[0] == 7
+
+
+def test_dag_search():
+    mconst = MultConst()
+    better = 0
+    for n in list(range(2, 120)) + [-7, -23, -341]:
+        cost, graph = mconst.find_adder_graph(n)
+        check(mconst, n, cost, graph)
+        sequence_cost = mconst.find_mult_sequence(n)[0]
+        assert cost <= sequence_cost
+        if cost < sequence_cost:
+            better += 1
+    assert better > 0
+
+    # With no room to search, we get the graph for the instruction sequence.
+    n = 12345
+    cost, graph = mconst.find_adder_graph(n, node_budget=0)
+    check(mconst, n, cost, graph)
+    assert cost == mconst.find_mult_sequence(n)[0]
+
+
+# If run as standalone
+if __name__ == "__main__":
+    test_dag_add_chains()
+    test_dag_search()
@@ -0,0 +1,67 @@
+"""
+Test running instruction sequences on NumPy arrays.
+"""
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from mult_by_const import MultConst  # noqa: E402
+from mult_by_const.cpu import IBM_801, chained_adds  # noqa: E402
+from mult_by_const.instruction import str2instructions  # noqa: E402
+from mult_by_const.vectorized import (  # noqa: E402
+    encode_sequences,
+    execute_sequence,
+    execute_sequences,
+    multiply_check,
+    validate_cache,
+)
+
+
+def test_execute_sequence():
+    mconst = MultConst()
+    x = np.array([0, 1, -1, 12345, 2 ** 62 + 3, -(2 ** 63)], dtype=np.int64)
+    for n in (0, 1, -1, 51, -51, 340, 12345, 2 ** 40 + 1):
+        _, instrs = mconst.find_mult_sequence(n)
+        product = execute_sequence(instrs, x)
+        assert product.dtype == np.int64
+        # int64 multiplication wraps around the same way.
+        assert np.array_equal(product, x * np.int64(n))
+        assert np.array_equal(execute_sequence(instrs, x.view(np.uint64)), product.view(np.uint64))
+        assert multiply_check(n, instrs, [3, 2 ** 64 - 1, 2 ** 63])
+
+    # Shifting everything out gives 0.
+    assert np.all(execute_sequence(str2instructions("[n<<64]"), x) == 0)
+
+    with pytest.raises(TypeError):
+        execute_sequence(instrs, np.array([1.0]))
+
+
+def test_execute_sequences():
+    sequences = [str2instructions(s) for s in ("[n<<2, n+1]", "[n<<3, n-1, n<<2, n+m]")]
+    sequences.append(MultConst().find_mult_sequence(-1)[1])
+    opcodes, amounts = encode_sequences(sequences)
+    assert opcodes.shape[0] == 3
+    x = np.array([1, 7, 2 ** 63], dtype=np.uint64)
+    results = execute_sequences(opcodes, amounts, x)
+    for i, n in enumerate((5, 35, -1)):
+        assert np.array_equal(results[i], x * np.uint64(n & (2 ** 64 - 1)))
+
+
+def test_validate_cache():
+    for cpu_model in (None, IBM_801, chained_adds):
+        mconst = MultConst() if cpu_model is None else MultConst(cpu_model=cpu_model)
+        for n in range(-30 if cpu_model is not chained_adds else 1, 200):
+            mconst.find_mult_sequence(n)
+        assert validate_cache(mconst.mult_cache, chunk_size=50) == []
+
+    # Break an entry and see that it is caught.
+    lower, upper, finished, instrs = mconst.mult_cache[99]
+    mconst.mult_cache.insert(99, lower, upper, finished, instrs[:-1])
+    assert validate_cache(mconst.mult_cache) == [99]
+
+
+# If run as standalone
+if __name__ == "__main__":
+    test_execute_sequence()
+    test_execute_sequences()
+    test_validate_cache()
@@ -0,0 +1,50 @@
+"""
+Test compiling instruction sequences into Python functions.
+"""
+from mult_by_const import MultConst
+from mult_by_const.compiled import CompiledCache, compile_sequence, sequence_source
+from mult_by_const.cpu import chained_adds
+from mult_by_const.instruction import str2instructions
+
+
+def test_compile_sequence():
+    for mconst in (MultConst(), MultConst(cpu_model=chained_adds)):
+        for n in range(-50 if mconst.cpu_model.can_negate() else 1, 600):
+            _, instrs = mconst.find_mult_sequence(n)
+            mult = compile_sequence(instrs)
+            for x in (0, 1, -3, 12345, 2 ** 70 + 1):
+                assert mult(x) == n * x, f"{n}: {instrs}"
+
+    # m is the input until the first shift, and is only saved when used.
+    instrs = str2instructions("[n+1, n+m, n<<2, n+1]")
+    assert compile_sequence(instrs)(5) == 5 * 13
+    assert "m = n" not in sequence_source(instrs)
+
+    wide = int("123456789" * 10)
+    assert MultConst().compiled(wide)(3) == 3 * wide
+
+
+def test_compiled_cache():
+    mconst = MultConst(compiled_cache_size=2)
+    mult_51 = mconst.compiled(51)
+    assert mult_51(2) == 102
+    assert mconst.compiled(51) is mult_51
+    mconst.compiled(85)
+    mconst.compiled(51)
+    # 85 is now the least recently used, so it goes.
+    mconst.compiled(99)
+    assert 51 in mconst.compiled_cache and 99 in mconst.compiled_cache
+    assert 85 not in mconst.compiled_cache
+    cache = mconst.compiled_cache
+    assert (len(cache), cache.hits, cache.misses) == (2, 2, 3)
+
+    cache = CompiledCache(1)
+    assert cache.get(7, MultConst().find_mult_sequence)(6) == 42
+    cache.clear()
+    assert len(cache) == 0
+
+
+# If run as standalone
+if __name__ == "__main__":
+    test_compile_sequence()
+    test_compiled_cache()
@@ -0,0 +1,77 @@
+"""
+Test the fused "shift_add" instruction.
+"""
+from mult_by_const import MultConst
+from mult_by_const.adder_graph import AdderGraph, check_graph_cost
+from mult_by_const.compiled import compile_sequence
+from mult_by_const.cpu import IBM_801, CPUProfile, RISC_shift_add_cost_profile
+from mult_by_const.dp_method import dp_table
+from mult_by_const.instruction import (
+    Instruction,
+    check_instruction_sequence_cost,
+    check_instruction_sequence_value,
+    instruction_sequence_value,
+    str2instruction,
+    str2instructions,
+)
+
+
+def test_shift_add_instruction():
+    instr = Instruction("shift_add", 3)
+    assert repr(instr) == "(n<<3)+n"
+    assert str2instruction(repr(instr)) == instr
+    instrs = str2instructions("[(n<<2)+n, n<<1, n+m]")
+    assert instruction_sequence_value(instrs) == 15
+    assert compile_sequence(instrs)(7) == 105
+
+
+def test_shift_add_search():
+    for engine in ("recursive", "iterative"):
+        mconst = MultConst(cpu_model=IBM_801, engine=engine)
+        risc = MultConst()
+        for n in list(range(-100, 300)) + [12345, 1000001]:
+            cost, instrs = mconst.find_mult_sequence(n)
+            check_instruction_sequence_value(n, instrs)
+            check_instruction_sequence_cost(cost, instrs)
+            assert cost <= risc.find_mult_sequence(n)[0]
+
+        # 9 * 17 * 65 is three shift-adds.
+        cost, instrs = mconst.find_mult_sequence(9 * 17 * 65)
+        assert cost == 3
+        assert all(instr.op == "shift_add" for instr in instrs)
+
+    # A shift-add that can only shift by one, as on the ROMP.
+    romp = CPUProfile("ROMP", "three-address", 3, RISC_shift_add_cost_profile, shift_add_max=1)
+    mconst = MultConst(cpu_model=romp)
+    for n in range(1, 200):
+        cost, instrs = mconst.find_mult_sequence(n)
+        check_instruction_sequence_value(n, instrs)
+        assert all(instr.amount == 1 for instr in instrs if instr.op == "shift_add")
+
+    # Other ways of building sequences use it too.
+    mconst = MultConst(cpu_model=IBM_801)
+    for n in (int("b" * 20, 16) * 1001, 51 << 40):
+        cost, instrs = mconst.find_pattern_sequence(n)
+        check_instruction_sequence_value(n, instrs)
+    cost, instrs = mconst.find_pattern_sequence(int("b3" * 40, 16) * ((1 << 300) + 1))
+    assert any(instr.op == "shift_add" for instr in instrs)
+    table = dp_table(MultConst(cpu_model=IBM_801), 100)
+    assert table[81][1] == 2
+
+
+def test_shift_add_graph():
+    mconst = MultConst(cpu_model=IBM_801)
+    cost, instrs = mconst.find_mult_sequence(45)
+    graph = AdderGraph(IBM_801)
+    graph.add_sequence(instrs)
+    graph.add_output(45)
+    graph.check()
+    check_graph_cost(cost, graph)
+    assert graph.cost() == cost
+
+
+# If run as standalone
+if __name__ == "__main__":
+    test_shift_add_instruction()
+    test_shift_add_search()
+    test_shift_add_graph()
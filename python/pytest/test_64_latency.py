@@ -0,0 +1,73 @@
+"""
+Test minimizing latency or instruction count rather than cost.
+"""
+import pytest
+
+from mult_by_const import MultConst
+from mult_by_const.adder_graph import AdderGraph
+from mult_by_const.cpu import POWER_3addr_3reg, chained_adds, superscalar
+from mult_by_const.instruction import check_instruction_sequence_value, str2instructions
+from mult_by_const.latency import (
+    graph_latency,
+    instruction_count,
+    instruction_sequence_latency,
+    objective_profile,
+)
+
+
+def test_sequence_measures():
+    instrs = str2instructions("[(n<<3)+n, n<<2, n+1]")
+    assert instruction_sequence_latency(instrs, superscalar) == 5
+    assert instruction_count(instrs, superscalar) == 3
+    assert instruction_count(str2instructions("[n<<3, n+1]"), chained_adds) == 4
+    assert objective_profile(POWER_3addr_3reg, "cost") is POWER_3addr_3reg
+    with pytest.raises(ValueError):
+        objective_profile(POWER_3addr_3reg, "power")
+
+
+def test_objectives():
+    by_cost = MultConst(cpu_model=superscalar)
+    by_latency = MultConst(cpu_model=superscalar, objective="latency")
+    for n in list(range(-50, 400)) + [12345]:
+        cost, instrs = by_cost.find_mult_sequence(n)
+        latency, latency_instrs = by_latency.find_mult_sequence(n)
+        check_instruction_sequence_value(n, latency_instrs)
+        assert latency == instruction_sequence_latency(latency_instrs, superscalar)
+        if n > 0:
+            assert latency <= instruction_sequence_latency(instrs, superscalar)
+
+    # The fewest instructions use "shift_add"s, which are slow.
+    assert by_cost.find_mult_sequence(12345)[0] == 7
+    assert by_latency.find_mult_sequence(12345)[0] == 8
+    assert instruction_sequence_latency(by_cost.find_mult_sequence(12345)[1], superscalar) == 9
+
+    # Asking find_mult_sequence() for another objective.
+    assert by_cost.find_mult_sequence(12345, objective="latency") == by_latency.find_mult_sequence(12345)
+    # by_cost keeps a MultConst for the latency objective; by_latency
+    # already searches for it, so it needs none.
+    assert "latency" in by_cost.objective_mconsts
+    assert not by_latency.objective_mconsts
+
+    # Without a true shift, counting instructions counts each doubling.
+    count, instrs = MultConst(cpu_model=chained_adds, objective="count").find_mult_sequence(100)
+    assert count == instruction_count(instrs, chained_adds) == MultConst(cpu_model=chained_adds).find_mult_sequence(100)[0]
+
+
+def test_graph_latency():
+    graph = AdderGraph(superscalar)
+    # 5 and 9 don't depend on each other, so with more than one issue
+    # slot they are computed at the same time.
+    graph.add_node("add", 1, 2, 1, 0)
+    graph.add_node("add", 1, 3, 1, 0)
+    graph.add_node("add", 5, 0, 9, 0)
+    for n in (5, 9, 14):
+        graph.add_output(n)
+    assert graph_latency(graph, superscalar) == 3
+    assert graph_latency(graph, POWER_3addr_3reg) == 5
+
+
+# If run as standalone
+if __name__ == "__main__":
+    test_sequence_measures()
+    test_objectives()
+    test_graph_latency()
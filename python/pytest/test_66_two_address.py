@@ -0,0 +1,112 @@
+"""
+Test register copies for two-address CPU models.
+"""
+from mult_by_const import MultConst
+from mult_by_const.adder_graph import AdderGraph, check_graph_cost
+from mult_by_const.binary_method import binary_sequence
+from mult_by_const.cpu import POWER_3addr_3reg, chained_adds, x86_2addr_3reg
+from mult_by_const.dp_method import dp_table
+from mult_by_const.instruction import (
+    Instruction,
+    instruction_sequence_cost,
+    instruction_sequence_value,
+    str2instructions,
+)
+from mult_by_const.two_address import copy_count, two_address_sequence
+
+
+def test_two_address_sequence():
+    assert x86_2addr_3reg.is_two_address()
+    assert not POWER_3addr_3reg.is_two_address()
+    assert not chained_adds.is_two_address()
+
+    # m is the input, which r1 still has.
+    instrs = str2instructions("[n<<4, n+m]")
+    assert two_address_sequence(instrs, x86_2addr_3reg) == instrs
+
+    # m, 17, has to be copied before the second shift.
+    instrs = two_address_sequence(str2instructions("[n<<4, n+m, n<<1, n+m]"), x86_2addr_3reg)
+    assert repr(instrs) == "[n<<4, n+m, copy n, n<<1, n+m]"
+    assert instruction_sequence_value(instrs) == 51
+    assert instruction_sequence_cost(instrs) == 5
+
+    # 1 - n needs a copy of r1 to subtract from.
+    instrs = two_address_sequence(str2instructions("[n<<3, 1-n]"), x86_2addr_3reg)
+    assert repr(instrs) == "[n<<3, copy 1, 1-n]"
+    assert instruction_sequence_value(instrs) == -7
+
+    # Copies that are there already aren't added again.
+    assert two_address_sequence(instrs, x86_2addr_3reg) == instrs
+
+
+def test_two_address_search():
+    three_address = MultConst()
+    for mconst in (
+        MultConst(cpu_model=x86_2addr_3reg),
+        MultConst(cpu_model=x86_2addr_3reg, engine="iterative"),
+    ):
+        for n in range(-100, 400):
+            cost, instrs = mconst.find_mult_sequence(n)
+            assert instruction_sequence_value(instrs) == n
+            assert instruction_sequence_cost(instrs) == cost
+            # The search adds exactly the copies needed.
+            assert two_address_sequence(instrs, x86_2addr_3reg) == instrs, f"{n}: {instrs}"
+            # Copies only add to the cost. Searches for negative numbers
+            # aren't exhaustive, so they can differ either way.
+            if n > 0:
+                assert cost >= three_address.find_mult_sequence(n)[0]
+            pass
+        mconst.mult_cache.check()
+
+    # 51 can't avoid saving 17 before its second shift.
+    cost, instrs = MultConst(cpu_model=x86_2addr_3reg).find_mult_sequence(51)
+    assert (cost, copy_count(instrs)) == (5, 1)
+
+    cost, instrs = binary_sequence(MultConst(cpu_model=x86_2addr_3reg), -7)
+    assert instrs[-2:] == [Instruction("copy", 1, 1), Instruction("subtract", -1, 1)]
+
+    # The table is built from every smaller entry, and the search only
+    # cuts off branches that can't do better, so the two agree, copies and
+    # all. 181 is 15 * 12 + 1, which needs a copy of 15.
+    mconst = MultConst(cpu_model=x86_2addr_3reg)
+    table = dp_table(mconst, 400)
+    for n in range(2, 401):
+        _, upper, _, instrs = table[n]
+        assert two_address_sequence(instrs, x86_2addr_3reg) == instrs
+        assert upper == MultConst(cpu_model=x86_2addr_3reg).find_mult_sequence(n)[0], n
+
+
+def test_two_address_graph():
+    mconst = MultConst(cpu_model=x86_2addr_3reg)
+    # A graph made from a sequence needs the same copies as the sequence.
+    for n in range(-50, 300):
+        cost, instrs = mconst.find_mult_sequence(n)
+        graph = AdderGraph(x86_2addr_3reg)
+        graph.add_sequence(instrs)
+        graph.add_output(n)
+        assert graph.copies_needed() == copy_count(instrs), f"{n}: {instrs}"
+        assert graph.cost() == cost, f"{n}: {instrs}"
+
+    # r[2] = r[1] + r[1] would overwrite the input, which 22 needs again,
+    # so the cheapest graph is the sequence's.
+    cost, graph = mconst.find_adder_graph(22)
+    check_graph_cost(cost, graph)
+    assert cost == mconst.find_mult_sequence(22)[0] == 5
+
+    # 86 = 6 + (5 << 4) keeps 5 around by copying it before computing 6.
+    cost, graph = mconst.find_adder_graph(86)
+    check_graph_cost(cost, graph)
+    assert (cost, graph.copies_needed()) == (6, 1)
+    assert mconst.find_mult_sequence(86)[0] == 7
+
+    constants = (3, 13, 29, 45, 53, -7, 115, 229)
+    cost, separate_cost, graph = mconst.find_mcm_graph(constants)
+    graph.check()
+    assert cost == graph.cost() <= separate_cost
+
+
+# If run as standalone
+if __name__ == "__main__":
+    test_two_address_sequence()
+    test_two_address_search()
+    test_two_address_graph()
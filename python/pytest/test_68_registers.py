@@ -0,0 +1,79 @@
+"""
+Test counting the registers a sequence needs, and searching with fewer.
+"""
+from mult_by_const import MultConst
+from mult_by_const.cpu import (
+    CPUProfile,
+    POWER_3addr_3reg,
+    RISC_equal_time_cost_profile,
+)
+from mult_by_const.dp_method import dp_table
+from mult_by_const.instruction import (
+    instruction_sequence_cost,
+    instruction_sequence_value,
+    str2instructions,
+)
+from mult_by_const.registers import register_count
+
+two_registers = CPUProfile(
+    name="two registers",
+    instruction_type="three-address",
+    max_registers=2,
+    costs=RISC_equal_time_cost_profile,
+    shift_cost_fn=POWER_3addr_3reg.shift_cost_fn,
+    lower_bound_fn=POWER_3addr_3reg.lower_bound_fn,
+)
+
+
+def test_register_count():
+    # m is the input each time n is shifted, so only r1 and n are needed.
+    assert register_count(str2instructions("[n<<4, n+m, n<<1, n+m]")) == 2
+    assert register_count(str2instructions("[n<<2, n+1, n<<3]")) == 2
+    # After n-m, m is 15, which is needed along with r1 for the n+1 later.
+    instrs = str2instructions("[n<<4, n-m, n<<1, n+m, n<<2, n+1]")
+    assert register_count(instrs) == 3
+    # Once r1 is no longer needed, its register can hold m.
+    assert register_count(str2instructions("[n<<4, n-m, n<<1, n+m]")) == 2
+    assert register_count(str2instructions("[n<<4, n-m, n<<1, n+m]"), input_needed=True) == 3
+    assert register_count([]) == 1
+
+    mconst = MultConst()
+    cost, instrs = mconst.find_mult_sequence(51)
+    assert mconst.mult_cache.registers(51) == register_count(instrs)
+    assert mconst.mult_cache.registers(10 ** 9) is None
+
+
+def test_two_register_search():
+    three_registers = MultConst()
+    for mconst in (
+        MultConst(cpu_model=two_registers),
+        MultConst(cpu_model=two_registers, engine="iterative"),
+    ):
+        for n in range(-100, 300):
+            cost, instrs = mconst.find_mult_sequence(n)
+            assert instruction_sequence_value(instrs) == n
+            assert instruction_sequence_cost(instrs) == cost
+            assert register_count(instrs) <= 2, f"{n}: {instrs}"
+            if n > 0:
+                assert cost >= three_registers.find_mult_sequence(n)[0]
+            pass
+        mconst.mult_cache.check()
+
+    mconst = MultConst(cpu_model=two_registers)
+    table = dp_table(mconst, 200)
+    for n in range(2, 201):
+        _, _, _, instrs = table[n]
+        assert instruction_sequence_value(instrs) == n
+        assert register_count(instrs) <= 2
+
+    # Wide multipliers go through the pattern and wide methods.
+    for n in (int("110" * 40, 2), -(2 ** 90 + 77)):
+        cost, instrs = mconst.find_sequence(n)
+        assert instruction_sequence_value(instrs) == n
+        assert register_count(instrs) <= 2
+
+
+# If run as standalone
+if __name__ == "__main__":
+    test_register_count()
+    test_two_register_search()
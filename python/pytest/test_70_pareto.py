@@ -0,0 +1,67 @@
+"""
+Test finding the Pareto front of cost, latency and registers.
+"""
+from mult_by_const import MultConst
+from mult_by_const.cpu import superscalar
+from mult_by_const.instruction import instruction_sequence_cost, instruction_sequence_value
+from mult_by_const.latency import instruction_sequence_latency
+from mult_by_const.pareto import dominates, pareto_filter
+from mult_by_const.registers import register_count
+
+
+def test_pareto_filter():
+    entries = [
+        (4, 4, 2, []),
+        (3, 5, 2, []),
+        (4, 5, 2, []),  # dominated by both of the above
+        (3, 5, 3, []),  # dominated by the second
+        (3, 5, 2, []),  # the same as the second
+        (2, 6, 3, []),
+    ]
+    assert dominates(entries[0], entries[2])
+    assert not dominates(entries[0], entries[1])
+    assert not dominates(entries[1], entries[4])
+    assert [entry[:3] for entry in pareto_filter(entries)] == [(2, 6, 3), (3, 5, 2), (4, 4, 2)]
+
+
+def test_pareto_front():
+    mconst = MultConst()
+    for n in range(-20, 200):
+        front = mconst.find_pareto_front(n)
+        for cost, latency, registers, instrs in front:
+            assert instruction_sequence_value(instrs) == n
+            assert cost == instruction_sequence_cost(instrs)
+            assert registers == register_count(instrs)
+        assert not any(dominates(a, b) for a in front for b in front)
+        # The cheapest is as cheap as a search for the least cost. Searches
+        # for negative numbers aren't exhaustive, so the other searches
+        # the front combines can do better.
+        if n > 0:
+            assert front[0][0] == mconst.find_mult_sequence(n)[0]
+        else:
+            assert front[0][0] <= mconst.find_mult_sequence(n)[0]
+        pass
+
+    # The cheapest sequence for 107 needs three registers.
+    assert [entry[:3] for entry in mconst.find_pareto_front(107)] == [(6, 6, 3), (8, 8, 2)]
+
+    # Fronts are cached.
+    assert 107 in mconst.mult_cache.fronts
+    front = mconst.find_pareto_front(107)
+    front[0][3].pop()
+    assert len(mconst.find_pareto_front(107)[0][3]) == 6
+
+    # On superscalar, "shift_add" saves an instruction but adds latency.
+    mconst = MultConst(cpu_model=superscalar)
+    front = mconst.find_pareto_front(51)
+    assert [entry[:3] for entry in front] == [(3, 5, 2), (4, 4, 2)]
+    for cost, latency, registers, instrs in front:
+        assert cost == instruction_sequence_cost(instrs)
+    latency, instrs = MultConst(cpu_model=superscalar, objective="latency").find_mult_sequence(51)
+    assert front[-1][1] == latency == instruction_sequence_latency(instrs, superscalar)
+
+
+# If run as standalone
+if __name__ == "__main__":
+    test_pareto_filter()
+    test_pareto_front()
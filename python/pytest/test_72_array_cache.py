@@ -0,0 +1,73 @@
+"""
+Test the multiplication cache kept in typed arrays.
+"""
+from mult_by_const import MultConst
+from mult_by_const.array_cache import ArrayCacheEntries, ArrayMultCache
+from mult_by_const.cpu import inf_cost
+from mult_by_const.dp_method import dp_table
+from mult_by_const.instruction import str2instructions
+from mult_by_const.io import dump
+
+
+def test_array_cache_entries():
+    entries = ArrayCacheEntries(-1, 100)
+    instrs = str2instructions("[n<<4, n-m, n<<1, 1-n, m-n, (n<<2)+n]")
+    entries[60] = (1, 7, False, instrs)
+    entries[0] = (1, 1, True, None)
+    entries[1000] = (0, 4, True, instrs[:2])
+    entries[50] = (0, inf_cost, False, [])
+
+    lower, upper, finished, cached = entries[60]
+    assert (lower, upper, finished) == (1, 7, False)
+    assert repr(cached) == repr(instrs)
+    assert entries[0] == (1, 1, True, None)
+    assert entries[50] == (0, inf_cost, False, [])
+    assert 1000 in entries.other and 1000 in entries
+    assert 5 not in entries and entries.get(5) is None
+    assert sorted(entries) == [0, 50, 60, 1000]
+    assert len(entries) == 4
+
+    # Replaced sequences are compacted away.
+    for upper in range(500, 0, -1):
+        entries[60] = (0, upper, False, instrs)
+    assert entries.garbage <= 100
+    assert repr(entries[60][3]) == repr(instrs)
+    del entries[60]
+    assert 60 not in entries and len(entries) == 3
+
+
+def test_array_mult_cache():
+    mconst = MultConst()
+    array_mconst = MultConst(cache_range=(-1, 1001))
+    assert isinstance(array_mconst.mult_cache, ArrayMultCache)
+    for n in range(-50, 500):
+        assert mconst.find_mult_sequence(n)[0] == array_mconst.find_mult_sequence(n)[0]
+    array_mconst.mult_cache.check()
+
+    mcache, array_mcache = mconst.mult_cache, array_mconst.mult_cache
+    assert sorted(mcache) == sorted(array_mcache)
+    for n in mcache:
+        lower, upper, finished, instrs = mcache.cache[n]
+        assert array_mcache.cache[n][:3] == (lower, upper, finished)
+        assert repr(array_mcache.cache[n][3]) == repr(instrs)
+
+    # The same interface as MultCache.
+    array_mcache.update_field(999, lower=3)
+    assert array_mcache[999][0] == 3
+    array_mcache.insert_or_update(999, 3, 5, True, str2instructions("[n<<10, n-m, n-m, n-m, n-m, n-m]"))
+    assert array_mcache.registers(999) == 2
+    array_mcache.clear()
+    assert sorted(array_mcache) == [-1, 0, 1]
+
+    dp_mconst = MultConst(cache_range=(0, 301))
+    dp_table(dp_mconst, 300)
+    dp_table(mconst, 300)
+    for n in range(1, 301):
+        assert dp_mconst.mult_cache[n][1] == mconst.mult_cache[n][1]
+    dump(dp_mconst.mult_cache)
+
+
+# If run as standalone
+if __name__ == "__main__":
+    test_array_cache_entries()
+    test_array_mult_cache()
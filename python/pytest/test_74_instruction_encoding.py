@@ -0,0 +1,83 @@
+"""
+Test compact instructions: __slots__, shared instances and the integer encoding.
+"""
+import pickle
+from functools import lru_cache
+
+import pytest
+
+from mult_by_const import MultConst
+from mult_by_const.cpu import IBM_801, POWER_3addr_3reg
+from mult_by_const.instruction import (
+    OP_BITS,
+    OP_R1,
+    OPS,
+    SHARED_INSTRUCTIONS_SIZE,
+    Instruction,
+    decode_instructions,
+    encode_instruction,
+    encode_instructions,
+    instruction_sequence_cost,
+    instruction_sequence_value,
+    shared_instruction,
+    str2instructions,
+)
+
+
+def test_compact_instruction():
+    instr = Instruction("shift", 4, 1)
+    assert not hasattr(instr, "__dict__")
+    with pytest.raises(AttributeError):
+        instr.comment = "no room"  # type: ignore
+
+    # Instructions are shared, so they can't be changed.
+    with pytest.raises(AttributeError):
+        instr.cost = 2
+    assert instr.cost == 1
+    assert pickle.loads(pickle.dumps(instr)) == instr
+
+    assert shared_instruction("shift", 4, 1) is shared_instruction("shift", 4, 1)
+    assert shared_instruction("shift", 4, 1) == instr
+
+    # Costs are part of the key, so there is no end to the instructions
+    # asked for; only so many are kept. Try that on a copy, so that the
+    # shared instructions aren't flushed for the other tests.
+    bounded = lru_cache(maxsize=SHARED_INSTRUCTIONS_SIZE)(shared_instruction.__wrapped__)
+    for i in range(SHARED_INSTRUCTIONS_SIZE + 10):
+        bounded("add", OP_R1, 1 + i / 1000)
+    assert bounded.cache_info().currsize == SHARED_INSTRUCTIONS_SIZE
+
+
+def test_instruction_encoding():
+    assert len(OPS) <= 1 << OP_BITS
+
+    instrs = str2instructions("[n<<4, n-m, n<<1, n+m, 1-n, m-n, n+1, n-1, -n, copy 1, copy n, (n<<3)+n]")
+    codes = encode_instructions(instrs)
+    assert codes.typecode == "H"
+    assert len({encode_instruction(instr) for instr in instrs}) == len(instrs)
+    assert [repr(instr) for instr in decode_instructions(codes, IBM_801)] == [repr(instr) for instr in instrs]
+    assert instruction_sequence_value(codes) == instruction_sequence_value(instrs)
+    assert instruction_sequence_value(encode_instructions([Instruction("shift", 3), Instruction("zero", 0)])) == 0
+
+    # Amounts too big for 16 bits.
+    wide = [Instruction("shift", 10000), Instruction("add", OP_R1)]
+    codes = encode_instructions(wide)
+    assert codes.typecode == "Q"
+    assert instruction_sequence_value(codes) == (1 << 10000) + 1
+
+    with pytest.raises(ValueError):
+        instruction_sequence_cost(codes)
+
+    mconst = MultConst()
+    for n in range(-50, 300):
+        cost, instrs = mconst.find_mult_sequence(n)
+        codes = encode_instructions(instrs)
+        assert instruction_sequence_value(codes) == n
+        assert instruction_sequence_cost(codes, POWER_3addr_3reg) == cost
+        assert decode_instructions(codes, POWER_3addr_3reg) == instrs
+
+
+# If run as standalone
+if __name__ == "__main__":
+    test_compact_instruction()
+    test_instruction_encoding()
@@ -0,0 +1,72 @@
+"""
+Test instruction sequences that share their beginnings.
+"""
+import pytest
+
+from mult_by_const import MultConst
+from mult_by_const.dp_method import dp_table
+from mult_by_const.instruction import instruction_sequence_value, partial_products, str2instructions
+from mult_by_const.sequence import EMPTY_SEQUENCE, InstructionSequence, as_sequence
+
+
+def test_instruction_sequence():
+    instrs = str2instructions("[n<<4, n+m, n<<1, n+m, n<<1]")
+    seq = as_sequence(instrs)
+    assert isinstance(seq, InstructionSequence)
+    assert len(seq) == 5 and seq == instrs and list(seq) == instrs
+    assert seq[0] == instrs[0] and seq[-1] == instrs[-1]
+    assert seq[1:3] == instrs[1:3] and seq[::-1] == instrs[::-1]
+    assert list(reversed(seq)) == instrs[::-1]
+    with pytest.raises(IndexError):
+        seq[5]
+
+    # Beginnings are ancestors, not copies.
+    assert seq[:-3] is seq[:2] is seq.ancestor(3)
+    assert seq[:] is seq and seq[:0] is EMPTY_SEQUENCE and seq[:-9] is EMPTY_SEQUENCE
+    assert [prefix.last for prefix in seq.prefixes()] == instrs
+    more = seq + str2instructions("[n+1]")
+    assert isinstance(more, InstructionSequence) and more[:-1] is seq
+    assert instrs + seq == instrs + instrs
+    assert not EMPTY_SEQUENCE and EMPTY_SEQUENCE == [] and as_sequence(None) is None
+
+    assert list(partial_products(instrs)) == [16, 17, 34, 51, 102]
+    assert instruction_sequence_value(seq) == 102
+
+
+def test_cache_sharing():
+    mconst = MultConst()
+    for n in range(1, 200):
+        cost, instrs = mconst.find_mult_sequence(n)
+        assert isinstance(instrs, list)
+    mcache = mconst.mult_cache
+
+    # Lookups hand out the cache's own sequence.
+    assert mcache[51][3] is mcache.cache[51][3]
+
+    # The sequence of a partial product is a beginning of the sequences
+    # built from it.
+    shared = 0
+    for n, (_, _, finished, instrs) in mcache.cache.items():
+        assert isinstance(instrs, InstructionSequence) or instrs is None
+        if finished and instrs and len(instrs) > 1:
+            parent = instrs[:-1]
+            m = instruction_sequence_value(parent)
+            if mcache.cache.get(m, (0, 0, False, None))[3] is parent:
+                shared += 1
+        pass
+    assert shared > len(mcache) // 2
+
+    mcache.insert(1000, 0, 4, False, str2instructions("[n<<5, n-1, n<<5, n-m]"))
+    assert mcache.cache[1000][3] == str2instructions("[n<<5, n-1, n<<5, n-m]")
+    assert mcache.cache[1000][3][:2] is mcache.cache[31][3]
+
+    dp_mconst = MultConst()
+    dp_table(dp_mconst, 300)
+    dp_cache = dp_mconst.mult_cache.cache
+    assert dp_cache[300][3][:-1] is dp_cache[75][3]
+
+
+# If run as standalone
+if __name__ == "__main__":
+    test_instruction_sequence()
+    test_cache_sharing()
@@ -0,0 +1,66 @@
+"""
+Test that lookups of numbers without a sequence don't add cache entries.
+"""
+from mult_by_const import MultConst
+from mult_by_const.cache import MultCache, PartialBounds
+from mult_by_const.cpu import inf_cost
+from mult_by_const.instruction import str2instructions
+
+
+def test_partial_bounds():
+    bounds = PartialBounds(maxsize=3)
+    for n in (10, 11, 12):
+        bounds.raise_bound(n, n)
+    assert bounds.get(10) == 10
+    bounds.raise_bound(11, 5)
+    assert bounds.get(11) == 11
+    bounds.raise_bound(13, 1)
+
+    # 12 was the least recently used.
+    assert 12 not in bounds and len(bounds) == 3 and bounds.evictions == 1
+    assert bounds.pop(10) == 10 and bounds.pop(10) == 0
+
+
+def test_cache_lookups():
+    mcache = MultCache(partial_size=2)
+    entries = len(mcache)
+    assert mcache[1000] == (0, inf_cost, False, [])
+    assert mcache[1000][0] == 0
+    assert (mcache.misses, mcache.hits_partial) == (1, 1)
+    assert 1000 not in mcache and len(mcache) == entries
+    assert len(mcache.partial) == 1
+
+    mcache.update_field(1000, lower=3)
+    assert 1000 not in mcache and mcache[1000][0] == 3
+
+    # A sequence makes an entry, which keeps the lower bound.
+    instrs = str2instructions("[n<<5, n-1, n<<5, n-m]")
+    mcache.update_field(1000, upper=4, finished=False, instrs=instrs)
+    assert mcache.cache[1000] == (3, 4, False, instrs)
+    assert 1000 not in mcache.partial
+
+    for n in (2000, 3000, 4000):
+        mcache[n]
+    assert len(mcache.partial) == 2 and mcache.partial.evictions == 1
+
+
+def test_search_entries():
+    mconst = MultConst(collect_stats=True)
+    for n in range(1, 3000, 7):
+        mconst.find_mult_sequence(n)
+    mcache = mconst.mult_cache
+    assert len(mcache.partial) > 0
+    for n, (lower, upper, finished, instrs) in mcache.cache.items():
+        assert upper < inf_cost or instrs is None, n
+    mcache.check()
+
+    cache_stats = mconst.stats.to_dict(mcache)["cache"]
+    assert cache_stats["partial-bounds"] == len(mcache.partial)
+    assert cache_stats["partial-evictions"] == 0
+
+
+# If run as standalone
+if __name__ == "__main__":
+    test_partial_bounds()
+    test_cache_lookups()
+    test_search_entries()
@@ -0,0 +1,62 @@
+"""
+Test limiting the number of MultCache entries.
+"""
+from io import StringIO
+
+from mult_by_const import MultConst
+from mult_by_const.cache import MultCache
+from mult_by_const.instruction import str2instructions
+from mult_by_const.stats import dump_stats
+
+
+def test_eviction_order():
+    mcache = MultCache(max_entries=8, pinned_below=4)
+    mcache.insert(2, 1, 1, True, str2instructions("[n<<1]"))
+    assert sorted(mcache) == [-1, 0, 1, 2]
+
+    for n in (64, 128, 256, 512):
+        mcache.insert(n, 1, 1, True, str2instructions(f"[n<<{n.bit_length() - 1}]"))
+    for _ in range(3):
+        mcache[512]
+    assert len(mcache) == 8 and mcache.evictions == 0
+
+    # Over the limit: the unfinished entry goes first, then the biggest
+    # of those looked up least often.
+    mcache.insert(100, 0, 9, False, str2instructions("[n<<2, n+1, n<<2, n+1, n<<2]"))
+    assert mcache.evictions == 2 and mcache.evictions_unfinished == 1
+    assert sorted(mcache) == [-1, 0, 1, 2, 64, 128, 512]
+
+    # Pinned entries stay even if that leaves us over the limit. Then we
+    # wait for a batch of entries before evicting again.
+    mcache = MultCache(max_entries=2, pinned_below=4)
+    mcache.insert(3, 0, 2, True, str2instructions("[n<<1, n+1]"))
+    mcache.insert(5, 0, 2, True, str2instructions("[n<<2, n+1]"))
+    assert sorted(mcache) == [-1, 0, 1, 3, 5]
+    mcache.insert(6, 0, 3, True, str2instructions("[n<<1, n+1, n<<1]"))
+    assert sorted(mcache) == [-1, 0, 1, 3]
+
+
+def test_limited_search():
+    mconst = MultConst()
+    limited = MultConst(cache_size=400, collect_stats=True)
+    for n in range(-100, 2000):
+        assert limited.find_mult_sequence(n)[0] <= mconst.find_mult_sequence(n)[0]
+    mcache = limited.mult_cache
+    assert mcache.evictions > 0
+    assert all(n in mcache for n in range(-255, 256) if n in mconst.mult_cache)
+    mcache.check()
+
+    cache_stats = limited.stats.to_dict(mcache)["cache"]
+    assert cache_stats["evictions"] == mcache.evictions
+    assert cache_stats["evictions-unfinished"] == mcache.evictions_unfinished
+    out = StringIO()
+    dump_stats(limited.stats, mcache, out=out)
+    assert "Cache entries evicted:" in out.getvalue()
+
+    assert limited.objective_mconst("latency").mult_cache.max_entries == 400
+
+
+# If run as standalone
+if __name__ == "__main__":
+    test_eviction_order()
+    test_limited_search()
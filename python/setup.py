@@ -3,6 +3,7 @@
 
 from __pkginfo__ import \
     author,           author_email,       entry_points, install_requires, \
+    extras_require,   \
     license,          long_description,   classifiers,               \
     modname,          py_modules,         \
     short_desc,       tests_require,             \
@@ -15,6 +16,7 @@ setup(
        classifiers        = classifiers,
        description        = short_desc,
        entry_points       = entry_points,
+       extras_require     = extras_require,
        install_requires   = install_requires,
        license            = license,
        long_description   = long_description,